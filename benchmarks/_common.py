@@ -0,0 +1,179 @@
+"""Utilidades compartidas por los benchmarks: servidor simulado, medición y salida JSON."""
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+CLIENT_ID = "bench_client_id"
+SECRET = "bench_secret_0123456789abcdef01"
+
+
+def device_ids(n: int) -> List[str]:
+    return [f"ebf{i:019d}" for i in range(n)]
+
+
+def _status(device_id: str) -> List[Dict[str, Any]]:
+    return [
+        {"code": "switch", "value": True},
+        {"code": "cur_power", "value": len(device_id) * 10},
+        {"code": "balance_energy", "value": 12345},
+        {"code": "phase_a", "value": "CQAAAAAAAAA="},
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _reply(self, data: Dict[str, Any]) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(data, separators=(",", ":")).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        parts = url.path.split("/")
+        t = int(time.time() * 1000)
+        if url.path.startswith("/v1.0/token"):
+            result = {"access_token": "bench_at", "refresh_token": "bench_rt", "expire_time": 7200, "uid": "u"}
+            self._reply({"success": True, "result": result, "t": t})
+        elif url.path == "/v1.0/iot-03/devices/status":
+            ids = parse_qs(url.query).get("device_ids", [""])[0].split(",")
+            self._reply({"success": True, "result": [{"id": d, "status": _status(d)} for d in ids if d], "t": t})
+        elif len(parts) == 5 and parts[4] == "status":
+            self._reply({"success": True, "result": _status(parts[3]), "t": t})
+        else:
+            self._reply({"success": False, "code": 1108, "msg": "uri path invalid", "t": t})
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._reply({"success": True, "result": True, "t": int(time.time() * 1000)})
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _serve(port_queue: "multiprocessing.Queue[int]", latency: float) -> None:
+    _Handler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+class MockServer:
+    """API Tuya mínima (token, ``/status``, estado en lote y comandos) en local.
+
+    ``process=True`` la arranca en otro proceso para que su CPU no se mezcle
+    con la del cliente medido.
+    """
+
+    def __init__(self, latency: float = 0.0, process: bool = False) -> None:
+        self.latency = latency
+        self.process = process
+        self.port = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._proc: Optional[multiprocessing.Process] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "MockServer":
+        if self.process:
+            queue: "multiprocessing.Queue[int]" = multiprocessing.Queue()
+            self._proc = multiprocessing.Process(target=_serve, args=(queue, self.latency), daemon=True)
+            self._proc.start()
+            self.port = queue.get(timeout=10)
+        else:
+            handler = type("Handler", (_Handler,), {"latency": self.latency})
+            self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_port
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.join()
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max en milisegundos."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def ops_per_sec(fn: Callable[[int], Any], n: int, repeat: int = 3) -> float:
+    """Mejor de ``repeat`` pasadas de ``n`` llamadas a ``fn(i)``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(n):
+            fn(i)
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata() -> Dict[str, Any]:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_json(path: Optional[str], suite: str, results: Dict[str, Any]) -> None:
+    """Escribe ``{"suite", "meta", "results"}`` en ``path`` (``-`` = stdout)."""
+    if not path:
+        return
+    doc = {"suite": suite, "meta": metadata(), "results": results}
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if path == "-":
+        print(text)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Resultados en {path}")
@@ -0,0 +1,137 @@
+"""Barridos de flota: estado de 1k/10k dispositivos con cada estrategia del cliente.
+
+Para cada tamaño y estrategia mide dispositivos/s, peticiones/s, CPU del
+cliente por dispositivo (el servidor simulado corre en otro proceso; en
+``workers_bulk`` se suma la CPU de los workers) y, con
+``--memory``, el pico de memoria asignada por dispositivo (tracemalloc, en
+una pasada aparte para no falsear los tiempos).
+
+Uso:
+    python benchmarks/bench_fleet.py [--sizes 1000 10000] [--processes N] [--memory] [--json resultados.json]
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import CLIENT_ID, SECRET, MockServer, device_ids, write_json
+
+from tuya_client import TuyaClient
+from tuya_client.workers import FleetWorkerPool
+
+try:
+    from tuya_client import AsyncTuyaClient
+    import aiohttp  # noqa: F401
+except ImportError:
+    AsyncTuyaClient = None
+
+
+def sync_per_device(client: TuyaClient, ids: list) -> int:
+    def fetch(device_id: str) -> bool:
+        return client.request("GET", f"/v1.0/devices/{device_id}/status").json().get("success", False)
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        return sum(executor.map(fetch, ids))
+
+
+def sync_bulk(client: TuyaClient, ids: list) -> int:
+    return sum(1 for resp in client.get_status_many(ids).values() if resp.get("success"))
+
+
+async def _async_sweep(base_url: str, ids: list, bulk: bool, counter: list) -> int:
+    async with AsyncTuyaClient(CLIENT_ID, SECRET, base_url, hooks=[lambda e: counter.append(1)]) as client:
+        await client.get_token()
+        del counter[:]
+        if bulk:
+            results = await client.get_status_many(ids)
+        else:
+            results = await client.gather_status(ids, concurrency=64)
+    return sum(1 for resp in results.values() if resp.get("success"))
+
+
+def workers_bulk(base_url: str, ids: list, processes: int, counter: list) -> int:
+    limits = {"*": (1e6, 1e6), "read": (1e6, 1e6)}
+    with FleetWorkerPool(CLIENT_ID, SECRET, base_url, processes=processes, limits=limits) as pool:
+        ok = sum(1 for _, resp in pool.status(ids) if resp.get("success"))
+        counter.extend([1] * pool.stats["requests"])
+    return ok
+
+
+def _cpu() -> float:
+    t = os.times()  # incluye a los workers ya terminados (children_*)
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _measure(run) -> dict:
+    cpu, wall = _cpu(), time.perf_counter()
+    ok = run()
+    return {"ok": ok, "wall": time.perf_counter() - wall, "cpu": _cpu() - cpu}
+
+
+def sweep(base_url: str, ids: list, strategy: str, memory: bool, processes: int) -> dict:
+    counter: list = []
+
+    def once() -> int:
+        if strategy == "workers_bulk":
+            return workers_bulk(base_url, ids, processes, counter)
+        if strategy.startswith("async"):
+            return asyncio.run(_async_sweep(base_url, ids, strategy == "async_bulk", counter))
+        client = TuyaClient(CLIENT_ID, SECRET, base_url, hooks=[lambda e: counter.append(1)])
+        client.get_token()
+        del counter[:]
+        return sync_per_device(client, ids) if strategy == "sync_per_device" else sync_bulk(client, ids)
+
+    m = _measure(once)
+    n = len(ids)
+    stats = {
+        "devices": n,
+        "ok": m["ok"],
+        "requests": len(counter),
+        "seconds": m["wall"],
+        "devices_per_sec": n / m["wall"],
+        "requests_per_sec": len(counter) / m["wall"],
+        "cpu_ms_per_device": m["cpu"] * 1000 / n,
+    }
+    if memory:
+        tracemalloc.start()
+        once()
+        stats["peak_bytes_per_device"] = tracemalloc.get_traced_memory()[1] / n
+        tracemalloc.stop()
+    extra = f"   {stats['peak_bytes_per_device']:>8,.0f} B/disp" if memory else ""
+    print(
+        f"{n:>6} {strategy:<18} {stats['devices_per_sec']:>10,.0f} disp/s {stats['requests_per_sec']:>8,.0f} req/s"
+        f"   {stats['cpu_ms_per_device']:6.3f} ms CPU/disp{extra}"
+    )
+    return stats
+
+
+def run(sizes: list, memory: bool, latency: float, processes: int) -> dict:
+    strategies = ["sync_per_device", "sync_bulk", "workers_bulk"]
+    if AsyncTuyaClient is not None:
+        strategies += ["async_per_device", "async_bulk"]
+    else:
+        print("aiohttp no instalado: se omiten las estrategias asíncronas")
+    results: dict = {}
+    with MockServer(latency=latency, process=True) as server:
+        for size in sizes:
+            ids = device_ids(size)
+            for strategy in strategies:
+                results[f"{strategy}_{size}"] = sweep(server.base_url, ids, strategy, memory, processes)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--memory", action="store_true", help="medir el pico de memoria (pasada extra)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia simulada del servidor (s)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="procesos de workers_bulk")
+    parser.add_argument("--json", metavar="RUTA", help="guardar resultados en JSON ('-' = stdout)")
+    args = parser.parse_args()
+    write_json(args.json, "fleet", run(args.sizes, args.memory, args.latency, args.processes))
+
+
+if __name__ == "__main__":
+    main()
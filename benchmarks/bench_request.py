@@ -0,0 +1,109 @@
+"""Benchmark de extremo a extremo: ``request()`` contra un servidor simulado local.
+
+Mide peticiones/s y latencias p50/p99 del cliente síncrono (genérico y
+``prepare()``) con varios hilos y del cliente asíncrono con varias
+concurrencias.
+
+Uso:
+    python benchmarks/bench_request.py [--n 2000] [--threads 1 8] [--json resultados.json]
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import CLIENT_ID, SECRET, MockServer, device_ids, percentiles, write_json
+
+from tuya_client import TuyaClient
+
+try:
+    from tuya_client import AsyncTuyaClient
+    import aiohttp  # noqa: F401
+except ImportError:
+    AsyncTuyaClient = None
+
+
+def _report(label: str, n: int, elapsed: float, latencies: list) -> dict:
+    stats = {"requests": n, "requests_per_sec": n / elapsed, **percentiles(latencies)}
+    print(
+        f"{label:<34} {stats['requests_per_sec']:>9,.0f} req/s   "
+        f"p50 {stats['p50_ms']:6.2f} ms   p99 {stats['p99_ms']:6.2f} ms"
+    )
+    return stats
+
+
+def bench_sync(base_url: str, n: int, threads: int, prepared: bool) -> dict:
+    client = TuyaClient(CLIENT_ID, SECRET, base_url)
+    client.get_token()
+    ids = device_ids(1024)
+    status = client.prepare("GET", "/v1.0/devices/{device_id}/status")
+
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        if prepared:
+            status(device_id=ids[i & 1023]).content
+        else:
+            client.request("GET", f"/v1.0/devices/{ids[i & 1023]}/status").content
+        return time.perf_counter() - start
+
+    for i in range(min(50, n)):  # calentamiento: abre las conexiones del pool
+        call(i)
+    start = time.perf_counter()
+    if threads == 1:
+        latencies = [call(i) for i in range(n)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(call, range(n)))
+    elapsed = time.perf_counter() - start
+    label = f"sync {'prepare()' if prepared else 'request()'} x{threads}"
+    return _report(label, n, elapsed, latencies)
+
+
+async def _bench_async(base_url: str, n: int, concurrency: int) -> dict:
+    ids = device_ids(1024)
+    async with AsyncTuyaClient(CLIENT_ID, SECRET, base_url, pool_size=concurrency) as client:
+        await client.get_token()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(i: int) -> float:
+            async with semaphore:
+                start = time.perf_counter()
+                await client.request("GET", f"/v1.0/devices/{ids[i & 1023]}/status")
+                return time.perf_counter() - start
+
+        await asyncio.gather(*(call(i) for i in range(min(concurrency, n))))
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call(i) for i in range(n)))
+        elapsed = time.perf_counter() - start
+    return _report(f"async request() x{concurrency}", n, elapsed, list(latencies))
+
+
+def run(n: int, threads: list, concurrency: list, latency: float, process: bool) -> dict:
+    results: dict = {}
+    with MockServer(latency=latency, process=process) as server:
+        for t in threads:
+            results[f"sync_request_x{t}"] = bench_sync(server.base_url, n, t, prepared=False)
+            results[f"sync_prepared_x{t}"] = bench_sync(server.base_url, n, t, prepared=True)
+        if AsyncTuyaClient is not None:
+            for c in concurrency:
+                results[f"async_request_x{c}"] = asyncio.run(_bench_async(server.base_url, n, c))
+        else:
+            print("aiohttp no instalado: se omite el cliente asíncrono")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000, help="peticiones por escenario")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia simulada del servidor (s)")
+    parser.add_argument("--process-server", action="store_true", help="servidor en otro proceso")
+    parser.add_argument("--json", metavar="RUTA", help="guardar resultados en JSON ('-' = stdout)")
+    args = parser.parse_args()
+    results = run(args.n, args.threads, args.concurrency, args.latency, args.process_server)
+    write_json(args.json, "request", results)
+
+
+if __name__ == "__main__":
+    main()
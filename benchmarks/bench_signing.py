@@ -0,0 +1,121 @@
+"""Microbenchmark: helpers de firma, códecs JSON y firmas por segundo de ``request()`` frente a ``prepare()``.
+
+Uso:
+    python benchmarks/bench_signing.py [--n 200000] [--json resultados.json]
+"""
+import argparse
+
+from _common import CLIENT_ID, SECRET, device_ids, ops_per_sec, write_json
+
+from tuya_client import TuyaClient
+from tuya_client.codec import JSONCodec, OrjsonCodec, orjson
+from tuya_client.status import DeviceStatus
+
+
+def bench(results: dict, label: str, fn, n: int, unit: str = "firmas/s") -> float:
+    rate = ops_per_sec(fn, n)
+    results[label] = rate
+    print(f"{label:<44} {rate:>12,.0f} {unit}")
+    return rate
+
+
+def bench_helpers(client: TuyaClient, ids: list, n: int) -> dict:
+    results: dict = {}
+    query = {"device_ids": ",".join(ids[:20]), "codes": "switch,cur_power"}
+    body = {"commands": [{"code": "switch", "value": True}, {"code": "charge_energy", "value": 5000}]}
+    json_headers = {"Content-Type": "application/json"}
+    canonical = client._canonical_url("/v1.0/iot-03/devices/status", query)
+    body_str = client._normalize_body(body, json_headers)
+    s2s = client._string_to_sign("POST", canonical, body_str, json_headers, None)
+
+    cases = {
+        "_canonical_url (sin query)": lambda i: client._canonical_url(f"/v1.0/devices/{ids[i & 1023]}/status"),
+        "_canonical_url (2 parámetros)": lambda i: client._canonical_url("/v1.0/iot-03/devices/status", query),
+        "_normalize_body (JSON)": lambda i: client._normalize_body(body, json_headers),
+        "_normalize_body (vacío)": lambda i: client._normalize_body(None, None),
+        "_string_to_sign": lambda i: client._string_to_sign("POST", canonical, body_str, json_headers, None),
+        "_hmac_sha256_upper": lambda i: client._hmac_sha256_upper(s2s),
+    }
+    print("Helpers de firma")
+    for label, fn in cases.items():
+        bench(results, label, fn, n, "ops/s")
+    print()
+    return results
+
+
+def bench_codecs(ids: list, n: int) -> dict:
+    results: dict = {}
+    status = [{"code": "switch", "value": True}, {"code": "cur_power", "value": 1234}, {"code": "balance_energy", "value": 56789}]
+    payload = JSONCodec().dumps({"success": True, "t": 0, "result": [{"id": d, "status": status} for d in ids[:20]]}).encode()
+    codecs = [JSONCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    print("Códecs JSON (respuesta en lote de 20 dispositivos)")
+    for codec in codecs:
+        bench(results, f"{codec.name}: loads", lambda i: codec.loads(payload), n // 10, "ops/s")
+    bench(results, "DeviceStatus.from_result", lambda i: DeviceStatus.from_result(status), n, "ops/s")
+    print()
+    return results
+
+
+def bench_signatures(client: TuyaClient, ids: list, n: int) -> dict:
+    results: dict = {}
+    print("GET /v1.0/devices/{device_id}/status")
+    before = bench(
+        results,
+        "status: _signed_request (genérico)",
+        lambda i: client._signed_request("GET", f"/v1.0/devices/{ids[i & 1023]}/status", None, None, None, None, ""),
+        n,
+    )
+    status = client.prepare("GET", "/v1.0/devices/{device_id}/status")
+    after = bench(results, "status: prepare().sign", lambda i: status.sign(device_id=ids[i & 1023]), n)
+    print(f"{'mejora':<44} {after / before:>12.2f}x\n")
+
+    print("GET /v1.0/iot-03/devices/status?device_ids=...")
+    query = {"device_ids": ",".join(ids[:20])}
+    before = bench(
+        results,
+        "bulk: _signed_request (genérico)",
+        lambda i: client._signed_request("GET", "/v1.0/iot-03/devices/status", query, None, None, None, ""),
+        n,
+    )
+    bulk = client.prepare("GET", "/v1.0/iot-03/devices/status", query_keys=["device_ids"])
+    after = bench(results, "bulk: prepare().sign", lambda i: bulk.sign(query=query), n)
+    print(f"{'mejora':<44} {after / before:>12.2f}x\n")
+
+    print("POST /v1.0/devices/{device_id}/commands")
+    body = {"commands": [{"code": "switch", "value": True}]}
+    json_headers = {"Content-Type": "application/json"}
+    before = bench(
+        results,
+        "commands: _signed_request (genérico)",
+        lambda i: client._signed_request(
+            "POST", f"/v1.0/devices/{ids[i & 1023]}/commands", None, json_headers, body, None, ""
+        ),
+        n,
+    )
+    commands = client.prepare("POST", "/v1.0/devices/{device_id}/commands", headers=json_headers)
+    after = bench(results, "commands: prepare().sign", lambda i: commands.sign(device_id=ids[i & 1023], body=body), n)
+    print(f"{'mejora':<44} {after / before:>12.2f}x")
+    return results
+
+
+def run(n: int) -> dict:
+    client = TuyaClient(CLIENT_ID, SECRET, "https://openapi.tuyaus.com")
+    client.access_token = "bench_access_token_0123456789"
+    ids = device_ids(1024)
+    return {
+        "helpers_ops_per_sec": bench_helpers(client, ids, n),
+        "codecs_ops_per_sec": bench_codecs(ids, n),
+        "signatures_per_sec": bench_signatures(client, ids, n),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--json", metavar="RUTA", help="guardar resultados en JSON ('-' = stdout)")
+    args = parser.parse_args()
+    write_json(args.json, "signing", run(args.n))
+
+
+if __name__ == "__main__":
+    main()
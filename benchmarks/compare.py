@@ -0,0 +1,59 @@
+"""Compara dos ficheros JSON de resultados de los benchmarks.
+
+Uso:
+    python benchmarks/compare.py antes.json despues.json [--threshold 0.05]
+
+Muestra cada métrica numérica con su cambio relativo. Las métricas de tiempo
+(``*_ms``, ``seconds``, ``cpu_*``, ``*_bytes_*``) mejoran al bajar; el resto
+(tasas) al subir.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+LOWER_IS_BETTER = ("_ms", "seconds", "cpu_", "bytes")
+
+
+def flatten(doc: Any, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(doc, dict):
+        for key, value in doc.items():
+            out.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(doc, (int, float)) and not isinstance(doc, bool):
+        out[prefix] = float(doc)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.05, help="cambio relativo a destacar")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    if before.get("suite") != after.get("suite"):
+        print(f"⚠️ Suites distintas: {before.get('suite')} vs {after.get('suite')}")
+    print(f"antes:   {before.get('meta', {}).get('git')}  {before.get('meta', {}).get('timestamp')}")
+    print(f"después: {after.get('meta', {}).get('git')}  {after.get('meta', {}).get('timestamp')}\n")
+
+    old, new = flatten(before.get("results", {})), flatten(after.get("results", {}))
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        change = (b - a) / a if a else 0.0
+        lower_better = any(marker in key.rsplit(".", 1)[-1] for marker in LOWER_IS_BETTER)
+        worse = change > args.threshold if lower_better else change < -args.threshold
+        better = change < -args.threshold if lower_better else change > args.threshold
+        mark = "🔴" if worse else ("🟢" if better else "  ")
+        regressions += worse
+        print(f"{mark} {key:<60} {a:>14,.3f} -> {b:>14,.3f}  {change:+7.1%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
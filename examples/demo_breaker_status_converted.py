@@ -1,13 +1,14 @@
 import os
 import sys
 import base64
-import struct
 from dotenv import load_dotenv
 
 # 👇 permitir importar tuya_client/ sin instalar como paquete
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tuya_client import TuyaClient
+from tuya_client.converters import ConverterRegistry
+from tuya_client.phase import PhaseDecoder
 
 # Cargar variables de entorno
 load_dotenv()
@@ -21,54 +22,34 @@ if not CLIENT_ID or not SECRET or not DEVICE_ID:
     raise RuntimeError("⚠️ Debes configurar TUYA_CLIENT_ID, TUYA_SECRET y TUYA_DEVICE_ID en el archivo .env")
 
 
-def convert_phase(raw_b64: str, phase_name: str):
-    """Convierte valores de fase (base64) a voltajes reales."""
-    decoded = base64.b64decode(raw_b64)
-
-    val_0 = struct.unpack("<H", decoded[:2])[0] / 10 if len(decoded) >= 2 else 0
-    val_2 = struct.unpack("<H", decoded[2:4])[0] / 10 if len(decoded) >= 4 else 0
-
-    if 1 <= val_0 <= 300:
-        return f"{val_0:.1f} V (offset0)"
-    if 1 <= val_2 <= 300:
-        return f"{val_2:.1f} V (offset2)"
-    return f"{val_0:.1f} V (offset0) / {val_2:.1f} V (offset2, crudo)"
-
-
-def convert_status(code: str, value):
-    """Convierte cualquier estado crudo en unidades humanas."""
-    # --- Valores numéricos clásicos ---
-    if code == "cur_current":   # mA → A
-        return f"{value / 1000:.2f} A"
-    elif code == "cur_voltage":  # décimas de V → V
-        return f"{value / 10:.1f} V"
-    elif code == "cur_power":   # décimas de W → W
-        return f"{value / 10:.1f} W"
-    elif code in ("switch", "switch_1"):
-        return "Encendido" if value else "Apagado"
-    elif code == "fault":
-        return "Sin fallos" if value == 0 else f"Fallo ({value})"
-
-    # --- Energía ---
-    if code in ("balance_energy", "charge_energy", "total_forward_energy"):
-        # Suelen venir en Wh → convertimos a kWh
-        return f"{value / 1000:.2f} kWh"
-
-    # --- Fases ---
-    if code in ("phase_a", "phase_b", "phase_c"):
-        return convert_phase(value, code)
-
-    # --- Alarmas ---
-    if code.startswith("alarm_set"):
-        try:
-            decoded = base64.b64decode(value)
-            raw_int = int.from_bytes(decoded, "little")
-            return f"Alarm bits: {bin(raw_int)}"
-        except Exception:
-            return value
-
-    # Otros valores se devuelven tal cual
-    return value
+DECODER = PhaseDecoder()
+
+
+def convert_phase(raw_b64: str):
+    """Convierte un phase_a/b/c (base64) con el mismo decodificador que el resto del paquete."""
+    phases = DECODER.decode([DEVICE_ID], [raw_b64])
+    if not phases.valid[0]:
+        return raw_b64
+    return f"{phases.voltage[0]:.1f} V, {phases.current[0]:.3f} A, {phases.power[0]:.3f} kW"
+
+
+def alarm_bits(raw_b64: str):
+    """Muestra un alarm_set_* (base64) como bits."""
+    try:
+        raw_int = int.from_bytes(base64.b64decode(raw_b64), "little")
+        return f"Alarm bits: {bin(raw_int)}"
+    except ValueError:
+        return raw_b64
+
+
+# Escalas, unidades y enums salen de /specifications; sólo se sobreescriben los DP Raw.
+OVERRIDES = {
+    "phase_a": convert_phase,
+    "phase_b": convert_phase,
+    "phase_c": convert_phase,
+    "alarm_set_1": alarm_bits,
+    "alarm_set_2": alarm_bits,
+}
 
 
 def main():
@@ -85,10 +66,12 @@ def main():
     print(data)
 
     if "result" in data:
+        registry = ConverterRegistry(client, overrides=OVERRIDES)
+        readable = registry.for_device(DEVICE_ID).format(data["result"])
+
         print("\n📊 Valores convertidos:")
-        for item in data["result"]:
-            readable = convert_status(item["code"], item["value"])
-            print(f" - {item['code']}: {readable}")
+        for code, value in readable.items():
+            print(f" - {code}: {value}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CLIENT_ID = "test_client_id"
+SECRET = "test_secret_0123456789abcdef0123"
+
+
+@pytest.fixture
+def sim():
+    """Simulador local con pocos equipos (requiere aiohttp)."""
+    pytest.importorskip("aiohttp")
+    from tuya_client.simulator import TuyaSimulator
+
+    with TuyaSimulator({CLIENT_ID: SECRET}, devices=45, seed=7) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def client(sim):
+    from tuya_client import TuyaClient
+
+    return TuyaClient(CLIENT_ID, SECRET, sim.base_url)
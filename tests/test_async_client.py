@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from conftest import CLIENT_ID, SECRET  # noqa: E402
+from tuya_client import AsyncTuyaClient  # noqa: E402
+
+
+def test_gather_status_signs_and_fetches_token_once(sim):
+    ids = sim.device_ids[:10]
+
+    async def run():
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url) as client:
+            return await client.gather_status(ids, concurrency=10)
+
+    results = asyncio.run(run())
+    assert set(results) == set(ids)
+    assert all(resp["success"] for resp in results.values())
+    assert {item["code"] for item in results[ids[0]]["result"]} >= {"switch", "balance_energy"}
+    assert sim.stats["tokens_issued"] == 1  # las corrutinas concurrentes comparten una renovación
+    assert sim.stats["sign_errors"] == sim.stats["token_errors"] == 0
+
+
+def test_get_status_many_batches_requests(sim):
+    async def run():
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url) as client:
+            return await client.get_status_many(sim.device_ids, compact=True)
+
+    results = asyncio.run(run())
+    assert len(results) == len(sim.device_ids) and all(resp["success"] for resp in results.values())
+    assert "switch" in results[sim.device_ids[0]]["result"]
+    assert sim.stats["requests"] == 1 + 3  # token + 3 lotes de 20
+
+
+def test_refresh_token_keeps_requests_signed(sim):
+    device_id = sim.device_ids[0]
+
+    async def run():
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url) as client:
+            await client.get_token()
+            old = client.tokens.token.access_token
+            await client.refresh_token()
+            assert client.tokens.token.access_token != old
+            return await client.request("GET", f"/v1.0/devices/{device_id}/status")
+
+    assert asyncio.run(run())["success"]
+    assert sim.stats["sign_errors"] == sim.stats["token_errors"] == 0
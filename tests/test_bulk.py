@@ -0,0 +1,46 @@
+from tuya_client.bulk import INTENT, SENT, UNCERTAIN, BulkCommandRunner, Journal, recharge_ops
+
+
+def test_journal_ignores_and_trims_torn_last_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with Journal(str(path)) as journal:
+        journal.write("a", INTENT)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op_id":"b","sta')  # corte a mitad de escribir
+
+    with Journal(str(path)) as journal:
+        assert journal.state("a") == INTENT
+        assert journal.state("b") is None
+        journal.write("c", INTENT)
+    with Journal(str(path)) as journal:
+        assert journal.state("a") == INTENT
+        assert journal.state("c") == INTENT  # no se pegó al fragmento
+
+
+def test_journal_keeps_complete_record_without_newline(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"op_id":"a","state":"sent"}', encoding="utf-8")
+    with Journal(str(path)) as journal:
+        assert journal.state("a") == SENT
+        journal.write("b", INTENT)
+    with Journal(str(path)) as journal:
+        assert journal.state("a") == SENT
+        assert journal.state("b") == INTENT
+
+
+def test_resume_after_torn_line_never_resends_recharge(client, sim, tmp_path):
+    path = tmp_path / "journal.jsonl"
+    first, second = sim.device_ids[:2]
+    ops = recharge_ops({first: 1000, second: 1000}, "lote1")
+    path.write_text('{"op_id":"lote0:x","state":"se', encoding="utf-8")  # corte de una ejecución anterior
+
+    # La ejecución se corta justo tras anotar la intención de la primera recarga.
+    with Journal(str(path)) as journal:
+        journal.write(ops[0].op_id, INTENT, device_id=first, code=ops[0].code, value=ops[0].value, before=None)
+
+    with Journal(str(path)) as journal:
+        assert journal.state(ops[0].op_id) == INTENT
+        states = BulkCommandRunner(client, journal, verify=False).run(ops)
+    assert states[ops[0].op_id] == UNCERTAIN  # sin confirmar, pero no se reenvía
+    assert states[ops[1].op_id] == SENT
+    assert sim.stats["commands"] == 1
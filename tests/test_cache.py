@@ -0,0 +1,66 @@
+import time
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import ResponseCache, TuyaClient
+
+
+def _client(sim, cache):
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, cache=cache)
+    client.get_token()
+    return client
+
+
+def test_metadata_is_cached_but_status_is_not(sim):
+    cache = ResponseCache()
+    client = _client(sim, cache)
+    device_id = sim.device_ids[0]
+    before = sim.stats["requests"]
+    first = client.decode(client.request("GET", f"/v1.0/devices/{device_id}"))
+    second = client.decode(client.request("GET", f"/v1.0/devices/{device_id}"))
+    assert first == second and first["result"]["id"] == device_id
+    client.request("GET", f"/v1.0/devices/{device_id}/status")
+    client.request("GET", f"/v1.0/devices/{device_id}/status")
+    assert sim.stats["requests"] == before + 3
+    assert cache.stats()["hits"] == 1
+
+
+def test_command_invalidates_the_device_entries(sim):
+    cache = ResponseCache()
+    client = _client(sim, cache)
+    device_id, other = sim.device_ids[:2]
+    client.request("GET", f"/v1.0/devices/{device_id}")
+    client.request("GET", f"/v1.0/devices/{other}")
+    client.request(
+        "POST",
+        f"/v1.0/devices/{device_id}/commands",
+        body={"commands": [{"code": "switch", "value": True}]},
+        headers={"Content-Type": "application/json"},
+    )
+    assert cache.invalidations == 1
+    assert cache.lookup(f"/v1.0/devices/{device_id}")[0] is None
+    assert cache.lookup(f"/v1.0/devices/{other}")[0] is not None
+
+
+def test_expired_entry_is_served_stale_and_refreshed(sim):
+    cache = ResponseCache([(r"^/v1\.0/devices/[^/]+$", 0.0)], stale_ttl=60.0)
+    client = _client(sim, cache)
+    device_id = sim.device_ids[0]
+    client.request("GET", f"/v1.0/devices/{device_id}")
+    before = sim.stats["requests"]
+    assert client.decode(client.request("GET", f"/v1.0/devices/{device_id}"))["success"]
+    assert cache.stale_hits == 1
+    deadline = time.monotonic() + 5
+    while sim.stats["requests"] == before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sim.stats["requests"] == before + 1  # una sola revalidación en segundo plano
+
+
+def test_lru_eviction_by_size():
+    cache = ResponseCache([(r".*", 60.0)], max_bytes=3 * (100 + 256))
+    for i in range(3):
+        cache.store(f"/v1.0/devices/d{i}", b"x" * 100)
+    cache.lookup("/v1.0/devices/d0")  # d0 pasa a ser la más reciente
+    cache.store("/v1.0/devices/d3", b"x" * 100)
+    assert cache.evictions == 1
+    assert cache.lookup("/v1.0/devices/d1")[0] is None
+    assert cache.lookup("/v1.0/devices/d0")[0] is not None
@@ -0,0 +1,47 @@
+import pytest
+
+from tuya_client.commands import CommandDispatcher
+from tuya_client.errors import TuyaAPIError
+
+
+def test_commands_within_window_share_one_post(client, sim):
+    device_id = sim.device_ids[0]
+    with CommandDispatcher(client, window=0.2) as dispatcher:
+        first = dispatcher.send(device_id, "switch_prepayment", True)
+        second = dispatcher.send(device_id, "switch", True)
+        assert first.result(5) is second.result(5)
+    assert dispatcher.sent == 1
+    assert sim.stats["commands"] == 2
+    assert sim.devices[device_id].switch_prepayment and sim.devices[device_id].switch
+
+
+def test_last_write_wins_per_code(client, sim):
+    device_id = sim.device_ids[0]
+    with CommandDispatcher(client, window=0.2) as dispatcher:
+        futures = dispatcher.send_many(device_id, [("switch", False), ("switch", True)])
+        assert all(f.result(5)["success"] for f in futures)
+    assert (dispatcher.sent, dispatcher.merged) == (1, 1)
+    assert sim.stats["commands"] == 1
+    assert sim.devices[device_id].switch is True
+
+
+def test_charge_energy_is_never_collapsed(client, sim):
+    breaker = sim.devices[sim.device_ids[0]]
+    breaker.switch = False  # sin consumo: el saldo sólo cambia por las recargas
+    before = breaker.balance_wh
+    with CommandDispatcher(client, window=0.2) as dispatcher:
+        futures = dispatcher.send_many(breaker.device_id, [("charge_energy", 1000), ("charge_energy", 1000)])
+        for future in futures:
+            future.result(5)
+    assert (dispatcher.sent, dispatcher.merged) == (2, 0)
+    assert breaker.balance_wh == pytest.approx(before + 2000)
+
+
+def test_futures_fail_only_for_the_rejected_batch(client, sim):
+    good, bad = sim.device_ids[:2]
+    with CommandDispatcher(client, window=0.05) as dispatcher:
+        ok = dispatcher.send(good, "switch", True)
+        rejected = dispatcher.send(bad, "charge_energy", -1)  # el simulador no acepta recargas negativas
+        assert ok.result(5)["success"]
+        with pytest.raises(TuyaAPIError):
+            rejected.result(5)
@@ -0,0 +1,41 @@
+import pickle
+
+from tuya_client.status import DeviceStatus
+
+RESULT = [{"code": "switch", "value": True}, {"code": "cur_power", "value": 1234}, {"code": "phase_a", "value": "CQ=="}]
+
+
+def test_mapping_contract():
+    status = DeviceStatus.from_result(RESULT, t=1)
+    assert list(status.keys()) == ["switch", "cur_power", "phase_a"]
+    assert list(status.values()) == [True, 1234, "CQ=="]
+    assert list(status.items()) == [(item["code"], item["value"]) for item in RESULT]
+    assert status["cur_power"] == 1234
+    assert status.get("missing", 0) == 0
+    assert "switch" in status and len(status) == 3
+    assert status == {"switch": True, "cur_power": 1234, "phase_a": "CQ=="}
+
+
+def test_raw_and_pickle_share_layout():
+    status = DeviceStatus.from_result(RESULT, t=5)
+    assert status.raw == RESULT
+    other = DeviceStatus.from_result(RESULT)
+    assert status.codes is other.codes
+    copy = pickle.loads(pickle.dumps(status))
+    assert copy.to_dict() == status.to_dict() and copy.t == 5
+    assert copy.codes is status.codes
+
+
+def test_compact_bulk_status(client, sim):
+    results = client.get_status_many(sim.device_ids[:3], compact=True)
+    for resp in results.values():
+        assert isinstance(resp["result"], DeviceStatus)
+        assert isinstance(resp["result"]["switch"], bool)
+        assert len(list(resp["result"].values())) == len(resp["result"])
+
+
+def test_repeated_code_keeps_last_value():
+    status = DeviceStatus.from_result(RESULT + [{"code": "switch", "value": False}])
+    assert len(status) == 3 and list(status) == ["switch", "cur_power", "phase_a"]
+    assert status["switch"] is False
+    assert status.raw == [{"code": "switch", "value": False}] + RESULT[1:]
@@ -0,0 +1,77 @@
+import threading
+
+import requests
+
+from tuya_client.groups import GROUP_PROPERTIES_PATH, DeviceGroups
+
+SWITCH_OFF = [{"code": "switch", "value": False}]
+
+
+def test_same_product_devices_share_one_group_command(client, sim):
+    ids = sim.device_ids[:10]
+    with DeviceGroups(client, "space-1") as groups:
+        results = client.send_commands_many(ids, SWITCH_OFF, groups=groups)
+        again = groups.send(ids, SWITCH_OFF)  # el grupo se reutiliza
+        assert groups.stats == {"group_commands": 2, "groups_created": 1, "fallback": 0}
+    assert all(resp["success"] and resp["group_id"] == results[ids[0]]["group_id"] for resp in results.values())
+    assert all(resp["success"] for resp in again.values())
+    assert not any(sim.devices[d].switch for d in ids)
+    assert sim.groups == {}  # close() borra los grupos creados
+
+
+def test_below_min_size_goes_device_by_device(client, sim):
+    ids = sim.device_ids[:2]
+    with DeviceGroups(client, "space-1", min_size=3) as groups:
+        results = groups.send(ids, SWITCH_OFF)
+        assert groups.stats["fallback"] == 2 and groups.stats["groups_created"] == 0
+    assert all(resp["success"] and "group_id" not in resp for resp in results.values())
+    assert sim.stats["group_commands"] == 0
+
+
+def test_verify_resends_devices_that_did_not_apply(client, sim):
+    ids = sim.device_ids[:5]
+    for device_id in ids:
+        sim.devices[device_id].switch = True
+    sim.devices[ids[0]].online = False  # el grupo lo acepta, pero no lo aplica
+    with DeviceGroups(client, "space-1") as groups:
+        results = groups.send(ids, SWITCH_OFF, verify=True)
+        assert groups.stats["fallback"] == 1
+    assert results[ids[0]]["success"] is False and "group_id" not in results[ids[0]]  # reintento individual
+    assert all(results[d]["success"] and "group_id" in results[d] for d in ids[1:])
+
+
+def test_charge_energy_is_not_resent_after_a_cut(client, sim, monkeypatch):
+    ids = sim.device_ids[:5]
+    request = client.request
+
+    def cut(method, path, **kwargs):
+        if path == GROUP_PROPERTIES_PATH:
+            raise requests.ReadTimeout("sin respuesta")
+        return request(method, path, **kwargs)
+
+    monkeypatch.setattr(client, "request", cut)
+    with DeviceGroups(client, "space-1") as groups:
+        charged = groups.send(ids, [{"code": "charge_energy", "value": 1000}])
+        switched = groups.send(ids, SWITCH_OFF)
+    assert all(not resp["success"] and "group_id" in resp for resp in charged.values())
+    assert all(resp["success"] and "group_id" not in resp for resp in switched.values())  # idempotente: uno a uno
+    assert sim.stats["commands"] == len(ids)  # sólo los switch
+
+
+def test_concurrent_sends_create_one_group(client, sim):
+    ids = sim.device_ids[:10]
+    with DeviceGroups(client, "space-1") as groups:
+        barrier = threading.Barrier(4)
+
+        def send():
+            barrier.wait()
+            groups.send(ids, SWITCH_OFF)
+
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert groups.stats["groups_created"] == 1 and groups.stats["group_commands"] == 4
+        assert len(sim.groups) == 1
+    assert sim.groups == {}
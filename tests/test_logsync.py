@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+from tuya_client.logsync import Checkpoint, LogStore, ReportLogSync
+
+T0 = 1_700_000_040_000  # múltiplo de un minuto (intervalo de los informes del simulador)
+HOUR = 3_600_000
+CODES = ["cur_power", "balance_energy"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LogStore(str(tmp_path / "informes.db"))
+    yield store
+    store.close()
+
+
+def _sync(client, store):
+    return ReportLogSync(client, store, CODES, since=T0, overlap=0, workers=2)
+
+
+def test_incremental_sync_only_adds_new_reports(client, sim, store):
+    ids = sim.device_ids[:2]
+    first = _sync(client, store).run(ids, now=T0 + HOUR)
+    assert first == {d: 61 * len(CODES) for d in ids}  # un informe por minuto, ambos extremos incluidos
+    assert store.checkpoint(ids[0]) == Checkpoint(T0 + HOUR)
+
+    second = _sync(client, store).run(ids, now=T0 + 2 * HOUR)
+    assert second == {d: 60 * len(CODES) for d in ids}
+    rows = store.query(ids[0], "cur_power")
+    assert [t for _, t, _ in rows] == list(range(T0, T0 + 2 * HOUR + 1, 60_000))
+
+
+def test_rerun_adds_no_duplicates(client, sim, store):
+    device_id = sim.device_ids[0]
+    _sync(client, store).run([device_id], now=T0 + HOUR)
+    sync = ReportLogSync(client, store, CODES, since=T0, overlap=3600, workers=1)  # vuelve a pedir la hora entera
+    assert sync.run([device_id], now=T0 + HOUR) == {device_id: 0}
+    assert len(store.query(device_id)) == 61 * len(CODES)
+
+
+def test_interrupted_window_resumes_from_row_key(client, sim, store, monkeypatch):
+    device_id = sim.device_ids[0]
+    now = T0 + 3 * HOUR  # 181 * 2 informes -> 4 páginas de 100
+    cursors = []
+    fail_at = [3]
+    request = client.request
+
+    def flaky(method, path, **kwargs):
+        if "report-logs" in path:
+            cursors.append(kwargs["query"].get("last_row_key"))
+            if len(cursors) == fail_at[0]:
+                raise ConnectionError("corte")
+        return request(method, path, **kwargs)
+
+    monkeypatch.setattr(client, "request", flaky)
+    sync = _sync(client, store)
+    assert sync.run([device_id], now=now) == {device_id: 200}
+    assert isinstance(sync.errors[device_id], ConnectionError)
+    assert store.checkpoint(device_id).row_key == "200"
+
+    cursors.clear()
+    fail_at[0] = 0
+    assert _sync(client, store).run([device_id], now=now) == {device_id: 162}
+    assert cursors == ["200", "300"]  # sólo las páginas que faltaban
+    assert len(store.query(device_id)) == 181 * len(CODES)
+
+
+def test_same_millisecond_with_other_value_is_reported(store, caplog):
+    with caplog.at_level(logging.WARNING, logger="tuya_client.logsync"):
+        added = store.write([("dev", [("cur_power", T0, 10), ("cur_power", T0, 12), ("cur_power", T0, 10)], Checkpoint(T0))])
+    assert added == {"dev": 1}
+    assert store.collisions == 1
+    assert "cur_power" in caplog.text
+    assert store.query("dev") == [("cur_power", T0, 10)]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("cryptography")
+
+from tuya_client.broker import LocalMessageBroker  # noqa: E402
+from tuya_client.messaging import MessageSubscriber  # noqa: E402
+
+from conftest import CLIENT_ID, SECRET  # noqa: E402
+
+
+async def _first(subscriber):
+    async for event in subscriber:
+        return event
+
+
+async def _consume(body, **kwargs):
+    """Ejecuta ``body`` con un suscriptor y devuelve ``(broker, message_id, evento reentregado o None)``."""
+    async with LocalMessageBroker(CLIENT_ID, SECRET) as broker:
+        message_id = await broker.publish({"devId": "abc", "status": [{"code": "switch", "value": True}]})
+        subscriber = MessageSubscriber(CLIENT_ID, SECRET, broker.ws_url, ack_interval=60, **kwargs)
+        try:
+            try:
+                await body(subscriber)
+            finally:
+                await subscriber.close()
+        except RuntimeError:
+            pass
+        for _ in range(25):
+            if not broker.unacked:
+                break
+            await asyncio.sleep(0.02)
+        redelivered = None
+        if broker.unacked:  # un consumidor nuevo recibe lo pendiente al conectar
+            async with MessageSubscriber(CLIENT_ID, SECRET, broker.ws_url, ack_interval=60) as again:
+                redelivered = await asyncio.wait_for(_first(again), 5)
+        return broker, message_id, redelivered
+
+
+def test_break_acks_last_event():
+    async def body(subscriber):
+        async for event in subscriber:
+            assert event.data["devId"] == "abc"
+            break
+
+    broker, _, redelivered = asyncio.run(_consume(body))
+    assert broker.acked == 1 and redelivered is None
+
+
+def test_error_in_body_redelivers_event():
+    async def body(subscriber):
+        async for _ in subscriber:
+            raise RuntimeError("fallo al procesar")
+
+    broker, message_id, redelivered = asyncio.run(_consume(body))
+    assert redelivered is not None and redelivered.message_id == message_id
+    assert broker.acked == 1  # sólo el ACK de la segunda entrega
+
+
+def test_failed_callback_redelivers_event():
+    async def body(subscriber):
+        def broken(event):
+            raise RuntimeError("callback roto")
+
+        subscriber.on_message(broken)
+        await subscriber.run()
+
+    _, message_id, redelivered = asyncio.run(_consume(body))
+    assert redelivered is not None and redelivered.message_id == message_id
+
+
+def test_manual_ack():
+    async def body(subscriber):
+        async for event in subscriber:
+            subscriber.ack(event)
+            break
+
+    assert asyncio.run(_consume(body, auto_ack=False))[2] is None
+
+    async def unacked(subscriber):
+        async for _ in subscriber:
+            break
+
+    _, message_id, redelivered = asyncio.run(_consume(unacked, auto_ack=False))
+    assert redelivered.message_id == message_id
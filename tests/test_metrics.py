@@ -0,0 +1,50 @@
+import urllib.request
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import MetricsCollector, ResponseCache, TuyaClient
+from tuya_client.metrics import endpoint_template
+
+
+def test_endpoint_template_normalizes_ids():
+    assert endpoint_template("/v1.0/devices/simbrk0000000000000001/status?x=1") == "/v1.0/devices/{device_id}/status"
+    assert endpoint_template("/v1.0/token/abcdef0123456789") == "/v1.0/token/{refresh_token}"
+    assert endpoint_template("/v1.0/token") == "/v1.0/token"
+
+
+def test_hooks_see_every_attempt_with_timings(sim):
+    events = []
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, hooks=[events.append])
+    device_id = sim.device_ids[0]
+    client.request("GET", f"/v1.0/devices/{device_id}/status")
+    client.request("GET", "/v1.0/devices/unknown0000000000000001/status")
+    endpoints = [(e.endpoint, e.success) for e in events]
+    assert endpoints == [
+        ("/v1.0/token", True),
+        ("/v1.0/devices/{device_id}/status", True),
+        ("/v1.0/devices/{device_id}/status", False),
+    ]
+    assert events[-1].code is not None and events[-1].status == 200
+    assert {"sign", "http", "total"} <= set(events[1].timings)
+
+
+def test_collector_renders_prometheus_text(sim):
+    collector = MetricsCollector()
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, hooks=[collector], cache=ResponseCache())
+    device_id = sim.device_ids[0]
+    client.request("GET", f"/v1.0/devices/{device_id}")
+    client.request("GET", f"/v1.0/devices/{device_id}")  # de la caché
+    sim.error_rate = 1.0
+    client.request("GET", f"/v1.0/devices/{device_id}/status")
+
+    text = collector.render()
+    assert 'tuya_requests_total{method="GET",endpoint="/v1.0/devices/{device_id}",status="200"} 1' in text
+    assert 'tuya_cache_hits_total{endpoint="/v1.0/devices/{device_id}"} 1' in text
+    assert 'tuya_api_errors_total{endpoint="/v1.0/devices/{device_id}/status",code="500"} 1' in text
+    assert 'tuya_request_duration_seconds_count{method="GET",endpoint="/v1.0/token"} 1' in text
+
+    server = collector.serve(port=0, addr="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as resp:
+            assert "tuya_requests_total" in resp.read().decode()
+    finally:
+        server.shutdown()
@@ -0,0 +1,21 @@
+from tuya_client.pagination import ASSOCIATED_USER_DEVICES, PageSpec
+
+
+def test_iter_items_walks_all_pages(client, sim):
+    devices = list(client.iter_items(ASSOCIATED_USER_DEVICES))
+    assert [d["id"] for d in devices] == sim.device_ids
+    assert all(d["product_id"] for d in devices)
+
+
+def test_pages_resume_from_cursor(client, sim):
+    pages = list(client.pages(ASSOCIATED_USER_DEVICES, prefetch=False))
+    assert len(pages) == 3  # 45 equipos en páginas de 20
+    assert pages[-1].next_cursor is None
+    resumed = list(client.pages(ASSOCIATED_USER_DEVICES, cursor=pages[1].cursor))
+    assert [p.items for p in resumed] == [p.items for p in pages[1:]]
+
+
+def test_page_size_query(client, sim):
+    spec = PageSpec(ASSOCIATED_USER_DEVICES.path, items_key="devices", page_size=50)
+    pages = list(client.pages(spec))
+    assert len(pages) == 1 and len(pages[0].items) == len(sim.device_ids)
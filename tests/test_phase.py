@@ -0,0 +1,28 @@
+import base64
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tuya_client.phase import PhaseDecoder, b64_matrix  # noqa: E402
+
+
+def _phase(voltage_dv: int, current_ma: int, power_w: int) -> str:
+    raw = voltage_dv.to_bytes(2, "big") + current_ma.to_bytes(3, "big") + power_w.to_bytes(3, "big")
+    return base64.b64encode(raw).decode()
+
+
+def test_b64_matrix_marks_bad_rows_without_failing_the_batch():
+    good = _phase(2301, 1500, 345)
+    payloads = [good, "ññññññññññññ", good, None, "!!!!!!!!!!!!"]
+    matrix, lengths = b64_matrix(payloads, 8)
+    assert lengths.tolist() == [8, 0, 8, 0, 0]
+    assert matrix[0].tobytes() == base64.b64decode(good)
+
+
+def test_phase_decoder_gives_nan_for_non_ascii_payload():
+    payloads = [_phase(2301, 1500, 345)] * 3 + ["é" * 12]
+    result = PhaseDecoder().decode(["a", "a", "a", "b"], payloads)
+    assert result.valid.tolist() == [True, True, True, False]
+    assert result.voltage[0] == pytest.approx(230.1)
+    assert np.isnan(result.voltage[3])
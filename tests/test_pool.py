@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import RetryPolicy, TuyaClient, TuyaClientPool
+from tuya_client.pool import ShardUnavailableError
+
+
+@pytest.fixture
+def other():
+    """Segundo proyecto con sus propios equipos."""
+    pytest.importorskip("aiohttp")
+    from tuya_client.simulator import TuyaSimulator
+
+    with TuyaSimulator({CLIENT_ID: SECRET}, devices=[f"othbrk{i:016d}" for i in range(25)], seed=3) as simulator:
+        yield simulator
+
+
+def test_routes_devices_to_their_project(client, sim, other):
+    pool = TuyaClientPool({"a": client, "b": TuyaClient(CLIENT_ID, SECRET, other.base_url)})
+    ids = sim.device_ids[:30] + other.device_ids
+    results = pool.get_status_many(ids)
+    assert all(results[d]["success"] for d in ids)
+    assert {pool.index[d] for d in sim.device_ids[:30]} == {"a"}
+    assert {pool.index[d] for d in other.device_ids} == {"b"}
+    assert pool.route(other.device_ids[0]) == ["b"]
+
+
+def test_request_fails_over_when_shard_is_down(sim):
+    device_id = sim.device_ids[0]
+    dead = TuyaClient(CLIENT_ID, SECRET, "http://127.0.0.1:9")
+    pool = TuyaClientPool({"a": dead, "b": TuyaClient(CLIENT_ID, SECRET, sim.base_url)}, failover={"a": ["b"]})
+    pool.register(device_id, "a")
+    assert pool.request(device_id, "GET", f"/v1.0/devices/{device_id}/status").json()["success"]
+    assert pool.route(device_id) == ["b", "a"]  # "a" queda en cuarentena
+
+
+def test_bulk_falls_back_when_token_renewal_fails(sim):
+    broken = TuyaClient(CLIENT_ID, "wrong_secret", sim.base_url)  # el token se rechaza
+    pool = TuyaClientPool({"a": broken, "b": TuyaClient(CLIENT_ID, SECRET, sim.base_url)}, failover={"a": ["b"]})
+    for device_id in sim.device_ids:
+        pool.register(device_id, "a")
+    results = pool.get_status_many(sim.device_ids)
+    assert all(resp["success"] for resp in results.values())
+
+
+def test_bulk_reports_api_errors_per_device(sim):
+    strict = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=RetryPolicy(max_attempts=1, raise_on_error=True))
+    strict.get_token()
+    pool = TuyaClientPool({"a": strict})
+    for device_id in sim.device_ids:
+        pool.register(device_id, "a")
+    sim.error_rate = 1.0
+    results = pool.get_status_many(sim.device_ids)
+    assert all(resp["success"] is False and resp["code"] == 500 for resp in results.values())
+
+
+def test_unknown_device_is_not_rediscovered(client, sim):
+    pool = TuyaClientPool({"a": client})
+    with pytest.raises(ShardUnavailableError):
+        pool.route("nope")
+    requests_before = sim.stats["requests"]
+    with pytest.raises(ShardUnavailableError):
+        pool.route("nope")
+    assert sim.stats["requests"] == requests_before
+    pool.register("nope", "a")
+    assert pool.route("nope") == ["a"]
@@ -0,0 +1,35 @@
+from conftest import CLIENT_ID, SECRET
+from tuya_client import TuyaClient
+
+
+def _client() -> TuyaClient:
+    client = TuyaClient(CLIENT_ID, SECRET, "http://localhost")
+    client.access_token = "tok"
+    return client
+
+
+def test_prepared_signature_matches_signed_request(monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1_700_000_000.0)
+    client = _client()
+    call = client.prepare("GET", "/v1.0/devices/{device_id}/logs", query_keys=["type", "start_time"])
+    query = {"start_time": 1, "type": "7"}
+    url, headers, _ = call.sign(query=query, nonce="n", device_id="d1")
+    expected_url, expected, _ = client._signed_request("GET", "/v1.0/devices/d1/logs", query, None, None, None, "n")
+    assert url == expected_url
+    assert headers["sign"] == expected["sign"]
+
+
+def test_prepared_query_with_other_keys_falls_back():
+    client = _client()
+    call = client.prepare("GET", "/v1.0/devices/{device_id}/logs", query_keys=["type", "start_time"])
+    url, _, _ = call.sign(query={"type": "7", "size": 20}, device_id="d1")  # mismo número de claves, otras claves
+    assert url == "http://localhost/v1.0/devices/d1/logs?size=20&type=7"
+
+
+def test_prepared_call_against_simulator(client, sim):
+    client.get_token()
+    status = client.prepare("GET", "/v1.0/devices/{device_id}/status")
+    assert client.decode(status(device_id=sim.device_ids[0]))["success"]
+    bulk = client.prepare("GET", "/v1.0/iot-03/devices/status", query_keys=["device_ids"])
+    assert client.decode(bulk(query={"device_ids": ",".join(sim.device_ids[:3])}))["success"]
+    assert sim.stats["sign_errors"] == 0
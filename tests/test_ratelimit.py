@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import RateLimiter, TuyaClient
+from tuya_client.ratelimit import TokenBucket
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _bucket(rate, capacity):
+    bucket = TokenBucket(rate, capacity)
+    bucket._clock = clock = Clock()
+    bucket._state[1] = clock.now
+    return bucket, clock
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket, clock = _bucket(10.0, 3.0)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.1)
+    clock.now += 0.1
+    assert bucket.try_acquire() == 0.0
+
+
+def test_penalize_pauses_and_halves_rate_then_recovers():
+    bucket, clock = _bucket(10.0, 3.0)
+    bucket.penalize(2.0)
+    assert bucket.try_acquire() == pytest.approx(2.0)
+    assert bucket.effective_rate == pytest.approx(5.0)
+    for _ in range(25):
+        bucket.reward()
+    assert bucket.effective_rate == pytest.approx(10.0)
+
+
+def test_detects_rate_limit_responses():
+    limiter = RateLimiter(rate_limit_codes=[40000309])
+    assert limiter.is_rate_limited(429, None)
+    assert limiter.is_rate_limited(200, {"success": False, "code": 40000309, "msg": "x"})
+    assert limiter.is_rate_limited(200, {"success": False, "code": 1, "msg": "Request frequency too high"})
+    assert not limiter.is_rate_limited(200, {"success": False, "code": 1010, "msg": "token invalid"})
+    assert RateLimiter.classify("GET", "/v1.0/token") == "token"
+    assert RateLimiter.classify("POST", "/v1.0/devices/x/commands") == "command"
+
+
+def test_client_stays_under_the_server_quota(sim):
+    sim.rate_limit = 20.0
+    limiter = RateLimiter({"*": (15.0, 5.0), "read": (15.0, 5.0)})
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, rate_limiter=limiter)
+    device_id = sim.device_ids[0]
+    started = time.monotonic()
+    for _ in range(20):
+        assert client.decode(client.request("GET", f"/v1.0/devices/{device_id}/status"))["success"]
+    assert time.monotonic() - started >= (20 - 5) / 15.0 * 0.9
+    assert sim.stats["rate_limited"] == 0
+
+
+def test_server_rate_limit_penalizes_the_bucket(sim):
+    sim.rate_limit = 2.0
+    limiter = RateLimiter({"*": (1000.0, 1000.0), "read": (1000.0, 1000.0)}, backoff=0.01, max_backoff=0.01)
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, rate_limiter=limiter)
+    device_id = sim.device_ids[0]
+    client.get_token()
+    responses = [client.decode(client.request("GET", f"/v1.0/devices/{device_id}/status")) for _ in range(5)]
+    assert any(resp.get("code") == 40000309 for resp in responses)
+    assert limiter.bucket(CLIENT_ID, "read").effective_rate < 1000.0
+
+
+def test_shared_dir_splits_the_budget_between_limiters(tmp_path):
+    limits = {"*": (1.0, 2.0), "read": (1.0, 2.0)}
+    first = RateLimiter(limits, shared_dir=str(tmp_path))
+    second = RateLimiter(limits, shared_dir=str(tmp_path))
+    assert first.bucket("cid", "read").try_acquire() == 0.0
+    assert first.bucket("cid", "read").try_acquire() == 0.0
+    assert second.bucket("cid", "read").try_acquire() > 0  # la ráfaga ya la gastó el otro proceso
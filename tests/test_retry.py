@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import CircuitBreaker, CircuitOpenError, RetryPolicy, TuyaClient
+
+
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()  # sonda del semiabierto
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # sólo una sonda a la vez
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_recovers_after_probe_raising_unexpected_error(sim, monkeypatch):
+    policy = RetryPolicy(max_attempts=1, failure_threshold=1, reset_timeout=0.0)
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy)
+    device_id = sim.device_ids[0]
+    policy.breaker(client.base_url).record(False)
+
+    def broken() -> None:
+        raise ValueError("respuesta inesperada")
+
+    monkeypatch.setattr(client, "_ensure_token", broken)
+    with pytest.raises(ValueError):
+        client.request("GET", f"/v1.0/devices/{device_id}/status")
+    monkeypatch.undo()
+
+    assert client.decode(client.request("GET", f"/v1.0/devices/{device_id}/status"))["success"]
+    assert policy.breaker(client.base_url).state == CircuitBreaker.CLOSED
+
+
+def test_breaker_recovers_after_token_refresh_gets_html_503(sim):
+    policy = RetryPolicy(max_attempts=1, failure_threshold=1, reset_timeout=0.0)
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy)
+    policy.breaker(client.base_url).record(False)
+    sim.failure_rate = 1.0  # la sonda renueva el token y recibe un 503 en texto
+    with pytest.raises(ValueError):
+        client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status")
+    sim.failure_rate = 0.0
+    assert client.decode(client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status"))["success"]
+
+
+def test_sync_retries_5xx_and_counts_failures(sim):
+    policy = RetryPolicy(max_attempts=3, backoff=0.0, failure_threshold=10)
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy)
+    client.get_token()
+    sim.failure_rate = 1.0
+    response = client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status")
+    assert response.status_code == 503
+    assert sim.stats["injected_failures"] == 3
+    assert policy.breaker(client.base_url).failures == 3
+
+
+def test_async_non_json_5xx_is_retried_and_counted(sim):
+    pytest.importorskip("aiohttp")
+    from tuya_client import AsyncTuyaClient
+
+    policy = RetryPolicy(max_attempts=3, backoff=0.0, failure_threshold=10)
+
+    async def run() -> dict:
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy) as client:
+            await client.get_token()
+            sim.failure_rate = 1.0
+            return await client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status")
+
+    data = asyncio.run(run())
+    assert data["success"] is False
+    assert "503" in data["msg"]
+    assert sim.stats["injected_failures"] == 3
+    assert policy.breaker(sim.base_url).failures == 3
+
+
+def test_async_breaker_recovers_after_unexpected_probe_error(sim):
+    pytest.importorskip("aiohttp")
+    from tuya_client import AsyncTuyaClient
+
+    policy = RetryPolicy(max_attempts=1, failure_threshold=1, reset_timeout=0.0)
+
+    async def run() -> dict:
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy) as client:
+            await client.get_token()
+            policy.breaker(client.base_url).record(False)
+            original = client._ensure_token
+
+            async def broken() -> None:
+                raise RuntimeError("fallo inesperado")
+
+            client._ensure_token = broken
+            with pytest.raises(RuntimeError):
+                await client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status")
+            client._ensure_token = original
+            return await client.request("GET", f"/v1.0/devices/{sim.device_ids[0]}/status")
+
+    assert asyncio.run(run())["success"]
@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tuya_client.rollups import HOUR_MS, EnergyRollups  # noqa: E402
+
+T0 = 1_788_000_000_000 - 1_788_000_000_000 % HOUR_MS  # inicio de una hora
+MIN = 60_000
+
+
+def test_counter_difference_and_reset():
+    rollups = EnergyRollups()
+    rollups.update(["a"], T0, total_forward_energy=[100.0])
+    rollups.update(["a"], T0 + 10 * MIN, total_forward_energy=[101.5])
+    rollups.update(["a"], T0 + 20 * MIN, total_forward_energy=[0.5])  # el contador se reinicia
+    assert rollups.consumption("a", "hour", T0) == pytest.approx(2.0)
+    assert rollups.anomalies == 0
+
+
+def test_known_and_unexplained_recharges():
+    rollups = EnergyRollups()
+    rollups.update(["a", "b"], T0, balance_energy=[10.0, 10.0])
+    rollups.recharge("a", 5.0, T0 + MIN)
+    rollups.update(["a", "b"], T0 + 10 * MIN, balance_energy=[14.0, 13.0])
+    assert rollups.consumption("a", "hour", T0) == pytest.approx(1.0)  # 10 + 5 - 14
+    assert rollups.recharged("a", "hour", T0) == pytest.approx(5.0)
+    assert rollups.consumption("b", "hour", T0) == 0.0
+    assert rollups.recharged("b", "hour", T0) == pytest.approx(3.0)  # aumento sin recharge()
+
+
+def test_counter_path_clears_pending_recharge():
+    rollups = EnergyRollups()
+    rollups.update(["a"], T0, total_forward_energy=[100.0], balance_energy=[10.0])
+    rollups.recharge("a", 5.0, T0 + MIN)
+    rollups.update(["a"], T0 + 10 * MIN, total_forward_energy=[0.5], balance_energy=[15.0])  # reinicio
+    rollups.update(["a"], T0 + 20 * MIN, balance_energy=[14.0])  # sin contador: se usa el saldo
+    assert rollups.consumption("a", "hour", T0) == pytest.approx(0.5 + 1.0)  # la recarga no se cuenta dos veces
+
+
+def test_interval_is_spread_across_hours():
+    rollups = EnergyRollups()
+    rollups.update(["a"], T0 + 30 * MIN, total_forward_energy=[0.0])
+    rollups.update(["a"], T0 + 150 * MIN, total_forward_energy=[4.0])  # 2 h: 30 + 60 + 30 min
+    assert [kwh for _, kwh in rollups.series("a", "hour")] == pytest.approx([1.0, 2.0, 1.0])
+    assert rollups.consumption("a", "day", T0) == pytest.approx(4.0)
+
+
+def test_repeated_device_in_one_batch_is_applied_in_order():
+    rollups = EnergyRollups()
+    rollups.update(["a"], T0, total_forward_energy=[10.0])
+    rollups.update(["a", "b", "a"], [T0 + MIN, T0 + MIN, T0 + 2 * MIN], total_forward_energy=[11.0, 5.0, 12.0])
+    assert rollups.consumption("a", "hour", T0) == pytest.approx(2.0)
+
+
+def test_impossible_delta_is_an_anomaly():
+    rollups = EnergyRollups(max_power_kw=10.0)
+    rollups.update(["a"], T0, total_forward_energy=[0.0])
+    rollups.update(["a"], T0 + 6 * MIN, total_forward_energy=[5.0])  # 50 kW durante 6 min
+    assert rollups.anomalies == 1 and rollups.consumption("a", "hour", T0) == 0.0
+
+
+def test_save_and_load(tmp_path):
+    rollups = EnergyRollups()
+    rollups.update(["a", "b"], T0, total_forward_energy=[1.0, np.nan], balance_energy=[np.nan, 20.0])
+    rollups.recharge("b", 2.0, T0 + MIN)
+    rollups.update(["a", "b"], T0 + 10 * MIN, total_forward_energy=[2.0, np.nan], balance_energy=[np.nan, 21.0])
+    path = str(tmp_path / "rollups.npz")
+    rollups.save(path)
+
+    loaded = EnergyRollups.load(path)
+    assert loaded.totals("hour", T0) == pytest.approx({"a": 1.0, "b": 1.0})
+    assert loaded.recharged("b", "month", T0) == pytest.approx(2.0)
+    loaded.update(["a"], T0 + 20 * MIN, total_forward_energy=[3.5])  # continúa desde el estado guardado
+    assert loaded.consumption("a", "hour", T0) == pytest.approx(2.5)
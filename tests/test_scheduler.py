@@ -0,0 +1,50 @@
+import threading
+
+from tuya_client.errors import TuyaError
+from tuya_client.scheduler import PollScheduler
+
+
+def test_broken_subscriber_does_not_stop_polling(client, sim):
+    scheduler = PollScheduler(client, jitter=0.0)
+    scheduler.add(sim.device_ids[:5])
+    seen = []
+
+    def broken(device_id, changes):
+        raise RuntimeError("suscriptor roto")
+
+    scheduler.subscribe(broken)
+    scheduler.subscribe(lambda device_id, changes: seen.append(device_id))
+    assert scheduler.run_once(now=float("inf")) == 5
+    assert sorted(seen) == sorted(sim.device_ids[:5])
+    assert len(scheduler.due(now=float("inf"))) == 5  # siguen programados
+
+
+def test_failed_bulk_read_keeps_devices_scheduled(client, sim, monkeypatch):
+    scheduler = PollScheduler(client)
+    scheduler.add(sim.device_ids[:5])
+
+    def fail(*args, **kwargs):
+        raise TuyaError("circuito abierto")
+
+    monkeypatch.setattr(client, "get_status_many", fail)
+    assert scheduler.run_once(now=float("inf")) == 5
+    assert len(scheduler.due(now=float("inf"))) == 5
+    assert sim.stats["requests"] == 0  # ni lotes ni consultas uno a uno
+
+
+def test_run_survives_errors(client):
+    scheduler = PollScheduler(client, base_interval=0.01)
+    calls = []
+
+    def run_once(now=None):
+        calls.append(now)
+        if len(calls) == 1:
+            raise TuyaError("fallo puntual")
+        scheduler.stop()
+        return 0
+
+    scheduler.run_once = run_once
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and len(calls) == 2
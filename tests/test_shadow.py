@@ -0,0 +1,70 @@
+import threading
+import time
+
+from tuya_client.commands import CommandDispatcher
+from tuya_client.shadow import DeviceShadow
+
+
+def test_concurrent_reads_join_the_inflight_fetch(client, sim, monkeypatch):
+    shadow = DeviceShadow(client)
+    device_id = sim.device_ids[0]
+    fetch = client.get_status_many
+    release = threading.Event()
+
+    def slow(device_ids, **kwargs):
+        release.wait(5)
+        return fetch(device_ids, **kwargs)
+
+    monkeypatch.setattr(client, "get_status_many", slow)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shadow.status(device_id))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while shadow.stats["joined"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert shadow.stats["requests"] == 1 and shadow.stats["joined"] == 2
+    assert len(results) == 3 and all(resp["success"] for resp in results)
+
+
+def test_freshness_is_tracked_per_dp(client, sim):
+    shadow = DeviceShadow(client, max_age=60)
+    device_id = sim.device_ids[0]
+    shadow.status(device_id)
+    requests = sim.stats["requests"]
+    shadow.invalidate(device_id)
+    shadow.update(device_id, {"switch": False})  # sólo este DP vuelve a estar fresco
+    assert shadow.get(device_id, "switch") is False
+    assert sim.stats["requests"] == requests
+    shadow.get(device_id, "cur_power")
+    assert sim.stats["requests"] == requests + 1
+
+
+def test_out_of_order_values_are_discarded(client):
+    shadow = DeviceShadow(client)
+    seen = []
+    shadow.watch(lambda *change: seen.append(change), "dev")
+    shadow.update("dev", {"switch": True}, t=2000)
+    shadow.update("dev", {"switch": False}, t=1000)  # llega tarde
+    assert shadow.snapshot("dev")["switch"].value is True
+    assert shadow.version("dev") == 1
+    assert seen == [("dev", "switch", True, None)]
+
+
+def test_dispatcher_acks_update_the_shadow(client, sim):
+    shadow = DeviceShadow(client, max_age=60)
+    device_id = sim.device_ids[0]
+    sim.devices[device_id].switch_prepayment = True
+    shadow.status(device_id)
+    version = shadow.version(device_id)
+    before = shadow.get(device_id, "balance_energy")
+    with CommandDispatcher(client, window=0.01, on_ack=shadow.acknowledge) as dispatcher:
+        dispatcher.send(device_id, "switch_prepayment", False).result(5)
+        dispatcher.send(device_id, "charge_energy", 1000).result(5)
+    assert shadow.get(device_id, "switch_prepayment") is False
+    assert shadow.version(device_id) == version + 1
+    assert shadow.get(device_id, "balance_energy") == before  # una recarga no es un valor de estado
+    assert "charge_energy" not in shadow.snapshot(device_id)
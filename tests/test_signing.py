@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import TuyaClient
+
+
+def test_canonical_url_sorts_and_encodes_query():
+    url = TuyaClient._canonical_url("v1.0/devices", {"b": "x y", "a": 1, "c": None})
+    assert url == "/v1.0/devices?a=1&b=x%20y&c="
+
+
+def test_string_to_sign_layout():
+    client = TuyaClient(CLIENT_ID, SECRET, "http://localhost")
+    s2s = client._string_to_sign("get", "/v1.0/x?a=1", "", {"area_id": "29"}, ["area_id"])
+    assert s2s == "GET\n" + hashlib.sha256(b"").hexdigest() + "\narea_id:29\n\n/v1.0/x?a=1"
+
+
+def test_business_signature_matches_tuya_formula():
+    client = TuyaClient(CLIENT_ID, SECRET, "http://localhost")
+    client.access_token = "tok"
+    body = {"commands": [{"code": "switch", "value": True}]}
+    url, headers, body_str = client._signed_request(
+        "POST", "/v1.0/devices/d1/commands", None, {"Content-Type": "application/json"}, body, None, "n1"
+    )
+    s2s = "POST\n" + hashlib.sha256(body_str.encode()).hexdigest() + "\n\n/v1.0/devices/d1/commands"
+    message = CLIENT_ID + "tok" + headers["t"] + "n1" + s2s
+    expected = hmac.new(SECRET.encode(), message.encode(), hashlib.sha256).hexdigest().upper()
+    assert url == "http://localhost/v1.0/devices/d1/commands"
+    assert headers["sign"] == expected and headers["nonce"] == "n1"
+
+
+def test_simulator_accepts_signed_requests(client, sim):
+    device_id = sim.device_ids[0]
+    assert client.get_token()["success"]
+    assert client.decode(client.request("GET", f"/v1.0/devices/{device_id}/status"))["success"]
+    resp = client.request(
+        "POST",
+        f"/v1.0/devices/{device_id}/commands",
+        body={"commands": [{"code": "switch", "value": False}]},
+        headers={"Content-Type": "application/json"},
+    )
+    assert client.decode(resp)["success"]
+    assert client.decode(client.request("GET", "/v1.0/iot-03/devices/status", query={"device_ids": device_id}))[
+        "success"
+    ]
+    assert sim.stats["sign_errors"] == 0
+
+
+def test_simulator_rejects_wrong_secret(sim):
+    client = TuyaClient(CLIENT_ID, "x" * 32, sim.base_url)
+    data = client.get_token()
+    assert data["success"] is False and data["code"] == 1004
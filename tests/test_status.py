@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from conftest import CLIENT_ID, SECRET
+from tuya_client import RetryPolicy, TuyaClient
+
+
+def test_get_status_many_batches_requests(client, sim):
+    ids = sim.device_ids  # 45 -> 3 bloques de 20
+    results = client.get_status_many(ids)
+    assert set(results) == set(ids)
+    assert all(resp["success"] for resp in results.values())
+    assert {item["code"] for item in results[ids[0]]["result"]} >= {"switch", "balance_energy"}
+    assert sim.stats["requests"] == 1 + 3  # token + 3 lotes
+
+
+def test_get_status_many_reports_unknown_device_per_device(client, sim):
+    results = client.get_status_many([sim.device_ids[0], "nope"])
+    assert results[sim.device_ids[0]]["success"]
+    assert not results["nope"]["success"]
+
+
+def test_get_status_many_reports_api_errors_per_device(sim):
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=RetryPolicy(max_attempts=1, raise_on_error=True))
+    client.get_token()
+    sim.error_rate = 1.0
+    results = client.get_status_many(sim.device_ids)
+    assert len(results) == len(sim.device_ids)
+    assert all(resp["success"] is False and resp["code"] == 500 for resp in results.values())
+
+
+def test_get_status_many_reports_open_circuit_per_device(sim):
+    policy = RetryPolicy(max_attempts=1, failure_threshold=1, reset_timeout=60.0)
+    client = TuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy)
+    policy.breaker(client.base_url).record(False)
+    results = client.get_status_many(sim.device_ids)
+    assert all("CircuitOpenError" in resp["msg"] for resp in results.values())
+
+
+def test_async_status_reports_tuya_errors_per_device(sim):
+    pytest.importorskip("aiohttp")
+    from tuya_client import AsyncTuyaClient
+
+    policy = RetryPolicy(max_attempts=1, raise_on_error=True)
+
+    async def run():
+        async with AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url, retry_policy=policy) as client:
+            await client.get_token()
+            sim.error_rate = 1.0
+            return await client.get_status_many(sim.device_ids), await client.gather_status(sim.device_ids[:3])
+
+    bulk, single = asyncio.run(run())
+    assert len(bulk) == len(sim.device_ids) and not any(resp["success"] for resp in bulk.values())
+    assert len(single) == 3 and not any(resp["success"] for resp in single.values())
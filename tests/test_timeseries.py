@@ -0,0 +1,71 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tuya_client.timeseries import TimeSeriesStore, day_of  # noqa: E402
+
+T0 = 1_700_000_000_000
+STEP = 10_000
+COLUMNS = ("cur_power", "balance_energy")
+
+
+def _fill(store, device_id, n, start=T0):
+    for i in range(n):
+        store.append(device_id, start + i * STEP, {"cur_power": float(i), "balance_energy": 100.0 - i})
+
+
+def test_append_flush_and_read(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), COLUMNS, capacity=50)
+    _fill(store, "dev", 10)
+    t, cols = store.read("dev", T0, T0 + 10 * STEP)  # todavía en memoria
+    assert t.tolist() == [T0 + i * STEP for i in range(10)]
+    store.flush()
+    assert (tmp_path / day_of(T0) / "t.i64").stat().st_size == 10 * 8
+    t, cols = store.read("dev", T0, T0 + 10 * STEP)
+    assert cols["cur_power"].tolist() == list(range(10))
+    assert store.latest("dev") == (T0 + 9 * STEP, {"cur_power": 9.0, "balance_energy": 91.0})
+    store.close()
+
+
+def test_full_ring_buffer_flushes_itself(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), COLUMNS, capacity=4)
+    _fill(store, "dev", 10)
+    assert (tmp_path / day_of(T0) / "t.i64").stat().st_size == 8 * 8  # dos volcados de 4
+    assert len(store.read("dev", T0, T0 + 10 * STEP)[0]) == 10
+    store.close()
+
+
+def test_reopen_existing_store(tmp_path):
+    with TimeSeriesStore(str(tmp_path), COLUMNS) as store:
+        _fill(store, "a", 5)
+        _fill(store, "b", 3)
+    with pytest.raises(ValueError):
+        TimeSeriesStore(str(tmp_path), ("cur_power",))
+
+    store = TimeSeriesStore(str(tmp_path), COLUMNS)
+    _fill(store, "a", 5, start=T0 + 5 * STEP)
+    store.flush()
+    t, cols = store.read("a", T0, T0 + 10 * STEP)
+    assert t.tolist() == [T0 + i * STEP for i in range(10)]
+    assert store.read("b", T0, T0 + 10 * STEP)[1]["balance_energy"].tolist() == [100.0, 99.0, 98.0]
+    store.close()
+
+
+def test_range_inside_one_run_is_a_view_of_the_file(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), COLUMNS)
+    _fill(store, "a", 20)
+    _fill(store, "b", 20)
+    store.flush()
+    mapped = store._map(day_of(T0), "cur_power.f32", "float32")
+
+    t, cols = store.read("b", T0 + 5 * STEP, T0 + 8 * STEP)  # [start, end)
+    assert t.tolist() == [T0 + 5 * STEP, T0 + 6 * STEP, T0 + 7 * STEP]
+    assert cols["cur_power"].tolist() == [5.0, 6.0, 7.0]
+    assert np.shares_memory(cols["cur_power"], mapped)
+
+    _fill(store, "b", 5, start=T0 + 20 * STEP)
+    store.flush()  # segundo tramo de "b": la lectura que cruza tramos se concatena
+    runs = store.runs("b", T0 + 18 * STEP, T0 + 22 * STEP)
+    assert [len(t) for t, _ in runs] == [2, 2]
+    assert store.read("b", T0 + 18 * STEP, T0 + 22 * STEP)[1]["cur_power"].tolist() == [18.0, 19.0, 0.0, 1.0]
+    store.close()
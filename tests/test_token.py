@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from conftest import CLIENT_ID, SECRET  # noqa: E402
+from tuya_client import AsyncTuyaClient  # noqa: E402
+
+
+def test_cancelled_token_wait_does_not_keep_file_lock(sim, tmp_path):
+    async def run():
+        client = AsyncTuyaClient(CLIENT_ID, SECRET, sim.base_url, token_cache=str(tmp_path / "token.json"))
+        lock = client.tokens.cache.lock
+        lock.acquire()  # otro proceso está renovando
+        waiting = asyncio.ensure_future(client._ensure_token())
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        lock.release()  # el hilo de la corrutina cancelada lo toma ahora y debe soltarlo
+        acquired = threading.Event()
+
+        def take() -> None:
+            lock.acquire()
+            acquired.set()
+            lock.release()
+
+        thread = threading.Thread(target=take, daemon=True)
+        thread.start()
+        await asyncio.to_thread(acquired.wait, 2)
+        await client.close()
+        return acquired.is_set()
+
+    assert asyncio.run(run())
@@ -0,0 +1,26 @@
+from conftest import CLIENT_ID, SECRET
+from tuya_client.workers import FleetWorkerPool
+
+LIMITS = {"*": (1e6, 1e6), "read": (1e6, 1e6)}
+
+
+def test_pool_convert_does_not_look_up_each_device(sim):
+    ids = sim.device_ids
+    with FleetWorkerPool(CLIENT_ID, SECRET, sim.base_url, processes=2, limits=LIMITS, convert=True) as pool:
+        results = pool.status_many(ids)
+    assert set(results) == set(ids)
+    assert all(resp["success"] for resp in results.values())
+    assert isinstance(results[ids[0]]["result"]["switch"], bool)
+    # token + listado (3 páginas) + lotes + /specifications por worker; nunca uno por dispositivo
+    assert sim.stats["requests"] < len(ids) // 2
+
+
+def test_pool_uses_given_products(sim):
+    ids = sim.device_ids[:10]
+    products = {device_id: "simbreaker01" for device_id in ids}
+    with FleetWorkerPool(
+        CLIENT_ID, SECRET, sim.base_url, processes=1, limits=LIMITS, convert=True, products=products
+    ) as pool:
+        results = pool.status_many(ids)
+    assert all(resp["success"] for resp in results.values())
+    assert sim.stats["requests"] == 1 + 1 + 1  # token, un lote, una especificación
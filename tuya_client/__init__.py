@@ -1,3 +1,22 @@
 from .client import TuyaClient
+from .async_client import AsyncTuyaClient
+from .cache import ResponseCache
+from .errors import CircuitOpenError, TuyaAPIError, TuyaError
+from .metrics import MetricsCollector
+from .pool import TuyaClientPool
+from .ratelimit import RateLimiter
+from .retry import CircuitBreaker, RetryPolicy
 
-__all__ = ["TuyaClient"]
\ No newline at end of file
+__all__ = [
+    "TuyaClient",
+    "AsyncTuyaClient",
+    "TuyaClientPool",
+    "RateLimiter",
+    "RetryPolicy",
+    "ResponseCache",
+    "MetricsCollector",
+    "CircuitBreaker",
+    "TuyaError",
+    "TuyaAPIError",
+    "CircuitOpenError",
+]
@@ -0,0 +1,364 @@
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # dependencia opcional
+    aiohttp = None
+
+from .client import BULK_STATUS_MAX_IDS, BULK_STATUS_PATH, BaseTuyaClient
+from .errors import TuyaAPIError, TuyaError
+from .pagination import Page, Spec, aiter_pages
+
+
+async def _acquire_in_thread(lock: Any) -> None:
+    """``lock.acquire()`` bloqueante en un hilo, sin dejarlo tomado si se cancela la espera.
+
+    El hilo no se puede interrumpir: si la corrutina se cancela, el lock se
+    libera en cuanto el hilo lo consiga.
+    """
+    acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        def release_late(future: "asyncio.Future[None]") -> None:
+            if not future.cancelled() and future.exception() is None:
+                lock.release()
+
+        acquiring.add_done_callback(release_late)
+        raise
+
+
+class AsyncTuyaClient(BaseTuyaClient):
+    """Cliente asyncio para la API Cloud de Tuya.
+
+    Usa la misma firma que ``TuyaClient`` sobre un pool de conexiones
+    keep-alive de aiohttp, pensado para consultar miles de dispositivos.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        base_url: str,
+        *,
+        pool_size: int = 100,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 10.0,
+        **kwargs: Any,
+    ) -> None:
+        if aiohttp is None:
+            raise RuntimeError("AsyncTuyaClient requiere aiohttp (pip install aiohttp).")
+        super().__init__(client_id, secret, base_url, **kwargs)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._background: Set["asyncio.Task[None]"] = set()
+
+    async def __aenter__(self) -> "AsyncTuyaClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # La sesión se crea perezosamente para quedar ligada al loop en ejecución.
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._trace_config()],
+            )
+        return self.session
+
+    @staticmethod
+    def _trace_config() -> "aiohttp.TraceConfig":
+        """Anota en ``trace_request_ctx`` (un dict, si se pasa) la apertura de conexión y el TTFB."""
+        trace = aiohttp.TraceConfig()
+
+        def mark(name: str) -> Callable:
+            async def on_event(session: Any, ctx: Any, params: Any) -> None:
+                if isinstance(ctx.trace_request_ctx, dict):
+                    ctx.trace_request_ctx[name] = time.perf_counter()
+
+            return on_event
+
+        trace.on_connection_create_start.append(mark("connect_start"))
+        trace.on_connection_create_end.append(mark("connect_end"))
+        trace.on_request_end.append(mark("headers"))
+        return trace
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    # ---------- Token ----------
+    async def _token_get(self, path: str, query: Optional[Dict[str, Any]], nonce: str) -> Dict[str, Any]:
+        limiter = self.rate_limiter
+        if limiter:
+            await limiter.acquire_async(self.client_id, "GET", path)
+        url, headers = self._token_request(path, query, nonce)
+        start = time.perf_counter()
+        try:
+            async with self._get_session().get(url, headers=headers) as response:
+                data = self.codec.loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            if self.hooks:
+                self._emit("GET", path, None, None, exc, timings={"total": time.perf_counter() - start})
+            raise
+        if self.hooks:
+            self._emit("GET", path, response.status, data, timings={"total": time.perf_counter() - start})
+        if limiter:
+            limiter.observe(self.client_id, "GET", path, limiter.is_rate_limited(response.status, data))
+        return data
+
+    async def get_token(self, grant_type: int = 1, nonce: str = "") -> Dict[str, Any]:
+        data = await self._token_get("/v1.0/token", {"grant_type": str(grant_type)}, nonce)
+        self.tokens.update(data)
+        return data
+
+    async def refresh_token(self) -> Dict[str, Any]:
+        """Renueva con el grant de refresh_token (o pide uno nuevo si no hay)."""
+        path, query, is_refresh = self._renewal_path()
+        data = await self._token_get(path, query, "")
+        if not self.tokens.update(data) and is_refresh:
+            data = await self.get_token()  # refresh_token rechazado: pedir uno nuevo
+        return data
+
+    async def _ensure_token(self) -> None:
+        """Como ``TuyaClient._ensure_token``: una sola corrutina renueva, el resto espera."""
+        tokens = self.tokens
+        if tokens.is_fresh():
+            return
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if tokens.is_fresh():
+                return
+            if tokens.cache is None:
+                tokens.check_renewal(await self.refresh_token())
+                return
+            await _acquire_in_thread(tokens.cache.lock)
+            try:
+                if not tokens.load_shared():
+                    tokens.check_renewal(await self.refresh_token())
+            finally:
+                tokens.cache.lock.release()
+
+    # ---------- Requests ----------
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        sig_headers: Optional[List[str]] = None,
+        nonce: str = "",
+        idempotent: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Igual que ``TuyaClient.request`` pero devuelve el JSON ya decodificado."""
+        return await self._perform(
+            method,
+            path,
+            lambda n: self._signed_request(method, path, query, headers, body, sig_headers, n),
+            nonce=nonce,
+            idempotent=self._is_idempotent(method, body, idempotent),
+            cache_key=self._canonical_url(path, query) if self.cache is not None else None,
+        )
+
+    async def _perform(
+        self,
+        method: str,
+        path: str,
+        sign: Callable[[str], Tuple[str, Dict[str, str], str]],
+        *,
+        nonce: str = "",
+        idempotent: bool = False,
+        cache_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Como ``TuyaClient._perform``: caché, reintentos y circuit breaker."""
+        cache = self.cache
+        if cache is None or cache_key is None:
+            return (await self._dispatch(method, path, sign, nonce, idempotent))[1]
+
+        if method.upper() != "GET":
+            data = (await self._dispatch(method, path, sign, nonce, idempotent))[1]
+            cache.invalidate_path(cache_key)
+            return data
+
+        entry, stale = cache.lookup(cache_key)
+        if entry is not None:
+            if stale and cache.begin_revalidate(cache_key):
+                task = asyncio.ensure_future(self._revalidate(method, path, sign, cache_key))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            if self.hooks:
+                self._emit(method, path, entry.status, None, cached=True)
+            return self.codec.loads(entry.content)
+
+        status, data, raw = await self._dispatch(method, path, sign, nonce, idempotent)
+        if status == 200 and isinstance(data, dict) and data.get("success", True):
+            cache.store(cache_key, raw, status)
+        return data
+
+    async def _revalidate(self, method: str, path: str, sign: Callable, cache_key: str) -> None:
+        try:
+            status, data, raw = await self._dispatch(method, path, sign, "", True)
+            if status == 200 and isinstance(data, dict) and data.get("success", True):
+                self.cache.store(cache_key, raw, status)
+        except Exception:  # la copia caducada sigue sirviéndose hasta stale_until
+            pass
+        finally:
+            self.cache.end_revalidate(cache_key)
+
+    async def _dispatch(
+        self,
+        method: str,
+        path: str,
+        sign: Callable[[str], Tuple[str, Dict[str, str], str]],
+        nonce: str,
+        idempotent: bool,
+    ) -> Tuple[int, Dict[str, Any], bytes]:
+        """Envía con reintentos y circuit breaker según ``retry_policy``."""
+        policy = self.retry_policy
+        if policy is None:
+            return await self._send(method, path, sign, nonce)
+
+        breaker = policy.breaker(self.base_url)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                status, data, raw = await self._send(method, path, sign, nonce)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                breaker.record(False)
+                retryable = idempotent or isinstance(exc, aiohttp.ClientConnectorError)
+                if not retryable or attempt + 1 >= policy.max_attempts:
+                    raise
+            except BaseException:
+                breaker.record(False)  # cualquier otro fallo también cierra la sonda del semiabierto
+                raise
+            else:
+                breaker.record(status < 500)
+                if not idempotent or attempt + 1 >= policy.max_attempts or not policy.should_retry(status, data):
+                    if policy.raise_on_error and isinstance(data, dict) and not data.get("success", True):
+                        raise TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+                    return status, data, raw
+
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+            if nonce:
+                nonce = uuid.uuid4().hex
+
+    async def _send(
+        self, method: str, path: str, sign: Callable[[str], Tuple[str, Dict[str, str], str]], nonce: str
+    ) -> Tuple[int, Dict[str, Any], bytes]:
+        clock = time.perf_counter
+        t0 = clock()
+        await self._ensure_token()
+        t1 = clock()
+        limiter = self.rate_limiter
+        if limiter:
+            await limiter.acquire_async(self.client_id, method, path)
+        t2 = clock()
+        url, signed_headers, body_str = sign(nonce)
+        t3 = clock()
+        trace: Optional[Dict[str, float]] = {} if self.hooks else None
+        try:
+            async with self._get_session().request(
+                method.upper(), url, headers=signed_headers, data=body_str.encode(), trace_request_ctx=trace
+            ) as response:
+                status = response.status
+                raw = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            if self.hooks:
+                self._emit(method, path, None, None, exc, timings={"total": clock() - t0})
+            raise
+        t4 = clock()
+        data = self._decode_body(status, raw)
+        t5 = clock()
+        if limiter:
+            limiter.observe(self.client_id, method, path, limiter.is_rate_limited(status, data))
+        if trace is not None:
+            timings = {
+                "token": t1 - t0,
+                "queue": t2 - t1,
+                "sign": t3 - t2,
+                "connect": trace["connect_end"] - trace["connect_start"] if "connect_end" in trace else 0.0,
+                "ttfb": trace.get("headers", t4) - t3,
+                "http": t4 - t3,
+                "decode": t5 - t4,
+                "total": t5 - t0,
+            }
+            self._emit(method, path, status, data, timings=timings)
+        return status, data, raw
+
+    def _decode_body(self, status: int, raw: bytes) -> Any:
+        """JSON del cuerpo; un error HTTP sin JSON (la página HTML de un 503) pasa a ``success: false``."""
+        if status < 400:
+            return self.codec.loads(raw)
+        try:
+            return self.codec.loads(raw)
+        except ValueError:
+            text = raw[:200].decode("utf-8", "replace")
+            return {"success": False, "code": None, "msg": f"HTTP {status}: {text}"}
+
+    async def gather_status(self, device_ids: Iterable[str], concurrency: int = 50) -> Dict[str, Dict[str, Any]]:
+        """Consulta ``/status`` de muchos dispositivos con como mucho ``concurrency`` en vuelo.
+
+        Devuelve un dict ``device_id -> respuesta``; los errores (red, API, circuito abierto) se
+        reportan por dispositivo como ``{"success": False, "msg": ...}``.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(device_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.request("GET", f"/v1.0/devices/{device_id}/status")
+                except TuyaAPIError as exc:  # raise_on_error
+                    return exc.response or {"success": False, "code": exc.code, "msg": exc.msg}
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TuyaError) as exc:
+                    return {"success": False, "msg": f"{type(exc).__name__}: {exc}"}
+
+        ids = list(dict.fromkeys(device_ids))
+        results = await asyncio.gather(*(fetch(device_id) for device_id in ids))
+        return dict(zip(ids, results))
+
+    async def get_status_many(
+        self, device_ids: Iterable[str], concurrency: int = 8, compact: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Versión asíncrona de ``TuyaClient.get_status_many``."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    data = await self.request("GET", BULK_STATUS_PATH, query={"device_ids": ",".join(chunk)})
+                except TuyaAPIError as exc:  # raise_on_error
+                    data = exc.response or {"success": False, "code": exc.code, "msg": exc.msg}
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TuyaError) as exc:
+                    data = {"success": False, "msg": f"{type(exc).__name__}: {exc}"}
+            return self._split_bulk_status(chunk, data, compact)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for part in await asyncio.gather(*(fetch(chunk) for chunk in self._chunks(device_ids, BULK_STATUS_MAX_IDS))):
+            results.update(part)
+        return results
+
+    def pages(self, spec: Spec, *, cursor: Any = None, prefetch: bool = True, **kwargs: Any) -> AsyncIterator[Page]:
+        """Versión asíncrona de ``TuyaClient.pages`` (``async for page in client.pages(...)``)."""
+        return aiter_pages(self, spec, cursor=cursor, prefetch=prefetch, **kwargs)
+
+    async def iter_items(self, spec: Spec, **kwargs: Any) -> AsyncIterator[Any]:
+        """Elementos de todas las páginas, uno a uno."""
+        async for page in self.pages(spec, **kwargs):
+            for item in page.items:
+                yield item
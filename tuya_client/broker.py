@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import itertools
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    from aiohttp import WSMsgType, web
+except ImportError:  # dependencia opcional
+    web = None
+
+from .messaging import ENV_PROD, encrypt_payload, mq_password
+
+
+class LocalMessageBroker:
+    """Sustituto local del servicio de mensajes de Tuya para desarrollo y pruebas.
+
+    Expone la misma ruta Pulsar que la nube, comprueba las credenciales de
+    ``MessageSubscriber``, cifra cada evento publicado con el ``secret`` y lo
+    reenvía a los consumidores conectados. Los mensajes sin ACK se vuelven a
+    entregar al reconectar (o pasados ``redeliver_after`` segundos).
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        env: str = ENV_PROD,
+        mode: str = "aes_ecb",
+        redeliver_after: float = 30.0,
+    ) -> None:
+        if web is None:
+            raise RuntimeError("El broker local requiere aiohttp (pip install aiohttp).")
+        self.client_id = client_id
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.env = env
+        self.mode = mode
+        self.redeliver_after = redeliver_after
+        self.unacked: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.acked = 0
+        self._sent_at: Dict[str, float] = {}
+        self._consumers: Set[Any] = set()
+        self._seq = itertools.count(1)
+        self._runner: Optional["web.AppRunner"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/ws/v2/consumer/persistent/{tenant}/out/{env}/{sub}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._task = asyncio.ensure_future(self._redeliver_loop())
+        return self.ws_url
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for ws in list(self._consumers):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> "LocalMessageBroker":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    def _frame(self, message_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        t = int(time.time() * 1000)
+        payload = {"data": encrypt_payload(self.secret, data, self.mode), "protocol": 4, "pv": "2.0", "sign": "", "t": t}
+        properties = {"em": self.mode} if self.mode == "aes_gcm" else {}
+        return {
+            "messageId": message_id,
+            "payload": base64.b64encode(json.dumps(payload).encode()).decode(),
+            "properties": properties,
+            "publishTime": t,
+        }
+
+    async def publish(self, data: Dict[str, Any]) -> str:
+        """Publica un evento (p. ej. ``{"devId", "status": [...]}``); devuelve su ``messageId``."""
+        message_id = f"{next(self._seq)}:0:-1"
+        frame = self._frame(message_id, data)
+        self.unacked[message_id] = frame
+        await self._send(frame)
+        return message_id
+
+    async def publish_many(self, events: List[Dict[str, Any]]) -> List[str]:
+        return [await self.publish(data) for data in events]
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        self._sent_at[frame["messageId"]] = time.monotonic()
+        text = json.dumps(frame)
+        for ws in list(self._consumers):
+            if not ws.closed:
+                await ws.send_str(text)
+
+    async def _handle(self, request: "web.Request") -> "web.StreamResponse":
+        info = request.match_info
+        expected_sub = f"{self.client_id}-sub"
+        if (
+            request.headers.get("username") != self.client_id
+            or request.headers.get("password") != mq_password(self.client_id, self.secret)
+            or info["tenant"] != self.client_id
+            or info["env"] != self.env
+            or info["sub"] != expected_sub
+        ):
+            return web.Response(status=401, text="Unauthorized")
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._consumers.add(ws)
+        try:
+            for message_id, frame in list(self.unacked.items()):  # pendientes de una sesión anterior
+                self._sent_at[message_id] = time.monotonic()
+                await ws.send_str(json.dumps(frame))
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    message_id = json.loads(msg.data).get("messageId")
+                except (ValueError, AttributeError):
+                    continue
+                if self.unacked.pop(message_id, None) is not None:
+                    self._sent_at.pop(message_id, None)
+                    self.acked += 1
+        finally:
+            self._consumers.discard(ws)
+        return ws
+
+    async def _redeliver_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.05, self.redeliver_after / 4))
+            cutoff = time.monotonic() - self.redeliver_after
+            for message_id, frame in list(self.unacked.items()):
+                if self._sent_at.get(message_id, 0.0) <= cutoff:
+                    await self._send(frame)
@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional
+
+import requests
+
+from .errors import TuyaError
+from .retry import NON_IDEMPOTENT_CODES
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+BALANCE_CODE = "balance_energy"
+CHARGE_CODE = "charge_energy"
+
+# Estados de una operación en el diario.
+INTENT = "intent"          # a punto de enviarse (puede o no haber llegado al equipo)
+SENT = "sent"              # la nube aceptó el comando
+FAILED = "failed"          # la nube lo rechazó o no llegó a enviarse
+UNCERTAIN = "uncertain"    # intento sin resultado tras un corte y sin poder confirmarlo
+VERIFIED = "verified"      # la lectura posterior confirma el cambio
+UNVERIFIED = "unverified"  # aceptado, pero la lectura posterior no lo refleja
+
+
+class BulkOp(NamedTuple):
+    op_id: str
+    device_id: str
+    code: str
+    value: Any
+
+
+def recharge_ops(amounts: Dict[str, int], batch_id: str) -> List[BulkOp]:
+    """``{device_id: Wh}`` -> operaciones ``charge_energy`` con id estable ``batch_id:device_id``."""
+    return [BulkOp(f"{batch_id}:{device_id}", device_id, CHARGE_CODE, wh) for device_id, wh in amounts.items()]
+
+
+class Journal:
+    """Diario append-only (JSON por línea) con el último estado de cada operación.
+
+    Cada registro se escribe y sincroniza (``fsync``) antes de seguir, así que
+    tras un corte el diario refleja todo lo que se llegó a intentar. Una
+    última línea truncada se ignora al releerlo y se recorta del fichero,
+    para que el siguiente registro no quede pegado a ella.
+    """
+
+    def __init__(self, path: str, fsync: bool = True) -> None:
+        self.path = path
+        self.fsync = fsync
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # fin de la última línea completa
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.records.setdefault(record["op_id"], {}).update(record)
+        if end < len(data):
+            try:
+                record = json.loads(data[end:])  # cortado justo antes del salto de línea
+            except ValueError:
+                record = None
+            with open(path, "r+b") as f:
+                if isinstance(record, dict) and "op_id" in record:
+                    self.records.setdefault(record["op_id"], {}).update(record)
+                    f.seek(len(data))
+                    f.write(b"\n")
+                else:
+                    f.truncate(end)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def state(self, op_id: str) -> Optional[str]:
+        record = self.records.get(op_id)
+        return record["state"] if record else None
+
+    def write(self, op_id: str, state: str, **fields: Any) -> None:
+        record = {"op_id": op_id, "state": state, "t": int(time.time() * 1000), **fields}
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.records.setdefault(op_id, {}).update(record)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class BulkCommandRunner:
+    """Ejecuta ``charge_energy``/``switch_prepayment`` sobre miles de medidores de forma reanudable.
+
+    1. Lee el saldo previo de todos los medidores con lecturas en lote.
+    2. Por cada operación anota la intención en el diario, envía el comando
+       (``concurrency`` a la vez) y anota el resultado.
+    3. Pasados ``verify_delay`` segundos comprueba ``balance_energy`` (o el
+       valor escrito) de nuevo en lote.
+
+    Al relanzar con el mismo diario se saltan las operaciones ya enviadas. Una
+    recarga con intención pero sin resultado (corte a mitad) sólo se da por
+    aplicada si el saldo lo confirma; si no, queda ``uncertain`` y **no** se
+    reenvía. Los comandos idempotentes (p. ej. ``switch_prepayment``) sí se
+    reenvían.
+    """
+
+    def __init__(
+        self,
+        client: "TuyaClient",
+        journal: Journal,
+        *,
+        concurrency: int = 16,
+        verify: bool = True,
+        verify_delay: float = 5.0,
+        tolerance: float = 0.05,
+        retry_failed: bool = False,
+        no_resend: Iterable[str] = NON_IDEMPOTENT_CODES,
+    ) -> None:
+        self.client = client
+        self.journal = journal
+        self.concurrency = concurrency
+        self.verify = verify
+        self.verify_delay = verify_delay
+        self.tolerance = tolerance
+        self.retry_failed = retry_failed
+        self.no_resend = frozenset(no_resend)
+
+    # ---------- Lecturas en lote ----------
+    def _read(self, device_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """``device_id -> {code: valor}`` con ``get_status_many``; faltan los que fallen."""
+        out = {}
+        for device_id, resp in self.client.get_status_many(device_ids, max_workers=self.concurrency).items():
+            if resp.get("success"):
+                out[device_id] = {item["code"]: item["value"] for item in resp.get("result") or []}
+        return out
+
+    def _charged(self, before: Any, after: Any, value: Any) -> bool:
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            return False
+        return after - before >= value * (1 - self.tolerance)
+
+    # ---------- Reanudación ----------
+    def _pending(self, ops: List[BulkOp]) -> List[BulkOp]:
+        pending, interrupted = [], []
+        for op in ops:
+            state = self.journal.state(op.op_id)
+            if state is None or (state == FAILED and self.retry_failed):
+                pending.append(op)
+            elif state == INTENT:
+                (interrupted if op.code in self.no_resend else pending).append(op)
+
+        if interrupted:
+            now = self._read(op.device_id for op in interrupted)
+            for op in interrupted:
+                before = self.journal.records[op.op_id].get("before")
+                after = now.get(op.device_id, {}).get(BALANCE_CODE)
+                if op.code == CHARGE_CODE and self._charged(before, after, op.value):
+                    self.journal.write(op.op_id, VERIFIED, after=after, recovered=True)
+                else:
+                    self.journal.write(op.op_id, UNCERTAIN, after=after)
+        return pending
+
+    # ---------- Ejecución ----------
+    def _send(self, op: BulkOp, before: Any) -> bool:
+        self.journal.write(op.op_id, INTENT, device_id=op.device_id, code=op.code, value=op.value, before=before)
+        try:
+            data = self.client.decode(
+                self.client.request(
+                    "POST",
+                    f"/v1.0/devices/{op.device_id}/commands",
+                    body={"commands": [{"code": op.code, "value": op.value}]},
+                    headers={"Content-Type": "application/json"},
+                )
+            )
+        except TuyaError as exc:  # rechazada o circuito abierto: no se aplicó
+            self.journal.write(op.op_id, FAILED, error=str(exc))
+            return False
+        except (requests.RequestException, ValueError) as exc:
+            # Sin respuesta no sabemos si llegó: una recarga queda en ``intent``
+            # para que la reanudación la confirme con el saldo.
+            if op.code not in self.no_resend:
+                self.journal.write(op.op_id, FAILED, error=f"{type(exc).__name__}: {exc}")
+            return False
+        if data.get("success"):
+            self.journal.write(op.op_id, SENT)
+            return True
+        self.journal.write(op.op_id, FAILED, error=f"{data.get('code')}: {data.get('msg', '')}")
+        return False
+
+    def run(self, ops: Iterable[BulkOp]) -> Dict[str, str]:
+        """Ejecuta (o reanuda) ``ops``; devuelve ``op_id -> estado`` final."""
+        ops = list(ops)
+        pending = self._pending(ops)
+        before: Dict[str, Dict[str, Any]] = {}
+        if any(op.code == CHARGE_CODE for op in pending):
+            before = self._read(op.device_id for op in pending if op.code == CHARGE_CODE)
+
+        sent: List[BulkOp] = []
+        if pending:
+            def task(op: BulkOp) -> bool:
+                return self._send(op, before.get(op.device_id, {}).get(BALANCE_CODE))
+
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as executor:
+                for op, ok in zip(pending, executor.map(task, pending)):
+                    if ok:
+                        sent.append(op)
+
+        if self.verify and sent:
+            time.sleep(self.verify_delay)
+            self._verify(sent, before)
+        return {op.op_id: self.journal.state(op.op_id) for op in ops}
+
+    def _verify(self, sent: List[BulkOp], before: Dict[str, Dict[str, Any]]) -> None:
+        after = self._read(op.device_id for op in sent)
+        charged: Dict[str, int] = {}  # varias recargas al mismo medidor se comprueban juntas
+        for op in sent:
+            if op.code == CHARGE_CODE:
+                charged[op.device_id] = charged.get(op.device_id, 0) + op.value
+
+        for op in sent:
+            values = after.get(op.device_id, {})
+            if op.code == CHARGE_CODE:
+                balance = values.get(BALANCE_CODE)
+                prior = before.get(op.device_id, {}).get(BALANCE_CODE)
+                ok = self._charged(prior, balance, charged[op.device_id])
+                self.journal.write(op.op_id, VERIFIED if ok else UNVERIFIED, after=balance)
+            else:
+                ok = values.get(op.code) == op.value
+                self.journal.write(op.op_id, VERIFIED if ok else UNVERIFIED, after=values.get(op.code))
@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+# (regex sobre la ruta sin query, TTL en segundos). La telemetría (/status) no se cachea.
+DEFAULT_TTL_RULES: List[Tuple[str, float]] = [
+    (r"^/v1\.0/devices/[^/]+$", 300.0),
+    (r"^/v1\.0/devices/[^/]+/specifications$", 86400.0),
+    (r"^/v1\.0/devices/[^/]+/functions$", 86400.0),
+    (r"^/v1\.0/iot-03/devices/[^/]+/specification$", 86400.0),
+]
+
+_DEVICE_IN_PATH = re.compile(r"/devices/([^/?]+)")
+_ENTRY_OVERHEAD = 256  # bytes aproximados por entrada además del contenido
+
+
+class CacheEntry:
+    __slots__ = ("content", "status", "headers", "expires_at", "stale_until", "size")
+
+    def __init__(
+        self, content: bytes, status: int, headers: Dict[str, str], expires_at: float, stale_until: float
+    ) -> None:
+        self.content = content
+        self.status = status
+        self.headers = headers
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = len(content) + _ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """Caché TTL + LRU de respuestas GET para metadatos que cambian poco.
+
+    - TTL por ruta según ``rules`` (lista de ``(regex, ttl)``, gana la primera).
+    - Expulsión LRU al superar ``max_bytes``.
+    - Stale-while-revalidate: durante ``stale_ttl`` segundos tras caducar se
+      sirve la copia antigua y se refresca en segundo plano.
+    - Un comando (método distinto de GET) sobre ``/devices/{id}`` invalida
+      las entradas de ese dispositivo.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Iterable[Tuple[str, float]]] = None,
+        *,
+        max_bytes: int = 16 * 1024 * 1024,
+        stale_ttl: float = 60.0,
+    ) -> None:
+        self.rules: List[Tuple[Pattern[str], float]] = [
+            (re.compile(pattern), float(ttl)) for pattern, ttl in (DEFAULT_TTL_RULES if rules is None else rules)
+        ]
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_device: Dict[str, Set[str]] = {}
+        self._revalidating: Set[str] = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.stale_hits = self.misses = self.evictions = self.invalidations = 0
+
+    @staticmethod
+    def _path(key: str) -> str:
+        return key.split("?", 1)[0]
+
+    def ttl_for(self, key: str) -> Optional[float]:
+        path = self._path(key)
+        for pattern, ttl in self.rules:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    def lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """Devuelve ``(entrada, caducada)``; ``(None, False)`` si no hay copia utilizable."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry.stale_until:
+                if entry is not None:
+                    self._drop(key)
+                if self.ttl_for(key) is not None:
+                    self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if now < entry.expires_at:
+                self.hits += 1
+                return entry, False
+            self.stale_hits += 1
+            return entry, True
+
+    def begin_revalidate(self, key: str) -> bool:
+        """True si el llamante debe refrescar ``key`` (sólo uno a la vez por clave)."""
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            return True
+
+    def end_revalidate(self, key: str) -> None:
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def store(self, key: str, content: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> bool:
+        ttl = self.ttl_for(key)
+        if ttl is None:
+            return False
+        now = time.monotonic()
+        entry = CacheEntry(content, status, dict(headers or {}), now + ttl, now + ttl + self.stale_ttl)
+        if entry.size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            match = _DEVICE_IN_PATH.search(self._path(key))
+            if match:
+                self._by_device.setdefault(match.group(1), set()).add(key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        match = _DEVICE_IN_PATH.search(self._path(key))
+        if match:
+            keys = self._by_device.get(match.group(1))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_device[match.group(1)]
+
+    def invalidate_device(self, device_id: str) -> int:
+        with self._lock:
+            keys = list(self._by_device.get(device_id, ()))
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_path(self, key: str) -> int:
+        """Invalida lo relacionado con la ruta de un comando (su dispositivo, si lo hay)."""
+        match = _DEVICE_IN_PATH.search(self._path(key))
+        return self.invalidate_device(match.group(1)) if match else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_device.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
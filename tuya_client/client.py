@@ -1,21 +1,99 @@
 import time
 import hmac
 import hashlib
-import json
-from typing import Any, Dict, Optional, List
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
 from urllib.parse import quote, urlencode
 
 import requests
 
-class TuyaClient:
-    """Cliente Python para la API Cloud de Tuya."""
+from .cache import ResponseCache
+from .codec import JSONCodec, default_codec
+from .errors import TuyaAPIError, TuyaError
+from .metrics import Hook, RequestEvent, endpoint_template
+from .pagination import Page, Spec, iter_pages
+from .prepared import PreparedCall
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .status import DeviceStatus
+from .token import Token, TokenCache, TokenManager
+
+if TYPE_CHECKING:
+    from .groups import DeviceGroups
+
+# Endpoint de estado en lote: acepta hasta 20 ids separados por comas.
+BULK_STATUS_PATH = "/v1.0/iot-03/devices/status"
+BULK_STATUS_MAX_IDS = 20
+
 
-    def __init__(self, client_id: str, secret: str, base_url: str) -> None:
+class BaseTuyaClient:
+    """Firma y helpers comunes a los clientes síncrono y asíncrono."""
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        base_url: str,
+        *,
+        token_cache: Optional[str] = None,
+        refresh_margin: float = 300.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[ResponseCache] = None,
+        hooks: Optional[Iterable[Hook]] = None,
+        json_codec: Optional[JSONCodec] = None,
+    ) -> None:
         self.client_id = client_id
         self.secret = secret
         self.base_url = base_url.rstrip("/")
-        self.access_token: Optional[str] = None
-        self.session = requests.Session()
+        shared = TokenCache(token_cache, f"{client_id}@{self.base_url}") if token_cache else None
+        self.tokens = TokenManager(refresh_margin, shared)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.hooks: List[Hook] = list(hooks or [])
+        self.codec = json_codec or default_codec()
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.token.access_token if self.tokens.token else None
+
+    @access_token.setter
+    def access_token(self, value: Optional[str]) -> None:
+        self.tokens.set(Token(value) if value else None, persist=False)
+
+    # ---------- Instrumentación ----------
+    def add_hook(self, hook: Hook) -> None:
+        """Registra ``hook(event)``, llamado tras cada intento HTTP (ver ``metrics.RequestEvent``)."""
+        self.hooks.append(hook)
+
+    def _emit(
+        self,
+        method: str,
+        path: str,
+        status: Optional[int],
+        data: Any,
+        error: Optional[BaseException] = None,
+        cached: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> None:
+        code = data.get("code") if isinstance(data, dict) and not data.get("success", True) else None
+        event = RequestEvent(
+            method.upper(),
+            endpoint_template(path),
+            status,
+            code,
+            type(error).__name__ if error is not None else None,
+            cached,
+            timings,
+        )
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:  # un hook roto no debe tumbar la petición
+                pass
 
     # ---------- Helpers ----------
     @staticmethod
@@ -40,14 +118,13 @@ class TuyaClient:
         )
         return f"{path}?{q}" if q else path
 
-    @staticmethod
-    def _normalize_body(body: Any, headers: Optional[Dict[str, str]]) -> str:
+    def _normalize_body(self, body: Any, headers: Optional[Dict[str, str]]) -> str:
         if not body:
             return ""
 
         ct = (headers or {}).get("Content-Type", "").lower()
         if "application/json" in ct:
-            return body if isinstance(body, str) else json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+            return body if isinstance(body, str) else self.codec.dumps(body)
         if "application/x-www-form-urlencoded" in ct:
             return urlencode(body, doseq=True) if isinstance(body, (dict, list, tuple)) else str(body)
 
@@ -62,9 +139,11 @@ class TuyaClient:
     def _hmac_sha256_upper(self, text: str) -> str:
         return hmac.new(self.secret.encode(), text.encode(), hashlib.sha256).hexdigest().upper()
 
-    # ---------- Token ----------
-    def get_token(self, grant_type: int = 1, nonce: str = "") -> Dict[str, Any]:
-        path, query = "/v1.0/token", {"grant_type": str(grant_type)}
+    # ---------- Firma ----------
+    def _token_request(
+        self, path: str, query: Optional[Dict[str, Any]], nonce: str
+    ) -> Tuple[str, Dict[str, str]]:
+        """Devuelve (url, headers) firmados para ``GET /v1.0/token[/{refresh_token}]``."""
         t = self._now_ms()
         canonical = self._canonical_url(path, query)
         s2s = self._string_to_sign("GET", canonical, "", None, None)
@@ -79,26 +158,81 @@ class TuyaClient:
         if nonce:
             headers["nonce"] = nonce
 
-        response = self.session.get(self.base_url + canonical, headers=headers)
-        data = response.json()
-
-        if data.get("success") and data.get("result", {}).get("access_token"):
-            self.access_token = data["result"]["access_token"]
+        return self.base_url + canonical, headers
 
-        return data
+    def _renewal_path(self, grant_type: int = 1) -> Tuple[str, Optional[Dict[str, Any]], bool]:
+        """Elige entre el grant de refresh_token y uno nuevo: (path, query, es_refresh)."""
+        if self.tokens.can_refresh():
+            return f"/v1.0/token/{self.tokens.token.refresh_token}", None, True
+        return "/v1.0/token", {"grant_type": str(grant_type)}, False
 
-    # ---------- Requests ----------
-    def request(
+    def prepare(
         self,
         method: str,
-        path: str,
+        path_template: str,
         *,
-        query: Optional[Dict[str, Any]] = None,
+        query_keys: Optional[Iterable[str]] = None,
         headers: Optional[Dict[str, str]] = None,
-        body: Any = None,
         sig_headers: Optional[List[str]] = None,
-        nonce: str = "",
-    ) -> requests.Response:
+        idempotent: Optional[bool] = None,
+    ) -> PreparedCall:
+        """Precalcula la firma de una llamada repetida, p. ej. ``"/v1.0/devices/{device_id}/status"``."""
+        return PreparedCall(
+            self,
+            method,
+            path_template,
+            query_keys=query_keys,
+            headers=headers,
+            sig_headers=sig_headers,
+            idempotent=idempotent,
+        )
+
+    def _is_idempotent(self, method: str, body: Any, explicit: Optional[bool]) -> bool:
+        if self.retry_policy is None:
+            return False
+        return self.retry_policy.is_idempotent(method, body, explicit)
+
+    # ---------- Lotes ----------
+    @staticmethod
+    def _chunks(device_ids: Iterable[str], size: int) -> List[List[str]]:
+        ids = list(dict.fromkeys(device_ids))  # sin duplicados, conservando el orden
+        return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+    @staticmethod
+    def _split_bulk_status(chunk: List[str], data: Dict[str, Any], compact: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Reparte la respuesta del endpoint en lote en una respuesta por dispositivo.
+
+        Con ``compact`` cada ``result`` es un ``DeviceStatus`` en lugar de la lista de dicts.
+        """
+        if not data.get("success"):
+            error = {"success": False, "code": data.get("code"), "msg": data.get("msg")}
+            return {device_id: dict(error) for device_id in chunk}
+
+        t = data.get("t")
+        items = data.get("result") or []
+        if compact:
+            found = {item.get("id"): DeviceStatus.from_result(item.get("status") or [], t) for item in items}
+        else:
+            found = {item.get("id"): item.get("status", []) for item in items}
+        results = {}
+        for device_id in chunk:
+            if device_id in found:
+                results[device_id] = {"success": True, "result": found[device_id], "t": t}
+            else:
+                results[device_id] = {"success": False, "code": None, "msg": "Dispositivo sin estado en la respuesta"}
+        return results
+
+    def _signed_request(
+        self,
+        method: str,
+        path: str,
+        query: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        body: Any,
+        sig_headers: Optional[List[str]],
+        nonce: str,
+    ) -> Tuple[str, Dict[str, str], str]:
+        """Firma una petición de negocio y devuelve (url, headers, body_str)."""
         if not self.access_token:
             raise RuntimeError("Debes llamar primero a get_token().")
 
@@ -124,5 +258,315 @@ class TuyaClient:
 
         signed_headers.update({k: v for k, v in headers.items() if k not in signed_headers})
 
-        url = self.base_url + canonical
-        return self.session.request(method.upper(), url, headers=signed_headers, data=body_str.encode())
+        return self.base_url + canonical, signed_headers, body_str
+
+
+class TuyaClient(BaseTuyaClient):
+    """Cliente Python para la API Cloud de Tuya."""
+
+    def __init__(self, client_id: str, secret: str, base_url: str, **kwargs: Any) -> None:
+        super().__init__(client_id, secret, base_url, **kwargs)
+        self.session = requests.Session()
+
+    # ---------- Token ----------
+    def _token_get(self, path: str, query: Optional[Dict[str, Any]], nonce: str) -> Dict[str, Any]:
+        limiter = self.rate_limiter
+        if limiter:
+            limiter.acquire(self.client_id, "GET", path)
+        url, headers = self._token_request(path, query, nonce)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers)
+        except requests.RequestException as exc:
+            if self.hooks:
+                self._emit("GET", path, None, None, exc, timings={"total": time.perf_counter() - start})
+            raise
+        data = self.decode(response)
+        if self.hooks:
+            self._emit("GET", path, response.status_code, data, timings={"total": time.perf_counter() - start})
+        if limiter:
+            limiter.observe(self.client_id, "GET", path, limiter.is_rate_limited(response.status_code, data))
+        return data
+
+    def get_token(self, grant_type: int = 1, nonce: str = "") -> Dict[str, Any]:
+        data = self._token_get("/v1.0/token", {"grant_type": str(grant_type)}, nonce)
+        self.tokens.update(data)
+        return data
+
+    def refresh_token(self) -> Dict[str, Any]:
+        """Renueva con el grant de refresh_token (o pide uno nuevo si no hay)."""
+        path, query, is_refresh = self._renewal_path()
+        data = self._token_get(path, query, "")
+        if not self.tokens.update(data) and is_refresh:
+            data = self.get_token()  # refresh_token rechazado: pedir uno nuevo
+        return data
+
+    def _ensure_token(self) -> None:
+        """Renueva el token antes de que caduque; sólo un hilo/proceso renueva a la vez."""
+        tokens = self.tokens
+        if tokens.is_fresh():
+            return
+        with tokens.lock:
+            if tokens.is_fresh():
+                return
+            if tokens.cache is None:
+                tokens.check_renewal(self.refresh_token())
+                return
+            with tokens.cache.lock:
+                if not tokens.load_shared():
+                    tokens.check_renewal(self.refresh_token())
+
+    # ---------- Requests ----------
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        sig_headers: Optional[List[str]] = None,
+        nonce: str = "",
+        idempotent: Optional[bool] = None,
+    ) -> requests.Response:
+        """Petición firmada. ``idempotent=True`` permite reintentar un comando (ver ``RetryPolicy``)."""
+        return self._perform(
+            method,
+            path,
+            lambda n: self._signed_request(method, path, query, headers, body, sig_headers, n),
+            nonce=nonce,
+            idempotent=self._is_idempotent(method, body, idempotent),
+            cache_key=self._canonical_url(path, query) if self.cache is not None else None,
+        )
+
+    def _perform(
+        self,
+        method: str,
+        path: str,
+        sign: Callable[[str], Tuple[str, Dict[str, str], str]],
+        *,
+        nonce: str = "",
+        idempotent: bool = False,
+        cache_key: Optional[str] = None,
+    ) -> requests.Response:
+        """Sirve desde ``cache`` si procede; si no, envía e invalida/guarda en la caché."""
+        cache = self.cache
+        if cache is None or cache_key is None:
+            return self._dispatch(method, path, sign, nonce, idempotent)
+
+        if method.upper() != "GET":
+            response = self._dispatch(method, path, sign, nonce, idempotent)
+            cache.invalidate_path(cache_key)
+            return response
+
+        entry, stale = cache.lookup(cache_key)
+        if entry is not None:
+            if stale and cache.begin_revalidate(cache_key):
+                threading.Thread(
+                    target=self._revalidate, args=(method, path, sign, cache_key), daemon=True
+                ).start()
+            if self.hooks:
+                self._emit(method, path, entry.status, None, cached=True)
+            return self._cached_response(entry, cache_key)
+
+        response = self._dispatch(method, path, sign, nonce, idempotent)
+        self._cache_store(cache_key, response)
+        return response
+
+    def _revalidate(self, method: str, path: str, sign: Callable, cache_key: str) -> None:
+        try:
+            self._cache_store(cache_key, self._dispatch(method, path, sign, "", True))
+        except Exception:  # la copia caducada sigue sirviéndose hasta stale_until
+            pass
+        finally:
+            self.cache.end_revalidate(cache_key)
+
+    def _cache_store(self, cache_key: str, response: requests.Response) -> None:
+        data = self._error_payload(response)
+        if response.status_code == 200 and (data is None or data.get("success", True)):
+            self.cache.store(cache_key, response.content, response.status_code, dict(response.headers))
+
+    def _cached_response(self, entry: Any, cache_key: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry.status
+        response._content = entry.content
+        response.headers.update(entry.headers)
+        response.url = self.base_url + cache_key
+        response.encoding = "utf-8"
+        return response
+
+    def _dispatch(
+        self,
+        method: str,
+        path: str,
+        sign: Callable[[str], Tuple[str, Dict[str, str], str]],
+        nonce: str,
+        idempotent: bool,
+    ) -> requests.Response:
+        """Envía con la política de reintentos y el circuit breaker, si hay ``retry_policy``."""
+        policy = self.retry_policy
+        if policy is None:
+            return self._send(method, path, sign, nonce)
+
+        breaker = policy.breaker(self.base_url)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                response = self._send(method, path, sign, nonce)
+            except requests.RequestException as exc:
+                breaker.record(False)
+                # Un ConnectTimeout garantiza que la petición no salió: se puede repetir siempre.
+                retryable = idempotent or isinstance(exc, requests.ConnectTimeout)
+                if not retryable or attempt + 1 >= policy.max_attempts:
+                    raise
+            except BaseException:
+                breaker.record(False)  # p. ej. token renovado con un 503 en HTML: la sonda no queda colgada
+                raise
+            else:
+                breaker.record(response.status_code < 500)
+                data = self._error_payload(response)
+                if not idempotent or attempt + 1 >= policy.max_attempts or not policy.should_retry(
+                    response.status_code, data
+                ):
+                    if policy.raise_on_error and data is not None and not data.get("success", True):
+                        raise TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+                    return response
+
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+            if nonce:
+                nonce = uuid.uuid4().hex  # nunca reutilizar un nonce al re-firmar
+
+    def _send(
+        self, method: str, path: str, sign: Callable[[str], Tuple[str, Dict[str, str], str]], nonce: str
+    ) -> requests.Response:
+        """Renueva el token si hace falta, respeta la cuota, firma con ``sign`` y envía la petición."""
+        clock = time.perf_counter
+        t0 = clock()
+        self._ensure_token()
+        t1 = clock()
+        limiter = self.rate_limiter
+        if limiter:
+            limiter.acquire(self.client_id, method, path)
+        t2 = clock()
+        url, signed_headers, body_str = sign(nonce)
+        t3 = clock()
+        try:
+            response = self.session.request(method.upper(), url, headers=signed_headers, data=body_str.encode())
+        except requests.RequestException as exc:
+            if self.hooks:
+                self._emit(method, path, None, None, exc, timings={"total": clock() - t0})
+            raise
+        t4 = clock()
+        data = self._error_payload(response) if limiter or self.hooks else None
+        t5 = clock()
+        if limiter:
+            limiter.observe(self.client_id, method, path, limiter.is_rate_limited(response.status_code, data))
+        if self.hooks:
+            timings = {
+                "token": t1 - t0,
+                "queue": t2 - t1,
+                "sign": t3 - t2,
+                "ttfb": response.elapsed.total_seconds(),
+                "http": t4 - t3,
+                "decode": t5 - t4,
+                "total": t5 - t0,
+            }
+            self._emit(method, path, response.status_code, data, timings=timings)
+        return response
+
+    def decode(self, response: requests.Response) -> Any:
+        """Cuerpo JSON de ``response`` con el códec del cliente (en lugar de ``response.json()``)."""
+        return self.codec.loads(response.content)
+
+    def _error_payload(self, response: requests.Response) -> Optional[Dict[str, Any]]:
+        """JSON de la respuesta sólo si puede ser un error; evita decodificar las correctas."""
+        if response.status_code < 400 and b"false" not in response.content:
+            return None
+        try:
+            data = self.codec.loads(response.content)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def get_status_many(
+        self, device_ids: Iterable[str], max_workers: int = 8, compact: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Estado de muchos dispositivos con el endpoint en lote, en paralelo por bloques.
+
+        Devuelve ``device_id -> respuesta`` con la misma forma que ``/status``;
+        los fallos se informan por dispositivo con ``success: False``. Con
+        ``compact`` cada ``result`` es un ``DeviceStatus`` (ver ``tuya_client.status``).
+        """
+        chunks = self._chunks(device_ids, BULK_STATUS_MAX_IDS)
+
+        def fetch(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+            try:
+                data = self.decode(self.request("GET", BULK_STATUS_PATH, query={"device_ids": ",".join(chunk)}))
+            except TuyaAPIError as exc:  # raise_on_error
+                data = exc.response or {"success": False, "code": exc.code, "msg": exc.msg}
+            except (requests.RequestException, ValueError, TuyaError) as exc:  # incluye CircuitOpenError
+                data = {"success": False, "msg": f"{type(exc).__name__}: {exc}"}
+            return self._split_bulk_status(chunk, data, compact)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        if len(chunks) <= 1:
+            for chunk in chunks:
+                results.update(fetch(chunk))
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            for part in executor.map(fetch, chunks):
+                results.update(part)
+        return results
+
+    def send_commands_many(
+        self,
+        device_ids: Iterable[str],
+        commands: List[Dict[str, Any]],
+        *,
+        groups: Optional["DeviceGroups"] = None,
+        verify: bool = False,
+        max_workers: int = 16,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Mismo ``commands`` para muchos dispositivos; devuelve ``device_id -> respuesta``.
+
+        Con ``groups`` (``tuya_client.groups.DeviceGroups``) se envía por grupos
+        de Tuya, una llamada por grupo, y lo que no se pueda agrupar va uno a
+        uno; sin él, un ``POST /commands`` por dispositivo en paralelo.
+        """
+        if groups is not None:
+            return groups.send(device_ids, commands, verify=verify)
+        ids = list(dict.fromkeys(device_ids))
+
+        def send(device_id: str) -> Dict[str, Any]:
+            try:
+                return self.decode(
+                    self.request(
+                        "POST",
+                        f"/v1.0/devices/{device_id}/commands",
+                        body={"commands": commands},
+                        headers={"Content-Type": "application/json"},
+                    )
+                )
+            except (requests.RequestException, ValueError, TuyaError) as exc:
+                return {"success": False, "code": None, "msg": f"{type(exc).__name__}: {exc}"}
+
+        if len(ids) <= 1:
+            return {device_id: send(device_id) for device_id in ids}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(ids))) as executor:
+            return dict(zip(ids, executor.map(send, ids)))
+
+    def pages(self, spec: Spec, *, cursor: Any = None, prefetch: bool = True, **kwargs: Any) -> Iterator[Page]:
+        """Páginas de un listado (``PageSpec`` o ruta), pidiendo la siguiente mientras se procesa la actual.
+
+        ``Page.cursor`` se puede guardar y pasar como ``cursor`` para reanudar;
+        ``params`` rellena la ruta y ``query`` añade parámetros fijos.
+        """
+        return iter_pages(self, spec, cursor=cursor, prefetch=prefetch, **kwargs)
+
+    def iter_items(self, spec: Spec, **kwargs: Any) -> Iterator[Any]:
+        """Elementos de todas las páginas, uno a uno (memoria acotada a dos páginas)."""
+        for page in self.pages(spec, **kwargs):
+            yield from page.items
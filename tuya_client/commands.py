@@ -0,0 +1,226 @@
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .errors import TuyaAPIError
+from .retry import NON_IDEMPOTENT_CODES
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+
+class _Command:
+    __slots__ = ("code", "value", "futures")
+
+    def __init__(self, code: str, value: Any, future: "Future[Dict[str, Any]]") -> None:
+        self.code = code
+        self.value = value
+        self.futures = [future]
+
+
+class _Batch:
+    __slots__ = ("commands", "index", "barrier", "sealed", "deadline")
+
+    def __init__(self, deadline: float) -> None:
+        self.commands: List[_Command] = []
+        self.index: Dict[str, int] = {}
+        self.barrier = -1  # posición del último comando que no se puede fusionar
+        self.sealed = False
+        self.deadline = deadline
+
+
+class _DeviceQueue:
+    __slots__ = ("batches", "busy")
+
+    def __init__(self) -> None:
+        self.batches: Deque[_Batch] = deque()
+        self.busy = False
+
+
+class CommandDispatcher:
+    """Agrupa los comandos de un mismo dispositivo en un único ``POST /commands``.
+
+    - Los comandos que llegan dentro de ``window`` segundos se envían juntos en
+      un solo array ``commands`` (como máximo ``max_commands``).
+    - Escribir otra vez el mismo código sustituye el valor pendiente
+      (última escritura gana), salvo los de ``no_collapse`` (``charge_energy``):
+      esos nunca se fusionan y el segundo abre un lote nuevo.
+    - Los lotes de un dispositivo se envían de uno en uno y en orden.
+    - ``send()`` devuelve un ``Future`` por comando con el JSON de la respuesta
+      del lote, o ``TuyaAPIError`` si la nube la rechaza.
+    - ``on_ack(device_id, commands, respuesta)`` se llama con cada lote
+      aceptado (p. ej. ``DeviceShadow.acknowledge``).
+    """
+
+    def __init__(
+        self,
+        client: "TuyaClient",
+        *,
+        window: float = 0.05,
+        max_commands: int = 20,
+        no_collapse: Iterable[str] = NON_IDEMPOTENT_CODES,
+        max_workers: int = 8,
+        on_ack: Optional[Callable[[str, List[Dict[str, Any]], Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.client = client
+        self.on_ack = on_ack
+        self.window = window
+        self.max_commands = max_commands
+        self.no_collapse = frozenset(no_collapse)
+        self._devices: Dict[str, _DeviceQueue] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._closed = False
+        self.sent = self.merged = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # ---------- Encolado ----------
+    def send(self, device_id: str, code: str, value: Any) -> "Future[Dict[str, Any]]":
+        future: "Future[Dict[str, Any]]" = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CommandDispatcher cerrado")
+            self._enqueue(device_id, code, value, future)
+            self._cond.notify()
+        return future
+
+    def send_many(self, device_id: str, commands: Iterable[Tuple[str, Any]]) -> List["Future[Dict[str, Any]]"]:
+        """Encola varios ``(code, value)`` a la vez, en ese orden."""
+        futures = []
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CommandDispatcher cerrado")
+            for code, value in commands:
+                future: "Future[Dict[str, Any]]" = Future()
+                self._enqueue(device_id, code, value, future)
+                futures.append(future)
+            self._cond.notify()
+        return futures
+
+    def _enqueue(self, device_id: str, code: str, value: Any, future: "Future[Dict[str, Any]]") -> None:
+        queue = self._devices.get(device_id)
+        if queue is None:
+            queue = self._devices[device_id] = _DeviceQueue()
+        batch = queue.batches[-1] if queue.batches and not queue.batches[-1].sealed else None
+
+        if batch is not None and code in batch.index:
+            pos = batch.index[code]
+            if code not in self.no_collapse and pos > batch.barrier:
+                command = batch.commands[pos]
+                command.value = value
+                command.futures.append(future)
+                self.merged += 1
+                return
+            self._seal(device_id, batch)  # no fusionable: va en el siguiente lote
+            batch = None
+        if batch is None:
+            batch = _Batch(time.monotonic() + self.window)
+            queue.batches.append(batch)
+            heapq.heappush(self._heap, (batch.deadline, device_id))
+
+        batch.index[code] = len(batch.commands)
+        if code in self.no_collapse:
+            batch.barrier = len(batch.commands)
+        batch.commands.append(_Command(code, value, future))
+        if len(batch.commands) >= self.max_commands:
+            self._seal(device_id, batch)
+
+    def _seal(self, device_id: str, batch: _Batch) -> None:
+        batch.sealed = True
+        heapq.heappush(self._heap, (0.0, device_id))
+
+    # ---------- Envío ----------
+    def _loop(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, device_id = heapq.heappop(self._heap)
+                    self._kick(device_id, now)
+                if self._closed and not self._heap:
+                    return
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+
+    def _ready(self, queue: _DeviceQueue, now: float) -> bool:
+        return bool(queue.batches) and (queue.batches[0].sealed or queue.batches[0].deadline <= now or self._closed)
+
+    def _kick(self, device_id: str, now: float) -> None:
+        queue = self._devices.get(device_id)
+        if queue is not None and not queue.busy and self._ready(queue, now):
+            queue.busy = True
+            self._executor.submit(self._drain, device_id)
+
+    def _drain(self, device_id: str) -> None:
+        """Envía en orden los lotes listos de un dispositivo (un solo hilo por dispositivo)."""
+        while True:
+            with self._cond:
+                queue = self._devices[device_id]
+                if not self._ready(queue, time.monotonic()):
+                    queue.busy = False
+                    if not queue.batches:
+                        del self._devices[device_id]
+                    else:
+                        heapq.heappush(self._heap, (queue.batches[0].deadline, device_id))
+                        self._cond.notify()
+                    return
+                batch = queue.batches.popleft()
+            self._post(device_id, batch)
+
+    def _post(self, device_id: str, batch: _Batch) -> None:
+        body = {"commands": [{"code": c.code, "value": c.value} for c in batch.commands]}
+        try:
+            data = self.client.decode(
+                self.client.request(
+                    "POST",
+                    f"/v1.0/devices/{device_id}/commands",
+                    body=body,
+                    headers={"Content-Type": "application/json"},
+                )
+            )
+            error = None if data.get("success") else TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+        except Exception as exc:  # red, circuito abierto, JSON inválido...
+            data, error = None, exc
+        self.sent += 1
+        if error is None and self.on_ack is not None:
+            try:
+                self.on_ack(device_id, body["commands"], data)
+            except Exception:  # p. ej. la sombra; el comando ya se aceptó
+                pass
+        for command in batch.commands:
+            for future in command.futures:
+                if error is None:
+                    future.set_result(data)
+                else:
+                    future.set_exception(error)
+
+    # ---------- Ciclo de vida ----------
+    def flush(self) -> None:
+        """Marca como listos todos los lotes pendientes, sin esperar a ``window``."""
+        with self._cond:
+            for device_id, queue in self._devices.items():
+                for batch in queue.batches:
+                    batch.sealed = True
+                heapq.heappush(self._heap, (0.0, device_id))
+            self._cond.notify()
+
+    def close(self, wait: bool = True) -> None:
+        """Envía lo pendiente y detiene el despachador."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "CommandDispatcher":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
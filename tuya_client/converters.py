@@ -0,0 +1,189 @@
+import base64
+import json
+import threading
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from .errors import TuyaAPIError
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+Converter = Callable[[Any], Any]
+
+
+def _parse_values(values: Any) -> Dict[str, Any]:
+    if isinstance(values, dict):
+        return values
+    try:
+        parsed = json.loads(values or "{}")
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _integer(scale: int) -> Converter:
+    if scale <= 0:
+        return lambda v: v
+    divisor = 10 ** scale
+    return lambda v: v / divisor if isinstance(v, (int, float)) else v
+
+
+def _bitmap(labels: List[str]) -> Converter:
+    def convert(v: Any) -> Any:
+        if not isinstance(v, int):
+            return v
+        return [label for bit, label in enumerate(labels) if v >> bit & 1]
+
+    return convert
+
+
+def _raw(v: Any) -> Any:
+    if not isinstance(v, str):
+        return v
+    try:
+        return base64.b64decode(v)
+    except ValueError:
+        return v
+
+
+def _identity(v: Any) -> Any:
+    return v
+
+
+class DPSpec:
+    """Metadatos de un DP tomados de ``/specifications`` y su conversor compilado."""
+
+    __slots__ = ("code", "type", "unit", "scale", "range", "convert")
+
+    def __init__(self, code: str, dp_type: str, values: Dict[str, Any], convert: Converter) -> None:
+        self.code = code
+        self.type = dp_type
+        self.unit = values.get("unit", "")
+        self.scale = int(values.get("scale", 0) or 0)
+        self.range = values.get("range")
+        self.convert = convert
+
+    def format(self, value: Any) -> str:
+        if isinstance(value, float) and self.scale > 0:
+            text = f"{value:.{self.scale}f}"
+        elif isinstance(value, list):
+            text = ", ".join(map(str, value)) or "-"
+        elif isinstance(value, bytes):
+            text = value.hex()
+        else:
+            text = str(value)
+        return f"{text} {self.unit}" if self.unit else text
+
+
+def compile_dp(item: Dict[str, Any], override: Optional[Converter] = None) -> DPSpec:
+    """Compila un DP de la especificación (``{"code", "type", "values"}``) a su conversor."""
+    dp_type = str(item.get("type", "")).lower()
+    values = _parse_values(item.get("values"))
+
+    if override is not None:
+        convert = override
+    elif dp_type in ("integer", "value"):
+        convert = _integer(int(values.get("scale", 0) or 0))
+    elif dp_type == "bitmap":
+        convert = _bitmap(list(values.get("label") or []))
+    elif dp_type == "raw":
+        convert = _raw
+    else:  # boolean, enum, string, json
+        convert = _identity
+
+    return DPSpec(item["code"], dp_type, values, convert)
+
+
+class StatusConverter:
+    """Tabla ``code -> DPSpec`` de un modelo; convierte un payload ``/status`` en una pasada."""
+
+    def __init__(self, specs: Dict[str, DPSpec]) -> None:
+        self.specs = specs
+
+    @classmethod
+    def from_specification(
+        cls, result: Dict[str, Any], overrides: Optional[Dict[str, Converter]] = None
+    ) -> "StatusConverter":
+        overrides = overrides or {}
+        specs: Dict[str, DPSpec] = {}
+        # "status" (lo que reporta el equipo) tiene prioridad sobre "functions".
+        for item in list(result.get("functions") or []) + list(result.get("status") or []):
+            if item.get("code"):
+                specs[item["code"]] = compile_dp(item, overrides.get(item["code"]))
+        for code, override in overrides.items():
+            specs.setdefault(code, DPSpec(code, "", {}, override))
+        return cls(specs)
+
+    def convert(self, status: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """``[{"code", "value"}, ...]`` (o un ``DeviceStatus``) -> ``{code: valor convertido}``."""
+        specs = self.specs
+        pairs = status.items() if isinstance(status, Mapping) else ((item["code"], item["value"]) for item in status)
+        out = {}
+        for code, value in pairs:
+            spec = specs.get(code)
+            out[code] = spec.convert(value) if spec is not None else value
+        return out
+
+    def format(self, status: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Como ``convert`` pero con texto legible (valor + unidad)."""
+        specs = self.specs
+        out = {}
+        for code, value in self.convert(status).items():
+            spec = specs.get(code)
+            out[code] = spec.format(value) if spec is not None else str(value)
+        return out
+
+
+class ConverterRegistry:
+    """Conversores compilados por ``product_id``, compartidos por todos los equipos del modelo.
+
+    La especificación se descarga una sola vez por producto. El ``product_id``
+    de cada dispositivo se toma de ``learn()``/``set_product()`` (p. ej. con el
+    listado de dispositivos) y, si falta, de ``/v1.0/devices/{id}``; se cachea.
+    """
+
+    def __init__(self, client: "TuyaClient", overrides: Optional[Dict[str, Converter]] = None) -> None:
+        self.client = client
+        self.overrides = dict(overrides or {})
+        self._by_product: Dict[str, StatusConverter] = {}
+        self._product_of: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, product_id: str, specification: Dict[str, Any]) -> StatusConverter:
+        """Compila y guarda la especificación (``result`` de ``/specifications``) de un producto."""
+        converter = StatusConverter.from_specification(specification, self.overrides)
+        with self._lock:
+            return self._by_product.setdefault(product_id, converter)
+
+    def set_product(self, device_id: str, product_id: str) -> None:
+        self._product_of[device_id] = product_id
+
+    def learn(self, devices: Iterable[Mapping[str, Any]]) -> None:
+        """Registra ``product_id`` desde dicts de dispositivo (``id``/``product_id``), p. ej. de un listado."""
+        for device in devices:
+            if device.get("id") and device.get("product_id"):
+                self._product_of[device["id"]] = device["product_id"]
+
+    def product_of(self, device_id: str) -> str:
+        product_id = self._product_of.get(device_id)
+        if product_id is None:
+            data = self.client.decode(self.client.request("GET", f"/v1.0/devices/{device_id}"))
+            if not data.get("success"):
+                raise TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+            product_id = data["result"]["product_id"]
+            self._product_of[device_id] = product_id
+        return product_id
+
+    def for_device(self, device_id: str) -> StatusConverter:
+        product_id = self.product_of(device_id)
+        converter = self._by_product.get(product_id)
+        if converter is None:
+            data = self.client.decode(self.client.request("GET", f"/v1.0/devices/{device_id}/specifications"))
+            if not data.get("success"):
+                raise TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+            converter = self.register(product_id, data["result"])
+        return converter
+
+    def convert(self, device_id: str, status: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        return self.for_device(device_id).convert(status)
@@ -0,0 +1,19 @@
+from typing import Any, Dict, Optional
+
+
+class TuyaError(RuntimeError):
+    """Error base del cliente Tuya."""
+
+
+class TuyaAPIError(TuyaError):
+    """Respuesta de Tuya con ``success: false``."""
+
+    def __init__(self, code: Any, msg: str, response: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(f"Tuya API error {code}: {msg}")
+        self.code = code
+        self.msg = msg
+        self.response = response
+
+
+class CircuitOpenError(TuyaError):
+    """El circuito del endpoint regional está abierto: se falla sin llamar."""
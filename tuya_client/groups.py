@@ -0,0 +1,274 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import requests
+
+from .errors import TuyaError
+from .retry import NON_IDEMPOTENT_CODES
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+# API de grupos de dispositivos (mismo product_id y espacio por grupo).
+GROUP_PATH = "/v2.0/cloud/thing/group"
+GROUP_DEVICES_PATH = GROUP_PATH + "/{group_id}/devices"
+GROUP_PROPERTIES_PATH = GROUP_PATH + "/properties"
+GROUP_MAX_DEVICES = 100
+
+_JSON = {"Content-Type": "application/json"}
+
+
+def _failure(exc: BaseException) -> Dict[str, Any]:
+    return {"success": False, "code": None, "msg": f"{type(exc).__name__}: {exc}"}
+
+
+class DeviceGroups:
+    """Envía el mismo comando a muchos dispositivos con grupos de Tuya.
+
+    - Los dispositivos se agrupan por ``product_id`` (se aprende de
+      ``learn()`` con un listado o, si falta, de ``/v1.0/devices/{id}``) en
+      grupos de hasta ``max_size`` dentro de ``space_id``.
+    - Cada grupo se crea una vez y se reutiliza mientras sus miembros sean
+      los mismos; ``close()`` borra los creados.
+    - Un comando de grupo es una sola llamada a ``/properties``. Los grupos de
+      menos de ``min_size`` equipos, los que no se pueden crear, los equipos
+      que el grupo rechaza y los grupos cuyo envío falla pasan a comandos por
+      dispositivo en paralelo (``client.send_commands_many``).
+    - La nube acepta el comando de grupo en bloque: con ``verify`` se relee el
+      estado en lote y los equipos que no lo reflejan se reintentan uno a uno.
+    - Con comandos no idempotentes (``charge_energy``) nunca se reenvía lo
+      que pudo llegar: si el envío de grupo se corta sin respuesta o la
+      verificación no lo confirma, esos equipos se informan como fallidos.
+    """
+
+    def __init__(
+        self,
+        client: "TuyaClient",
+        space_id: Optional[str],
+        *,
+        min_size: int = 3,
+        max_size: int = GROUP_MAX_DEVICES,
+        max_workers: int = 16,
+        name_prefix: str = "tuya-client",
+    ) -> None:
+        self.client = client
+        self.space_id = space_id
+        self.min_size = max(2, min_size)
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self.name_prefix = name_prefix
+        self._products: Dict[str, Optional[str]] = {}
+        self._groups: Dict[Tuple[str, FrozenSet[str]], Tuple[str, List[str]]] = {}  # -> (group_id, rechazados)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._creating: Dict[Tuple[str, FrozenSet[str]], threading.Lock] = {}  # un solo creador por grupo
+        self.stats = {"group_commands": 0, "groups_created": 0, "fallback": 0}
+
+    # ---------- Productos ----------
+    def learn(self, devices: Iterable[Mapping[str, Any]]) -> None:
+        """Registra ``product_id`` desde dicts de dispositivo (``id``/``product_id``), p. ej. de un listado."""
+        with self._lock:
+            for device in devices:
+                if device.get("id") and device.get("product_id"):
+                    self._products[device["id"]] = device["product_id"]
+
+    def _product(self, device_id: str) -> Optional[str]:
+        try:
+            data = self.client.decode(self.client.request("GET", f"/v1.0/devices/{device_id}"))
+        except (requests.RequestException, ValueError, TuyaError):
+            return None
+        return (data.get("result") or {}).get("product_id") if data.get("success") else None
+
+    def products(self, device_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """``device_id -> product_id`` (``None`` si no se pudo averiguar); pide sólo los desconocidos."""
+        ids = list(dict.fromkeys(device_ids))
+        with self._lock:
+            missing = [d for d in ids if d not in self._products]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(missing)))) as executor:
+                found = dict(zip(missing, executor.map(self._product, missing)))
+            with self._lock:
+                for device_id, product_id in found.items():
+                    if product_id is not None:
+                        self._products[device_id] = product_id
+        with self._lock:
+            return {d: self._products.get(d) for d in ids}
+
+    # ---------- Grupos ----------
+    def plan(self, device_ids: Iterable[str]) -> Tuple[List[Tuple[str, List[str]]], List[str]]:
+        """Reparte en ``[(product_id, miembros)]`` agrupables y la lista que irá uno a uno."""
+        ids = list(dict.fromkeys(device_ids))
+        if self.space_id is None:
+            return [], ids
+        by_product: Dict[str, List[str]] = {}
+        singles: List[str] = []
+        for device_id, product_id in self.products(ids).items():
+            if product_id is None:
+                singles.append(device_id)
+            else:
+                by_product.setdefault(product_id, []).append(device_id)
+        groups: List[Tuple[str, List[str]]] = []
+        for product_id, members in by_product.items():
+            for i in range(0, len(members), self.max_size):
+                chunk = members[i:i + self.max_size]
+                if len(chunk) >= self.min_size:
+                    groups.append((product_id, chunk))
+                else:
+                    singles.extend(chunk)
+        return groups, singles
+
+    def _call(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        try:
+            return self.client.decode(self.client.request(method, path, **kwargs))
+        except (requests.RequestException, ValueError, TuyaError) as exc:
+            return _failure(exc)
+
+    def _ensure_group(self, product_id: str, members: List[str]) -> Tuple[Optional[str], List[str]]:
+        """Id del grupo con exactamente ``members`` (creándolo si hace falta) y los equipos rechazados."""
+        key = (product_id, frozenset(members))
+        with self._lock:
+            cached = self._groups.get(key)
+            creating = self._creating.setdefault(key, threading.Lock())
+        if cached is not None:
+            return cached[0], list(cached[1])
+        with creating:  # otro ``send()`` con los mismos miembros espera y reutiliza el grupo
+            with self._lock:
+                cached = self._groups.get(key)
+            if cached is not None:
+                return cached[0], list(cached[1])
+            return self._create_group(key, product_id, members)
+
+    def _create_group(
+        self, key: Tuple[str, FrozenSet[str]], product_id: str, members: List[str]
+    ) -> Tuple[Optional[str], List[str]]:
+        name = f"{self.name_prefix}-{product_id}-{next(self._seq)}"
+        data = self._call(
+            "POST", GROUP_PATH, body={"space_id": self.space_id, "name": name, "product_id": product_id}, headers=_JSON
+        )
+        result = data.get("result")
+        group_id = result.get("id") if isinstance(result, dict) else result
+        if not data.get("success") or group_id is None:
+            return None, list(members)
+        group_id = str(group_id)
+        self._count("groups_created")
+
+        path = GROUP_DEVICES_PATH.format(group_id=group_id)
+        data = self._call("POST", path, body={"device_ids": ",".join(members)}, headers=_JSON)
+        if not data.get("success"):
+            self._delete(group_id)
+            return None, list(members)
+        rejected: List[str] = []
+        if isinstance(data.get("result"), list):  # resultado por dispositivo
+            added = {r.get("device_id") for r in data["result"] if r.get("success", True)}
+            rejected = [d for d in members if d not in added]
+        accepted = [d for d in members if d not in rejected]
+        if len(accepted) < self.min_size:
+            self._delete(group_id)
+            return None, list(members)
+        with self._lock:
+            self._groups[key] = (group_id, rejected)
+        return group_id, rejected
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    def _delete(self, group_id: str) -> bool:
+        return bool(self._call("DELETE", f"{GROUP_PATH}/{group_id}").get("success"))
+
+    def _forget(self, group_id: str) -> None:
+        with self._lock:
+            for key, (ident, _) in list(self._groups.items()):
+                if ident == group_id:
+                    del self._groups[key]
+
+    # ---------- Envío ----------
+    def send(
+        self, device_ids: Iterable[str], commands: List[Dict[str, Any]], *, verify: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Envía ``commands`` a todos; devuelve ``device_id -> respuesta`` (las de grupo llevan ``group_id``)."""
+        ids = list(dict.fromkeys(device_ids))
+        properties = {c["code"]: c["value"] for c in commands}
+        resend = not any(c["code"] in NON_IDEMPOTENT_CODES for c in commands)
+        groups, singles = self.plan(ids)
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def issue(product_id: str, members: List[str]) -> Tuple[List[str], List[str]]:
+            group_id, rejected = self._ensure_group(product_id, members)
+            if group_id is None:
+                return [], members
+            accepted = [d for d in members if d not in rejected]
+            self._count("group_commands")
+            try:
+                data = self.client.decode(
+                    self.client.request(
+                        "POST",
+                        GROUP_PROPERTIES_PATH,
+                        body={"group_id": group_id, "properties": self.client.codec.dumps(properties)},
+                        headers=_JSON,
+                    )
+                )
+            except (requests.RequestException, ValueError, TuyaError) as exc:
+                if resend:
+                    return [], members
+                for device_id in accepted:  # pudo llegar: no se repite
+                    results[device_id] = dict(_failure(exc), group_id=group_id)
+                return [], rejected
+            if not data.get("success"):
+                self._forget(group_id)  # puede haber desaparecido; se recrea la próxima vez
+                return [], members
+            for device_id in accepted:
+                results[device_id] = {"success": True, "result": True, "t": data.get("t"), "group_id": group_id}
+            return accepted, rejected
+
+        sent: List[str] = []
+        if groups:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as executor:
+                for accepted, rest in executor.map(lambda g: issue(*g), groups):
+                    sent.extend(accepted)
+                    singles.extend(rest)
+
+        if verify and sent:
+            for device_id in self._unconfirmed(sent, commands):
+                if resend:
+                    singles.append(device_id)
+                else:
+                    results[device_id] = {
+                        "success": False,
+                        "code": None,
+                        "msg": "El estado no confirma el comando de grupo",
+                        "group_id": results[device_id]["group_id"],
+                    }
+        if singles:
+            self._count("fallback", len(singles))
+            results.update(self.client.send_commands_many(singles, commands, max_workers=self.max_workers))
+        return {d: results[d] for d in ids}
+
+    def _unconfirmed(self, device_ids: List[str], commands: List[Dict[str, Any]]) -> List[str]:
+        """Equipos cuyo estado no refleja los comandos (los no idempotentes no se comprueban)."""
+        expected = {c["code"]: c["value"] for c in commands if c["code"] not in NON_IDEMPOTENT_CODES}
+        if not expected:
+            return []
+        missing = []
+        for device_id, resp in self.client.get_status_many(device_ids, max_workers=self.max_workers).items():
+            values = {item["code"]: item["value"] for item in resp.get("result") or []} if resp.get("success") else {}
+            if any(values.get(code) != value for code, value in expected.items()):
+                missing.append(device_id)
+        return missing
+
+    def close(self) -> None:
+        """Borra los grupos creados por esta instancia."""
+        with self._lock:
+            group_ids = {group_id for group_id, _ in self._groups.values()}
+            self._groups.clear()
+            self._creating.clear()
+        for group_id in group_ids:
+            self._delete(group_id)
+
+    def __enter__(self) -> "DeviceGroups":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,341 @@
+import asyncio
+import base64
+import hashlib
+import inspect
+import json
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:  # dependencia opcional
+    aiohttp = None
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # dependencia opcional
+    Cipher = None
+
+if TYPE_CHECKING:
+    from .client import BaseTuyaClient
+
+# Endpoints Pulsar (WebSocket) del servicio de mensajes de Tuya por región.
+MQ_ENDPOINTS = {
+    "us": "wss://mqe.tuyaus.com:8285",
+    "eu": "wss://mqe.tuyaeu.com:8285",
+    "cn": "wss://mqe.tuyacn.com:8285",
+    "in": "wss://mqe.tuyain.com:8285",
+}
+ENV_PROD = "event"
+ENV_TEST = "event-test"
+
+Callback = Callable[["Event"], Union[None, Awaitable[None]]]
+
+
+class Event(NamedTuple):
+    message_id: str
+    protocol: int
+    t: int
+    data: Dict[str, Any]
+
+
+def _require_deps() -> None:
+    if aiohttp is None or Cipher is None:
+        raise RuntimeError("La suscripción a mensajes requiere aiohttp y cryptography.")
+
+
+def mq_password(client_id: str, secret: str) -> str:
+    """Contraseña Pulsar: ``md5(client_id + md5(secret))[8:24]``."""
+    inner = hashlib.md5(secret.encode()).hexdigest()
+    return hashlib.md5((client_id + inner).encode()).hexdigest()[8:24]
+
+
+def mq_key(secret: str) -> bytes:
+    """Clave AES de los payloads: ``secret[8:24]``."""
+    return secret[8:24].encode()
+
+
+def _unpad(block: bytes) -> bytes:
+    pad = block[-1] if block else 0
+    if not 1 <= pad <= 16 or block[-pad:] != bytes([pad]) * pad:
+        raise ValueError("Relleno PKCS7 inválido")
+    return block[:-pad]
+
+
+def decrypt_ecb_batch(key: bytes, blobs: List[bytes]) -> List[bytes]:
+    """Descifra muchos payloads AES-ECB con una sola pasada del cifrador.
+
+    ECB no encadena bloques, así que la concatenación se descifra de una vez y
+    luego se reparte por longitudes.
+    """
+    decryptor = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
+    plain = decryptor.update(b"".join(blobs)) + decryptor.finalize()
+    out, offset = [], 0
+    for blob in blobs:
+        out.append(_unpad(plain[offset:offset + len(blob)]))
+        offset += len(blob)
+    return out
+
+
+def decrypt_gcm(key: bytes, blob: bytes) -> bytes:
+    """AES-GCM: nonce (12 bytes) + texto cifrado + tag (16 bytes)."""
+    return AESGCM(key).decrypt(blob[:12], blob[12:], None)
+
+
+def encrypt_payload(secret: str, data: Dict[str, Any], mode: str = "aes_ecb") -> str:
+    """Cifra ``data`` como lo hace la nube (usado por el broker local)."""
+    key = mq_key(secret)
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    if mode == "aes_gcm":
+        nonce = os.urandom(12)
+        return base64.b64encode(nonce + AESGCM(key).encrypt(nonce, raw, None)).decode()
+    pad = 16 - len(raw) % 16
+    encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+    return base64.b64encode(encryptor.update(raw + bytes([pad]) * pad) + encryptor.finalize()).decode()
+
+
+class MessageSubscriber:
+    """Consumidor del flujo push de Tuya (Pulsar sobre WebSocket).
+
+    - Se autentica con el mismo ``client_id``/``secret`` que ``TuyaClient``.
+    - Descifra y decodifica los mensajes por lotes (``batch_size``).
+    - Entrega a callbacks (``on_message`` + ``run()``) o con ``async for``.
+    - ``max_pending`` acota la cola interna: si el consumidor va lento se deja
+      de leer del socket (backpressure) en lugar de acumular memoria.
+    - Los ACK se envían en bloque tras procesar cada evento (al menos una vez).
+      Con ``async for`` el evento se confirma al pedir el siguiente; tras un
+      ``break``, al cerrar (``close()`` o ``async with``). Si el cuerpo del
+      bucle o un callback lanza una excepción, el evento no se confirma y se
+      vuelve a entregar. Con ``auto_ack=False`` se confirma a mano con
+      ``ack(event)``.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        ws_url: str = MQ_ENDPOINTS["us"],
+        *,
+        env: str = ENV_PROD,
+        batch_size: int = 100,
+        batch_timeout: float = 0.05,
+        max_pending: int = 1000,
+        ack_interval: float = 0.5,
+        reconnect_delay: float = 5.0,
+        auto_ack: bool = True,
+    ) -> None:
+        _require_deps()
+        self.client_id = client_id
+        self.secret = secret
+        self.ws_url = ws_url.rstrip("/")
+        self.env = env
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.max_pending = max_pending
+        self.ack_interval = ack_interval
+        self.reconnect_delay = reconnect_delay
+        self.auto_ack = auto_ack
+        self.received = self.delivered = self.failed = 0
+        self._key = mq_key(secret)
+        self._callbacks: List[Callback] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._acks: List[str] = []
+        self._delivered: Optional[str] = None  # último evento entregado y aún sin ACK
+        self._ws: Any = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._closed = False
+
+    @classmethod
+    def from_client(cls, client: "BaseTuyaClient", ws_url: str = MQ_ENDPOINTS["us"], **kwargs: Any) -> "MessageSubscriber":
+        return cls(client.client_id, client.secret, ws_url, **kwargs)
+
+    @property
+    def url(self) -> str:
+        topic = f"persistent/{self.client_id}/out/{self.env}/{self.client_id}-sub"
+        return f"{self.ws_url}/ws/v2/consumer/{topic}?ackTimeoutMillis=3000&subscriptionType=Failover"
+
+    def _auth_headers(self) -> Dict[str, str]:
+        return {"username": self.client_id, "password": mq_password(self.client_id, self.secret)}
+
+    def on_message(self, callback: Callback) -> None:
+        """Registra ``callback(event)`` (función o corrutina) para ``run()``."""
+        self._callbacks.append(callback)
+
+    # ---------- Decodificación ----------
+    def decode_batch(self, frames: List[Dict[str, Any]]) -> List[Event]:
+        """Decodifica un lote de frames Pulsar; los ECB se descifran juntos."""
+        parsed = []
+        for frame in frames:
+            try:
+                payload = json.loads(base64.b64decode(frame["payload"]))
+                blob = base64.b64decode(payload["data"])
+                gcm = (frame.get("properties") or {}).get("em") == "aes_gcm"
+                parsed.append((frame["messageId"], payload, blob, gcm))
+            except (KeyError, TypeError, ValueError):  # frame ilegible: se confirma para no recibirlo de nuevo
+                self.failed += 1
+                if frame.get("messageId"):
+                    self._acks.append(frame["messageId"])
+
+        ecb = [p for p in parsed if not p[3]]
+        plains: Dict[int, bytes] = {}
+        if ecb:
+            try:
+                for item, plain in zip(ecb, decrypt_ecb_batch(self._key, [p[2] for p in ecb])):
+                    plains[id(item)] = plain
+            except ValueError:  # algún bloque corrupto: se reintenta uno a uno
+                for item in ecb:
+                    try:
+                        plains[id(item)] = decrypt_ecb_batch(self._key, [item[2]])[0]
+                    except ValueError:
+                        pass
+
+        events = []
+        for item in parsed:
+            message_id, payload, blob, gcm = item
+            try:
+                plain = decrypt_gcm(self._key, blob) if gcm else plains[id(item)]
+                data = json.loads(plain)
+            except Exception:  # descifrado o JSON inválido: se descarta y se confirma
+                self.failed += 1
+                self._acks.append(message_id)
+                continue
+            events.append(Event(message_id, int(payload.get("protocol", 0)), int(payload.get("t", 0)), data))
+        return events
+
+    # ---------- Conexión ----------
+    async def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._tasks = [asyncio.ensure_future(self._read_loop()), asyncio.ensure_future(self._ack_loop())]
+
+    async def _read_loop(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            while not self._closed:
+                try:
+                    async with session.ws_connect(self.url, headers=self._auth_headers(), heartbeat=30) as ws:
+                        self._ws = ws
+                        await self._consume(ws)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+                finally:
+                    self._ws = None
+                if not self._closed:
+                    await asyncio.sleep(self.reconnect_delay)
+        await self._queue.put(None)
+
+    async def _consume(self, ws: Any) -> None:
+        while not self._closed:
+            frames = []
+            try:
+                msg = await ws.receive()
+                while True:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        if frames:
+                            break
+                        return  # cerrado o error
+                    try:
+                        frame = json.loads(msg.data)
+                    except ValueError:
+                        frame = None
+                    if isinstance(frame, dict):
+                        frames.append(frame)
+                    else:
+                        self.failed += 1
+                    if len(frames) >= self.batch_size:
+                        break
+                    msg = await asyncio.wait_for(ws.receive(), self.batch_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.received += len(frames)
+            for event in self.decode_batch(frames):
+                await self._queue.put(event)  # bloquea si el consumidor va lento
+
+    async def _ack_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.ack_interval)
+            await self.flush_acks()
+
+    async def flush_acks(self) -> None:
+        ws = self._ws
+        if not self._acks or ws is None or ws.closed:
+            return
+        acks, self._acks = self._acks, []
+        try:
+            for message_id in acks:
+                await ws.send_str(json.dumps({"messageId": message_id}))
+        except (aiohttp.ClientError, ConnectionError):
+            self._acks[:0] = acks  # se reenvían al reconectar
+
+    def _ack(self, message_id: str) -> None:
+        self._acks.append(message_id)
+        self.delivered += 1
+        if len(self._acks) >= self.batch_size:
+            asyncio.ensure_future(self.flush_acks())
+
+    def ack(self, event: Event) -> None:
+        """Confirma ``event`` (para ``auto_ack=False``); el envío va en el siguiente bloque."""
+        self._ack(event.message_id)
+
+    def _ack_delivered(self) -> None:
+        message_id, self._delivered = self._delivered, None
+        if message_id is not None:
+            self._ack(message_id)
+
+    # ---------- Entrega ----------
+    async def __aiter__(self):
+        await self._start()
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            if self.auto_ack:
+                self._delivered = event.message_id
+            yield event
+            # Sólo se llega aquí si el consumidor pide el siguiente: un ``break``
+            # deja el evento pendiente para ``close()`` y una excepción, sin ACK.
+            self._ack_delivered()
+
+    async def run(self) -> None:
+        """Entrega cada evento a los callbacks registrados hasta ``close()``."""
+        async for event in self:
+            try:
+                for callback in self._callbacks:
+                    result = callback(event)
+                    if inspect.isawaitable(result):
+                        await result
+            except BaseException:
+                self._delivered = None  # no se confirma: se vuelve a entregar
+                raise
+
+    async def close(self) -> None:
+        """Cierra la conexión; confirma el evento que dejó un ``break``.
+
+        Si se llama mientras se propaga una excepción (``finally`` o
+        ``except``), ese evento se da por fallido y no se confirma.
+        """
+        await self._close(failed=sys.exc_info()[0] is not None)
+
+    async def __aenter__(self) -> "MessageSubscriber":
+        return self
+
+    async def __aexit__(self, exc_type: Any, *exc: Any) -> None:
+        await self._close(failed=exc_type is not None)
+
+    async def _close(self, failed: bool) -> None:
+        self._closed = True
+        if failed:
+            self._delivered = None
+        else:
+            self._ack_delivered()
+        await self.flush_acks()
+        if self._ws is not None:
+            await self._ws.close()
+        for task in self._tasks:
+            task.cancel()
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
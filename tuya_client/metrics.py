@@ -0,0 +1,224 @@
+import bisect
+import re
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Fases medidas en cada intento HTTP (segundos):
+#   token  -> renovación del token (si tocó)
+#   queue  -> espera en el RateLimiter
+#   sign   -> firma HMAC
+#   connect-> apertura de conexión (sólo AsyncTuyaClient, vía trazas de aiohttp)
+#   ttfb   -> hasta recibir las cabeceras de la respuesta
+#   http   -> ida y vuelta completa, cuerpo incluido
+#   decode -> decodificación del JSON para extraer el código de error
+#   total  -> todo lo anterior
+PHASES = ("token", "queue", "sign", "connect", "ttfb", "http", "decode", "total")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_INF = 'le="+Inf"'
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{12,}$")
+_WORD_SEGMENT = re.compile(r"^[a-z_-]*$")  # "status", "commands"...: no son identificadores
+_NAMED_AFTER = {"devices": "{device_id}", "token": "{refresh_token}", "users": "{uid}", "homes": "{home_id}"}
+
+
+@lru_cache(maxsize=4096)
+def endpoint_template(path: str) -> str:
+    """Ruta sin query y con los identificadores normalizados.
+
+    ``/v1.0/devices/eb12.../status`` -> ``/v1.0/devices/{device_id}/status``.
+    """
+    parts = path.split("?", 1)[0].split("/")
+    for i in range(1, len(parts)):
+        name = _NAMED_AFTER.get(parts[i - 1])
+        if name is not None and not _WORD_SEGMENT.match(parts[i]):
+            parts[i] = name
+        elif _ID_SEGMENT.match(parts[i]):
+            parts[i] = "{id}"
+    return "/".join(parts)
+
+
+class RequestEvent:
+    """Lo que ve un hook tras cada intento HTTP (o cada acierto de caché)."""
+
+    __slots__ = ("method", "endpoint", "status", "code", "error", "cached", "timings")
+
+    def __init__(
+        self,
+        method: str,
+        endpoint: str,
+        status: Optional[int] = None,
+        code: Any = None,
+        error: Optional[str] = None,
+        cached: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.method = method
+        self.endpoint = endpoint
+        self.status = status  # None si no hubo respuesta
+        self.code = code  # código Tuya cuando ``success: false``
+        self.error = error  # tipo de excepción de red/timeout
+        self.cached = cached
+        self.timings = timings or {}
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and self.code is None and self.status is not None and self.status < 400
+
+    def __repr__(self) -> str:
+        return (
+            f"RequestEvent({self.method} {self.endpoint} status={self.status} code={self.code} "
+            f"error={self.error} cached={self.cached} total={self.timings.get('total')})"
+        )
+
+
+Hook = Callable[[RequestEvent], None]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsCollector:
+    """Hook que acumula histogramas de latencia y contadores de error.
+
+    Se registra con ``client.add_hook(collector)`` y exporta en formato de
+    texto de Prometheus con ``render()`` o ``serve(port)``:
+
+    - ``tuya_request_duration_seconds{method,endpoint}`` (histograma, total)
+    - ``tuya_request_phase_seconds{phase,endpoint}`` (histograma por fase)
+    - ``tuya_requests_total{method,endpoint,status}``
+    - ``tuya_api_errors_total{endpoint,code}`` (``success: false``)
+    - ``tuya_transport_errors_total{endpoint,error}``
+    - ``tuya_cache_hits_total{endpoint}``
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, namespace: str = "tuya") -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self.duration: Dict[Tuple[str, str], Histogram] = {}
+        self.phases: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.api_errors: Dict[Tuple[str, str], int] = {}
+        self.transport_errors: Dict[Tuple[str, str], int] = {}
+        self.cache_hits: Dict[Tuple[str], int] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict[Tuple[str, str], Histogram], key: Tuple[str, str]) -> Histogram:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram(self.buckets)
+        return hist
+
+    def __call__(self, event: RequestEvent) -> None:
+        endpoint = event.endpoint
+        with self._lock:
+            if event.cached:
+                self.cache_hits[(endpoint,)] = self.cache_hits.get((endpoint,), 0) + 1
+                return
+            status = "error" if event.status is None else str(event.status)
+            key = (event.method, endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if event.error is not None:
+                ekey = (endpoint, event.error)
+                self.transport_errors[ekey] = self.transport_errors.get(ekey, 0) + 1
+            if event.code is not None:
+                ckey = (endpoint, str(event.code))
+                self.api_errors[ckey] = self.api_errors.get(ckey, 0) + 1
+            for phase, seconds in event.timings.items():
+                if phase == "total":
+                    self._histogram(self.duration, (event.method, endpoint)).observe(seconds)
+                else:
+                    self._histogram(self.phases, (phase, endpoint)).observe(seconds)
+
+    # ---------- Exportación ----------
+    def _render_histograms(
+        self, out: List[str], name: str, help_text: str, names: Tuple[str, ...], table: Dict[Tuple[str, str], Histogram]
+    ) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} histogram")
+        for key, hist in sorted(table.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist.counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                out.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            out.append(f"{name}_bucket{_labels(names, key, _INF)} {hist.count}")
+            out.append(f"{name}_sum{_labels(names, key)} {hist.sum}")
+            out.append(f"{name}_count{_labels(names, key)} {hist.count}")
+
+    @staticmethod
+    def _render_counter(out: List[str], name: str, help_text: str, names: Tuple[str, ...], table: Dict) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} counter")
+        for key, value in sorted(table.items()):
+            out.append(f"{name}{_labels(names, key)} {value}")
+
+    def render(self) -> str:
+        ns = self.namespace
+        out: List[str] = []
+        with self._lock:
+            self._render_histograms(
+                out, f"{ns}_request_duration_seconds", "Latencia total por intento HTTP.",
+                ("method", "endpoint"), self.duration,
+            )
+            self._render_histograms(
+                out, f"{ns}_request_phase_seconds", "Latencia por fase de la petición.",
+                ("phase", "endpoint"), self.phases,
+            )
+            self._render_counter(
+                out, f"{ns}_requests_total", "Intentos HTTP por estado.", ("method", "endpoint", "status"), self.requests
+            )
+            self._render_counter(
+                out, f"{ns}_api_errors_total", "Respuestas con success=false.", ("endpoint", "code"), self.api_errors
+            )
+            self._render_counter(
+                out, f"{ns}_transport_errors_total", "Errores de red o timeout.", ("endpoint", "error"),
+                self.transport_errors,
+            )
+            self._render_counter(out, f"{ns}_cache_hits_total", "Respuestas servidas desde caché.", ("endpoint",),
+                                 self.cache_hits)
+        return "\n".join(out) + "\n"
+
+    def serve(self, port: int = 9108, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Expone ``/metrics`` en un hilo en segundo plano; ``server.shutdown()`` lo detiene."""
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = collector.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,200 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .errors import TuyaAPIError
+
+if TYPE_CHECKING:
+    from .async_client import AsyncTuyaClient
+    from .client import TuyaClient
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    cursor: Any  # cursor con el que se pidió esta página (para reanudar desde ella)
+    next_cursor: Any  # None en la última página
+
+
+class PageSpec:
+    """Cómo se pagina un endpoint de listado de Tuya.
+
+    Dos estilos:
+
+    - por clave de fila (``numbered=False``): se envía ``cursor_param`` con
+      el valor que la respuesta devolvió en ``next_key`` (``last_row_key``,
+      ``next_row_key``...);
+    - por número de página (``numbered=True``): ``cursor_param`` es
+      ``page_no`` y empieza en 1.
+
+    Si no se indica ``items_key`` se usa la primera lista del ``result``; el
+    fin se detecta con ``has_more_key`` (por defecto ``has_more``/``has_next``),
+    con ``total`` o con una página incompleta.
+    """
+
+    __slots__ = ("path", "cursor_param", "next_key", "size_param", "page_size", "items_key", "has_more_key",
+                 "numbered")
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        cursor_param: str = "last_row_key",
+        next_key: Optional[str] = None,
+        size_param: str = "size",
+        page_size: int = 20,
+        items_key: Optional[str] = None,
+        has_more_key: Optional[str] = None,
+        numbered: bool = False,
+    ) -> None:
+        self.path = path
+        self.cursor_param = cursor_param
+        self.next_key = next_key or cursor_param
+        self.size_param = size_param
+        self.page_size = page_size
+        self.items_key = items_key
+        self.has_more_key = has_more_key
+        self.numbered = numbered
+
+    def first_cursor(self, cursor: Any) -> Any:
+        if cursor is None and self.numbered:
+            return 1
+        return cursor
+
+    def query(self, cursor: Any, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        query = dict(extra or {})
+        query[self.size_param] = self.page_size
+        if cursor is not None and cursor != "":
+            query[self.cursor_param] = cursor
+        return query
+
+    def parse(self, result: Any, cursor: Any) -> Tuple[List[Any], Any]:
+        """``result`` de una página -> ``(items, siguiente cursor o None)``."""
+        if isinstance(result, list):
+            return result, None
+        if not isinstance(result, dict):
+            return [], None
+        if self.items_key is not None:
+            items = result.get(self.items_key) or []
+        else:
+            items = next((v for v in result.values() if isinstance(v, list)), [])
+
+        if self.has_more_key is not None:
+            has_more = result.get(self.has_more_key)
+        else:
+            has_more = result.get("has_more", result.get("has_next"))
+        if has_more is None:
+            total = result.get("total")
+            if self.numbered and isinstance(total, int):
+                has_more = cursor * self.page_size < total
+            else:
+                has_more = len(items) >= self.page_size
+        if not has_more or not items:
+            return items, None
+
+        if self.numbered:
+            return items, cursor + 1
+        next_cursor = result.get(self.next_key)
+        return items, next_cursor if next_cursor not in (None, "", cursor) else None
+
+
+# Listados conocidos.
+ASSOCIATED_USER_DEVICES = PageSpec("/v1.0/iot-01/associated-users/devices", items_key="devices")
+DEVICE_LOGS = PageSpec(
+    "/v1.0/devices/{device_id}/logs",
+    cursor_param="start_row_key",
+    next_key="next_row_key",
+    items_key="logs",
+    has_more_key="has_next",
+    page_size=100,
+)
+
+# Informes de DPs (v2): requiere ``codes``, ``start_time`` y ``end_time`` (ms).
+REPORT_LOGS = PageSpec("/v2.0/cloud/thing/{device_id}/report-logs", items_key="logs", page_size=100)
+
+Spec = Union[str, PageSpec]
+
+
+def _spec(spec: Spec) -> PageSpec:
+    return spec if isinstance(spec, PageSpec) else PageSpec(spec)
+
+
+def _check(data: Any) -> Any:
+    if not isinstance(data, dict) or not data.get("success"):
+        data = data if isinstance(data, dict) else {}
+        raise TuyaAPIError(data.get("code"), data.get("msg", ""), data)
+    return data.get("result")
+
+
+def iter_pages(
+    client: "TuyaClient",
+    spec: Spec,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    query: Optional[Dict[str, Any]] = None,
+    cursor: Any = None,
+    prefetch: bool = True,
+) -> Iterator[Page]:
+    """Recorre las páginas pidiendo la siguiente en segundo plano mientras se consume la actual.
+
+    Como mucho hay dos páginas en memoria. ``cursor`` (el ``Page.cursor`` de
+    una ejecución anterior) reanuda desde esa página.
+    """
+    spec = _spec(spec)
+    path = spec.path.format(**params) if params else spec.path
+
+    def fetch(c: Any) -> Tuple[List[Any], Any]:
+        return spec.parse(_check(client.decode(client.request("GET", path, query=spec.query(c, query)))), c)
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending: Optional["Future[Tuple[List[Any], Any]]"] = None
+    try:
+        current = spec.first_cursor(cursor)
+        items, next_cursor = fetch(current)
+        while True:
+            if next_cursor is not None and executor is not None:
+                pending = executor.submit(fetch, next_cursor)
+            yield Page(items, current, next_cursor)
+            if next_cursor is None:
+                return
+            current = next_cursor
+            items, next_cursor = pending.result() if pending is not None else fetch(current)
+            pending = None
+    finally:
+        if executor is not None:
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+
+async def aiter_pages(
+    client: "AsyncTuyaClient",
+    spec: Spec,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    query: Optional[Dict[str, Any]] = None,
+    cursor: Any = None,
+    prefetch: bool = True,
+) -> AsyncIterator[Page]:
+    """Versión asíncrona de ``iter_pages``: la siguiente página se pide en una tarea."""
+    spec = _spec(spec)
+    path = spec.path.format(**params) if params else spec.path
+
+    async def fetch(c: Any) -> Tuple[List[Any], Any]:
+        return spec.parse(_check(await client.request("GET", path, query=spec.query(c, query))), c)
+
+    pending: Optional["asyncio.Task[Tuple[List[Any], Any]]"] = None
+    try:
+        current = spec.first_cursor(cursor)
+        items, next_cursor = await fetch(current)
+        while True:
+            if next_cursor is not None and prefetch:
+                pending = asyncio.ensure_future(fetch(next_cursor))
+            yield Page(items, current, next_cursor)
+            if next_cursor is None:
+                return
+            current = next_cursor
+            items, next_cursor = await pending if pending is not None else await fetch(current)
+            pending = None
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,245 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from .client import BULK_STATUS_MAX_IDS, BULK_STATUS_PATH, TuyaClient
+from .errors import CircuitOpenError, TuyaAPIError, TuyaError
+
+
+class ShardUnavailableError(TuyaError):
+    """Ningún shard (ni sus respaldos) pudo atender al dispositivo."""
+
+
+class TuyaClientPool:
+    """Varios proyectos/regiones de Tuya detrás de una sola interfaz.
+
+    - Cada shard es un ``TuyaClient`` con su credencial y endpoint regional;
+      cada uno tiene su propia cuota, así que el throughput total crece con
+      el número de proyectos.
+    - Un índice ``device_id -> shard`` (opcionalmente persistido en
+      ``index_path``) enruta cada llamada. Los dispositivos desconocidos se
+      descubren con el endpoint de estado en lote: cada proyecto sólo
+      devuelve los suyos.
+    - ``failover`` indica a qué shards acudir si uno cae (p. ej. el mismo
+      proyecto por otro endpoint, o un proyecto con los mismos equipos
+      vinculados). Un shard con errores de red o 5xx queda fuera
+      ``cooldown`` segundos.
+    - Un dispositivo que ningún shard reconoce no se vuelve a buscar hasta
+      pasados ``unknown_ttl`` segundos (sólo si respondieron todos los shards).
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, TuyaClient],
+        *,
+        failover: Optional[Dict[str, Iterable[str]]] = None,
+        index_path: Optional[str] = None,
+        cooldown: float = 30.0,
+        workers_per_shard: int = 4,
+        unknown_ttl: float = 300.0,
+    ) -> None:
+        if not shards:
+            raise ValueError("Hace falta al menos un shard")
+        self.shards = dict(shards)
+        self.failover = {name: list(backups) for name, backups in (failover or {}).items()}
+        self.index_path = index_path
+        self.cooldown = cooldown
+        self.workers_per_shard = workers_per_shard
+        self.unknown_ttl = unknown_ttl
+        self.index: Dict[str, str] = {}
+        self._unknown: Dict[str, float] = {}  # device_id -> monotonic hasta el que no se rebusca
+        self._down_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if index_path and os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            self.index = {d: s for d, s in loaded.items() if s in self.shards}
+
+    @classmethod
+    def from_credentials(cls, credentials: Iterable[Dict[str, str]], **kwargs: Any) -> "TuyaClientPool":
+        """``[{"name", "client_id", "secret", "base_url"}, ...]``; ``client_kwargs`` va a cada cliente."""
+        client_kwargs = kwargs.pop("client_kwargs", {})
+        shards = {
+            c["name"]: TuyaClient(c["client_id"], c["secret"], c["base_url"], **client_kwargs) for c in credentials
+        }
+        return cls(shards, **kwargs)
+
+    # ---------- Índice ----------
+    def register(self, device_id: str, shard: str) -> None:
+        if shard not in self.shards:
+            raise KeyError(shard)
+        with self._lock:
+            self.index[device_id] = shard
+            self._unknown.pop(device_id, None)
+
+    def save(self) -> None:
+        """Persiste el índice de forma atómica (fichero temporal + ``os.replace``)."""
+        if not self.index_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tuya-index-")
+        with self._lock:
+            snapshot = dict(self.index)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(snapshot, fh)
+        os.replace(tmp, self.index_path)
+
+    def discover(self, device_ids: Iterable[str]) -> Dict[str, str]:
+        """Asigna shard a los dispositivos no indexados; devuelve los nuevos ``device_id -> shard``."""
+        now = time.monotonic()
+        with self._lock:
+            pending = [
+                d for d in dict.fromkeys(device_ids) if d not in self.index and self._unknown.get(d, 0.0) <= now
+            ]
+        found: Dict[str, str] = {}
+        healthy = self._healthy_order()
+        complete = len(healthy) == len(self.shards)  # un shard sin consultar puede ser el dueño
+        for name in healthy:
+            if not pending:
+                break
+            chunks = TuyaClient._chunks(pending, BULK_STATUS_MAX_IDS)
+            client = self.shards[name]
+            with ThreadPoolExecutor(max_workers=min(self.workers_per_shard, len(chunks))) as executor:
+                for owned in executor.map(lambda chunk: self._owned(name, client, chunk), chunks):
+                    if owned is None:
+                        complete = False
+                        continue
+                    for device_id in owned:
+                        found[device_id] = name
+            pending = [d for d in pending if d not in found]
+        with self._lock:
+            self.index.update(found)
+            if complete:
+                until = time.monotonic() + self.unknown_ttl
+                for device_id in pending:
+                    self._unknown[device_id] = until
+        if found:
+            self.save()
+        return found
+
+    def _owned(self, name: str, client: TuyaClient, chunk: List[str]) -> Optional[List[str]]:
+        """Dispositivos de ``chunk`` que pertenecen al shard; ``None`` si el shard no contestó bien."""
+        data = self._bulk(name, client, chunk)
+        if data is None or not data.get("success"):
+            return None
+        return [item.get("id") for item in data.get("result") or [] if item.get("id") in chunk]
+
+    # ---------- Salud y enrutado ----------
+    def _healthy_order(self) -> List[str]:
+        now = time.monotonic()
+        return [n for n in self.shards if self._down_until.get(n, 0.0) <= now]
+
+    def _mark_down(self, name: str) -> None:
+        self._down_until[name] = time.monotonic() + self.cooldown
+
+    def route(self, device_id: str) -> List[str]:
+        """Shards candidatos para ``device_id``: el dueño y sus respaldos, sanos primero."""
+        owner = self.index.get(device_id)
+        if owner is None:
+            self.discover([device_id])
+            owner = self.index.get(device_id)
+            if owner is None:
+                raise ShardUnavailableError(f"Ningún shard conoce el dispositivo {device_id}")
+        chain = [owner] + [b for b in self.failover.get(owner, []) if b in self.shards]
+        now = time.monotonic()
+        healthy = [n for n in chain if self._down_until.get(n, 0.0) <= now]
+        return healthy + [n for n in chain if n not in healthy]  # si todo está caído, se intenta igual
+
+    def client_for(self, device_id: str) -> TuyaClient:
+        return self.shards[self.route(device_id)[0]]
+
+    # ---------- Llamadas ----------
+    def request(self, device_id: str, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """``client.request`` en el shard del dispositivo, con failover si el shard falla."""
+        last_error: Optional[BaseException] = None
+        for name in self.route(device_id):
+            try:
+                response = self.shards[name].request(method, path, **kwargs)
+            except (requests.RequestException, CircuitOpenError) as exc:
+                # Un comando sólo se repite en otro shard si seguro que no salió.
+                if method.upper() != "GET" and not isinstance(exc, (requests.ConnectTimeout, CircuitOpenError)):
+                    raise
+                self._mark_down(name)
+                last_error = exc
+                continue
+            if response.status_code >= 500:
+                self._mark_down(name)
+                if method.upper() != "GET":
+                    return response  # pudo aplicarse: no se reenvía a otro shard
+                last_error = requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                continue
+            return response
+        raise ShardUnavailableError(f"Sin shard disponible para {device_id}: {last_error}")
+
+    def _bulk(self, name: str, client: TuyaClient, chunk: List[str]) -> Optional[Dict[str, Any]]:
+        """Estado en lote en un shard; ``None`` (y shard marcado caído) si no responde."""
+        try:
+            response = client.request("GET", BULK_STATUS_PATH, query={"device_ids": ",".join(chunk)})
+            if response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            return client.decode(response)
+        except TuyaAPIError as exc:  # raise_on_error: el shard contestó
+            return exc.response or {"success": False, "code": exc.code, "msg": exc.msg}
+        except (requests.RequestException, ValueError, RuntimeError):  # TuyaError y la renovación del token
+            self._mark_down(name)
+            return None
+
+    def get_status_many(self, device_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Estado de muchos dispositivos repartido por shard y en paralelo entre shards.
+
+        Mismo formato que ``TuyaClient.get_status_many``; si un shard cae, sus
+        bloques se reintentan en sus respaldos.
+        """
+        ids = list(dict.fromkeys(device_ids))
+        self.discover(ids)
+        results: Dict[str, Dict[str, Any]] = {}
+        by_shard: Dict[str, List[str]] = {}
+        for device_id in ids:
+            owner = self.index.get(device_id)
+            if owner is None:
+                results[device_id] = {"success": False, "code": None, "msg": "Dispositivo sin shard"}
+            else:
+                by_shard.setdefault(owner, []).append(device_id)
+
+        tasks: List[Tuple[str, List[str]]] = [
+            (owner, chunk)
+            for owner, members in by_shard.items()
+            for chunk in TuyaClient._chunks(members, BULK_STATUS_MAX_IDS)
+        ]
+        if not tasks:
+            return results
+
+        def fetch(task: Tuple[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+            owner, chunk = task
+            chain = [owner] + [b for b in self.failover.get(owner, []) if b in self.shards]
+            now = time.monotonic()
+            chain.sort(key=lambda n: self._down_until.get(n, 0.0) > now)  # sanos primero, orden estable
+            for name in chain:
+                data = self._bulk(name, self.shards[name], chunk)
+                if data is not None:
+                    return TuyaClient._split_bulk_status(chunk, data)
+            error = {"success": False, "code": None, "msg": "Shard y respaldos no disponibles"}
+            return {device_id: dict(error) for device_id in chunk}
+
+        workers = min(len(tasks), self.workers_per_shard * len(self.shards))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for part in executor.map(fetch, tasks):
+                results.update(part)
+        return results
+
+    def get_token(self) -> Dict[str, Dict[str, Any]]:
+        """Obtiene el token de todos los shards; devuelve la respuesta de cada uno."""
+        out = {}
+        for name, client in self.shards.items():
+            try:
+                out[name] = client.get_token()
+            except requests.RequestException as exc:
+                self._mark_down(name)
+                out[name] = {"success": False, "msg": f"{type(exc).__name__}: {exc}"}
+        return out
@@ -0,0 +1,131 @@
+import hashlib
+import hmac
+import string
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    from .client import BaseTuyaClient
+
+EMPTY_BODY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def _quote(value: Any) -> str:
+    return quote("" if value is None else str(value), safe="")
+
+
+class PreparedCall:
+    """Plantilla de llamada reutilizable con la parte invariante de la firma precalculada.
+
+    Se obtiene con ``client.prepare(method, path_template)``; cada llamada sólo
+    rellena los parámetros de la ruta, ``t`` y el HMAC final::
+
+        status = client.prepare("GET", "/v1.0/devices/{device_id}/status")
+        resp = status(device_id="abc123")
+    """
+
+    def __init__(
+        self,
+        client: "BaseTuyaClient",
+        method: str,
+        path_template: str,
+        *,
+        query_keys: Optional[Iterable[str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        sig_headers: Optional[List[str]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> None:
+        if not path_template.startswith("/"):
+            path_template = "/" + path_template
+
+        self.client = client
+        self.method = method.upper()
+        self.path_template = path_template
+        self.headers = dict(headers or {})
+        self.idempotent = idempotent
+        self._has_fields = any(name for _, name, _, _ in string.Formatter().parse(path_template))
+
+        # Objeto HMAC con la clave ya cargada; por llamada sólo se copia.
+        self._hmac = hmac.new(client.secret.encode(), digestmod=hashlib.sha256)
+
+        hdr_block = "".join(f"{k}:{self.headers.get(k, '')}\n" for k in (sig_headers or []))
+        self._s2s_head = f"{self.method}\n"
+        self._s2s_hdr = f"\n{hdr_block}\n"
+        self._empty_s2s_prefix = self._s2s_head + EMPTY_BODY_SHA256 + self._s2s_hdr
+
+        # Orden de la query fijado de antemano: (clave, "clave_codificada=")
+        self._query_layout: Optional[List[Tuple[str, str]]] = None
+        self._query_keys: frozenset = frozenset()
+        if query_keys is not None:
+            self._query_layout = [(k, f"{_quote(k)}=") for k in sorted(query_keys)]
+            self._query_keys = frozenset(query_keys)
+
+        skeleton = {"client_id": client.client_id, "sign_method": "HMAC-SHA256"}
+        if sig_headers:
+            skeleton["Signature-Headers"] = ":".join(sig_headers)
+        reserved = {"client_id", "t", "sign", "sign_method", "access_token", "nonce", "Signature-Headers"}
+        skeleton.update({k: v for k, v in self.headers.items() if k not in reserved})
+        self._header_skeleton = skeleton
+
+    def _canonical(self, query: Optional[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        path = self.path_template.format(**params) if self._has_fields else self.path_template
+        if not query:
+            return path
+        if self._query_layout is not None and query.keys() == self._query_keys:
+            q = "&".join(prefix + _quote(query[k]) for k, prefix in self._query_layout)
+        else:
+            return self.client._canonical_url(path, query)
+        return f"{path}?{q}"
+
+    def sign(
+        self,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        nonce: str = "",
+        **params: Any,
+    ) -> Tuple[str, Dict[str, str], str]:
+        """Firma una llamada y devuelve (url, headers, body_str) como ``_signed_request``."""
+        token = self.client.access_token
+        if not token:
+            raise RuntimeError("Debes llamar primero a get_token().")
+
+        canonical = self._canonical(query, params)
+        body_str = self.client._normalize_body(body, self.headers) if body else ""
+        if body_str:
+            body_hash = hashlib.sha256(body_str.encode("utf-8")).hexdigest()
+            s2s = self._s2s_head + body_hash + self._s2s_hdr + canonical
+        else:
+            s2s = self._empty_s2s_prefix + canonical
+
+        t = str(int(time.time() * 1000))
+        mac = self._hmac.copy()
+        mac.update((self.client.client_id + token + t + nonce + s2s).encode())
+
+        headers = self._header_skeleton.copy()
+        headers["t"] = t
+        headers["sign"] = mac.hexdigest().upper()
+        headers["access_token"] = token
+        if nonce:
+            headers["nonce"] = nonce
+
+        return self.client.base_url + canonical, headers, body_str
+
+    def __call__(
+        self,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        nonce: str = "",
+        **params: Any,
+    ) -> Any:
+        """Ejecuta la llamada con el cliente (devuelve una corrutina en ``AsyncTuyaClient``)."""
+        return self.client._perform(
+            self.method,
+            self.path_template,
+            lambda n: self.sign(query=query, body=body, nonce=n, **params),
+            nonce=nonce,
+            idempotent=self.client._is_idempotent(self.method, body, self.idempotent),
+            cache_key=self._canonical(query, params) if self.client.cache is not None else None,
+        )
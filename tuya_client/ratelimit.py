@@ -0,0 +1,226 @@
+import asyncio
+import os
+import random
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .filelock import FileLock
+
+# (peticiones por segundo, ráfaga máxima) por clase de endpoint; "*" es el total por credencial.
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "*": (50.0, 100.0),
+    "token": (1.0, 5.0),
+    "read": (40.0, 80.0),
+    "command": (10.0, 20.0),
+}
+
+# Tuya no documenta un único código de límite de frecuencia; además de HTTP 429 y de
+# los códigos configurados, se detecta por el texto del ``msg``.
+RATE_LIMIT_MSG_HINTS = ("frequency", "too many", "rate limit")
+
+
+class TokenBucket:
+    """Token bucket seguro entre hilos con reducción adaptativa de la tasa (AIMD).
+
+    Ante un límite de frecuencia la tasa efectiva se reduce a la mitad y se
+    recupera poco a poco con cada respuesta correcta, de modo que el cliente
+    trabaja cerca de la cuota sin superarla de forma sostenida.
+    """
+
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_STEP = 0.02
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._lock: Any = threading.Lock()
+        self._clock: Callable[[], float] = time.monotonic
+        # [tokens, último relleno, pausado hasta, tasa efectiva]
+        self._state = [self.capacity, self._clock(), 0.0, self.rate]
+
+    def _load(self) -> List[float]:
+        return self._state
+
+    def _save(self, state: List[float]) -> None:
+        self._state = state
+
+    def _transact(self, op: Callable[[List[float], float], float]) -> float:
+        with self._lock:
+            state = self._load()
+            result = op(state, self._clock())
+            self._save(state)
+            return result
+
+    def try_acquire(self, n: float = 1.0) -> float:
+        """Consume ``n`` tokens si hay; si no, devuelve los segundos a esperar."""
+
+        def op(state: List[float], now: float) -> float:
+            tokens, last, paused_until, rate = state
+            if now < paused_until:
+                return paused_until - now
+            tokens = min(self.capacity, tokens + max(0.0, now - last) * rate)
+            state[1] = now
+            if tokens >= n:
+                state[0] = tokens - n
+                return 0.0
+            state[0] = tokens
+            return (n - tokens) / rate
+
+        return self._transact(op)
+
+    def penalize(self, delay: float) -> None:
+        """Pausa el bucket ``delay`` segundos y reduce la tasa efectiva a la mitad."""
+
+        def op(state: List[float], now: float) -> float:
+            state[0] = 0.0
+            state[1] = now
+            state[2] = max(state[2], now + delay)
+            state[3] = max(self.rate * self.MIN_RATE_FACTOR, state[3] / 2)
+            return 0.0
+
+        self._transact(op)
+
+    def reward(self) -> None:
+        """Recupera gradualmente la tasa efectiva tras una respuesta correcta."""
+
+        def op(state: List[float], now: float) -> float:
+            if state[3] < self.rate:
+                state[3] = min(self.rate, state[3] + self.rate * self.RECOVERY_STEP)
+            return 0.0
+
+        self._transact(op)
+
+    @property
+    def effective_rate(self) -> float:
+        return self._load()[3]
+
+
+class FileTokenBucket(TokenBucket):
+    """``TokenBucket`` cuyo estado vive en un fichero compartido entre procesos."""
+
+    _FORMAT = struct.Struct("<dddd")
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None) -> None:
+        super().__init__(rate, capacity)
+        self.path = path
+        self._lock = FileLock(path + ".lock")
+        self._clock = time.time  # reloj común a todos los procesos
+        self._state = [self.capacity, self._clock(), 0.0, self.rate]
+
+    def _load(self) -> List[float]:
+        try:
+            with open(self.path, "rb") as fh:
+                raw = fh.read(self._FORMAT.size)
+        except OSError:
+            raw = b""
+        if len(raw) != self._FORMAT.size:
+            return [self.capacity, self._clock(), 0.0, self.rate]
+        return list(self._FORMAT.unpack(raw))
+
+    def _save(self, state: List[float]) -> None:
+        with open(self.path, "wb") as fh:
+            fh.write(self._FORMAT.pack(*state))
+
+
+class RateLimiter:
+    """Buckets por credencial y por clase de endpoint (``token``, ``read``, ``command``).
+
+    Un mismo ``RateLimiter`` puede compartirse entre varios clientes e hilos.
+    Con ``shared_dir`` los buckets se guardan en ficheros y el presupuesto se
+    reparte también entre procesos.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        *,
+        shared_dir: Optional[str] = None,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        rate_limit_codes: Iterable[Any] = (),
+    ) -> None:
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.shared_dir = shared_dir
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limit_codes = {str(code) for code in rate_limit_codes}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._strikes: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    @staticmethod
+    def classify(method: str, path: str) -> str:
+        if path.startswith("/v1.0/token"):
+            return "token"
+        return "read" if method.upper() == "GET" else "command"
+
+    def bucket(self, credential: str, endpoint_class: str) -> Optional[TokenBucket]:
+        key = (credential, endpoint_class)
+        bucket = self._buckets.get(key)
+        if bucket is not None or endpoint_class not in self.limits:
+            return bucket
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, capacity = self.limits[endpoint_class]
+                if self.shared_dir:
+                    name = "all" if endpoint_class == "*" else endpoint_class
+                    path = os.path.join(self.shared_dir, f"{credential}-{name}.bucket")
+                    bucket = FileTokenBucket(path, rate, capacity)
+                else:
+                    bucket = TokenBucket(rate, capacity)
+                self._buckets[key] = bucket
+        return bucket
+
+    def _chain(self, credential: str, method: str, path: str) -> List[TokenBucket]:
+        endpoint_class = self.classify(method, path)
+        buckets = (self.bucket(credential, endpoint_class), self.bucket(credential, "*"))
+        return [b for b in buckets if b is not None]
+
+    def acquire(self, credential: str, method: str, path: str) -> None:
+        """Bloquea hasta que la petición cabe en la cuota."""
+        for bucket in self._chain(credential, method, path):
+            while True:
+                wait = bucket.try_acquire()
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+
+    async def acquire_async(self, credential: str, method: str, path: str) -> None:
+        for bucket in self._chain(credential, method, path):
+            while True:
+                wait = bucket.try_acquire()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+    def is_rate_limited(self, status_code: int, data: Optional[Dict[str, Any]]) -> bool:
+        if status_code == 429:
+            return True
+        if not isinstance(data, dict) or data.get("success", True):
+            return False
+        if str(data.get("code")) in self.rate_limit_codes:
+            return True
+        msg = str(data.get("msg", "")).lower()
+        return any(hint in msg for hint in RATE_LIMIT_MSG_HINTS)
+
+    def observe(self, credential: str, method: str, path: str, limited: bool) -> None:
+        """Ajusta el bucket de la clase según si la respuesta fue un límite de frecuencia."""
+        key = (credential, self.classify(method, path))
+        bucket = self.bucket(*key)
+        if bucket is None:
+            return
+        if not limited:
+            self._strikes.pop(key, None)
+            if bucket.effective_rate < bucket.rate:
+                bucket.reward()
+            return
+        strikes = self._strikes.get(key, 0)
+        self._strikes[key] = strikes + 1
+        delay = min(self.max_backoff, self.backoff * (2 ** strikes))
+        bucket.penalize(delay * random.uniform(0.5, 1.0))
@@ -0,0 +1,127 @@
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from .errors import CircuitOpenError
+
+# Comandos que nunca se repiten aunque la llamada se marque como idempotente.
+NON_IDEMPOTENT_CODES = frozenset({"charge_energy"})
+
+
+class CircuitBreaker:
+    """Circuit breaker por endpoint: cerrado -> abierto -> semiabierto.
+
+    Tras ``failure_threshold`` fallos consecutivos (red o HTTP 5xx) se abre y
+    rechaza llamadas durante ``reset_timeout`` segundos; después deja pasar una
+    única llamada de prueba que lo cierra o lo vuelve a abrir.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError("Circuito abierto: el endpoint regional está degradado.")
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """Política de reintentos con backoff exponencial + jitter y circuit breaker por base URL.
+
+    Sólo se reintentan GETs y comandos marcados explícitamente como
+    idempotentes; ``charge_energy`` (y ``never_retry_codes``) nunca se repite.
+    Cada intento se vuelve a firmar con ``t``/``nonce`` nuevos.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        *,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+        retry_codes: Iterable[Any] = (500,),
+        never_retry_codes: Iterable[str] = NON_IDEMPOTENT_CODES,
+        raise_on_error: bool = False,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_codes = frozenset(str(code) for code in retry_codes)
+        self.never_retry_codes = frozenset(never_retry_codes)
+        self.raise_on_error = raise_on_error
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, base_url: str) -> CircuitBreaker:
+        breaker = self._breakers.get(base_url)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    base_url, CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                )
+        return breaker
+
+    @staticmethod
+    def command_codes(body: Any) -> set:
+        """Códigos DP de un cuerpo ``{"commands": [...]}`` (dict o JSON)."""
+        if isinstance(body, (str, bytes)):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                return set()
+        if not isinstance(body, dict):
+            return set()
+        return {c.get("code") for c in body.get("commands") or [] if isinstance(c, dict)}
+
+    def is_idempotent(self, method: str, body: Any = None, explicit: Optional[bool] = None) -> bool:
+        if self.command_codes(body) & self.never_retry_codes:
+            return False
+        if explicit is not None:
+            return explicit
+        return method.upper() == "GET"
+
+    def should_retry(self, status_code: int, data: Optional[Dict[str, Any]]) -> bool:
+        if status_code in self.retry_statuses:
+            return True
+        if isinstance(data, dict) and not data.get("success", True):
+            return str(data.get("code")) in self.retry_codes
+        return False
+
+    def delay(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo para el intento ``attempt`` (0, 1, ...)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
@@ -0,0 +1,320 @@
+import calendar
+import json
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+HOUR_MS = 3_600_000
+PERIODS = ("hour", "day", "month")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Las agregaciones de energía requieren numpy (pip install numpy).")
+
+
+def period_key(period: str, t_ms: int) -> int:
+    """Clave entera del periodo que contiene ``t_ms`` (UTC): hora y día desde epoch, mes como AAAAMM."""
+    hour = t_ms // HOUR_MS
+    if period == "hour":
+        return hour
+    if period == "day":
+        return hour // 24
+    if period == "month":
+        tm = time.gmtime(t_ms // 1000)
+        return tm.tm_year * 100 + tm.tm_mon
+    raise ValueError(f"Periodo desconocido: {period}")
+
+
+def parse_key(period: str, key: str) -> int:
+    """``"2026-09"`` (mes), ``"2026-09-14"`` (día) o ``"2026-09-14T08"`` (hora) -> clave entera."""
+    if period == "month":
+        year, month = key.split("-")
+        return int(year) * 100 + int(month)
+    fmt = "%Y-%m-%d" if period == "day" else "%Y-%m-%dT%H"
+    return period_key(period, calendar.timegm(time.strptime(key, fmt)) * 1000)
+
+
+def _occurrence(slots: "np.ndarray") -> "np.ndarray":
+    """Cuántas veces ha aparecido antes cada slot en el lote (0 en la primera)."""
+    order = np.argsort(slots, kind="stable")
+    ordered = slots[order]
+    index = np.arange(len(slots))
+    starts = np.maximum.accumulate(np.where(np.r_[True, ordered[1:] != ordered[:-1]], index, 0))
+    occurrence = np.empty(len(slots), dtype=np.int64)
+    occurrence[order] = index - starts
+    return occurrence
+
+
+class EnergyRollups:
+    """Consumo y recargas por contador agregados por hora, día y mes de forma incremental.
+
+    Cada lote de estados decodificados (``update``) aporta, para todos los
+    dispositivos a la vez, la energía consumida desde la muestra anterior:
+
+    - con ``total_forward_energy`` es la diferencia del contador; si el
+      contador baja se considera un reinicio y cuenta el valor nuevo;
+    - si no hay contador, sale del saldo: ``saldo anterior + recargas
+      conocidas - saldo``. Un aumento de saldo no explicado por
+      ``recharge()`` se registra como recarga;
+    - deltas imposibles (más de ``max_power_kw`` sostenidos) se descartan y
+      se cuentan en ``anomalies``.
+
+    El consumo de un intervalo que cruza horas se reparte en proporción al
+    tiempo. Los totales viven en un array por periodo (una posición por
+    dispositivo), así que consultar un mes es un acceso indexado. Las horas
+    se conservan ``hour_retention`` días.
+    """
+
+    def __init__(self, *, max_power_kw: float = 100.0, hour_retention: float = 62.0, capacity: int = 1024) -> None:
+        _require_numpy()
+        self.max_power_kw = max_power_kw
+        self.hour_retention = int(hour_retention * 24)
+        self._slots: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._capacity = capacity
+        self._last_t = np.full(capacity, -1, dtype=np.int64)
+        self._last_total = np.full(capacity, np.nan)
+        self._last_balance = np.full(capacity, np.nan)
+        self._pending_recharge = np.zeros(capacity)
+        # periodo -> clave -> array por slot
+        self._used: Dict[str, Dict[int, "np.ndarray"]] = {p: {} for p in PERIODS}
+        self._recharged: Dict[str, Dict[int, "np.ndarray"]] = {p: {} for p in PERIODS}
+        self._months: Dict[int, int] = {}  # día -> AAAAMM
+        self.anomalies = 0
+        self._lock = threading.Lock()
+
+    # ---------- Dispositivos ----------
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        extra = capacity - self._capacity
+
+        def pad(a: "np.ndarray", fill: float) -> "np.ndarray":
+            return np.concatenate([a, np.full(extra, fill, dtype=a.dtype)])
+
+        self._last_t = pad(self._last_t, -1)
+        self._last_total = pad(self._last_total, np.nan)
+        self._last_balance = pad(self._last_balance, np.nan)
+        self._pending_recharge = pad(self._pending_recharge, 0.0)
+        for table in (self._used, self._recharged):
+            for buckets in table.values():
+                for key in buckets:
+                    buckets[key] = pad(buckets[key], 0.0)
+        self._capacity = capacity
+
+    def _slots_of(self, device_ids: Sequence[str]) -> "np.ndarray":
+        slots = self._slots
+        new = [d for d in dict.fromkeys(device_ids) if d not in slots]
+        if new:
+            self._grow(len(self._ids) + len(new))
+            for device_id in new:
+                slots[device_id] = len(self._ids)
+                self._ids.append(device_id)
+        return np.fromiter((slots[d] for d in device_ids), dtype=np.int64, count=len(device_ids))
+
+    # ---------- Entrada ----------
+    def recharge(self, device_id: str, kwh: float, t_ms: Optional[int] = None) -> None:
+        """Anota una recarga conocida (p. ej. un ``charge_energy`` confirmado) para el siguiente saldo."""
+        t_ms = int(time.time() * 1000) if t_ms is None else t_ms
+        with self._lock:
+            slot = self._slots_of([device_id])[0]
+            self._pending_recharge[slot] += kwh
+            self._add("recharge", np.array([t_ms // HOUR_MS]), np.array([slot]), np.array([kwh]))
+
+    def update(
+        self,
+        device_ids: Sequence[str],
+        t_ms: "np.ndarray",
+        total_forward_energy: Optional["np.ndarray"] = None,
+        balance_energy: Optional["np.ndarray"] = None,
+    ) -> None:
+        """Aplica un lote de muestras (kWh, NaN = no disponible).
+
+        Si un dispositivo aparece varias veces, sus muestras se aplican una
+        tras otra en el orden del lote.
+        """
+        n = len(device_ids)
+        t = np.broadcast_to(np.asarray(t_ms, dtype=np.int64), (n,))
+        total = np.full(n, np.nan) if total_forward_energy is None else np.asarray(total_forward_energy, dtype=float)
+        balance = np.full(n, np.nan) if balance_energy is None else np.asarray(balance_energy, dtype=float)
+        with self._lock:
+            slots = self._slots_of(device_ids)
+            occurrence = _occurrence(slots)
+            if not occurrence.any():
+                self._apply(slots, t, total, balance)
+                return
+            for k in range(int(occurrence.max()) + 1):  # una ronda por repetición
+                mask = occurrence == k
+                self._apply(slots[mask], t[mask], total[mask], balance[mask])
+
+    def _apply(self, slots: "np.ndarray", t: "np.ndarray", total: "np.ndarray", balance: "np.ndarray") -> None:
+        """Aplica muestras de dispositivos distintos (``slots`` sin repetidos)."""
+        n = len(slots)
+        prev_t = self._last_t[slots]
+        prev_total = self._last_total[slots]
+        prev_balance = self._last_balance[slots]
+        pending = self._pending_recharge[slots]
+
+        valid = (prev_t >= 0) & (t > prev_t)
+        used = np.full(n, np.nan)
+
+        by_counter = valid & ~np.isnan(total) & ~np.isnan(prev_total)
+        diff = total - prev_total
+        used[by_counter] = np.where(diff[by_counter] >= 0, diff[by_counter], total[by_counter])  # reinicio
+
+        by_balance = valid & ~by_counter & ~np.isnan(balance) & ~np.isnan(prev_balance)
+        from_balance = prev_balance + pending - balance
+        unexplained = by_balance & (from_balance < 0)
+        used[by_balance] = np.maximum(from_balance[by_balance], 0.0)
+        if unexplained.any():
+            self._add("recharge", t[unexplained] // HOUR_MS, slots[unexplained], -from_balance[unexplained])
+        # Las recargas pendientes ya están en el saldo nuevo (o no hacen falta con contador).
+        self._pending_recharge[slots[by_counter | by_balance]] = 0.0
+
+        hours = (t - prev_t) / HOUR_MS
+        impossible = ~np.isnan(used) & (used > self.max_power_kw * hours + 1e-9)
+        self.anomalies += int(impossible.sum())
+        used[impossible] = np.nan
+
+        ok = ~np.isnan(used) & (used > 0)
+        if ok.any():
+            self._spread(slots[ok], prev_t[ok], t[ok], used[ok])
+
+        known_t = t >= prev_t
+        self._last_t[slots[known_t]] = t[known_t]
+        has_total = known_t & ~np.isnan(total)
+        self._last_total[slots[has_total]] = total[has_total]
+        has_balance = known_t & ~np.isnan(balance)
+        self._last_balance[slots[has_balance]] = balance[has_balance]
+        self._expire(int(t.max()) // HOUR_MS if n else 0)
+
+    def update_status(self, statuses: Mapping[str, Mapping[str, float]], t_ms: int) -> None:
+        """Desde ``{device_id: {code: valor convertido}}`` (p. ej. ``ConverterRegistry.convert``)."""
+        ids = list(statuses)
+        total = np.array([statuses[d].get("total_forward_energy", np.nan) for d in ids], dtype=float)
+        balance = np.array([statuses[d].get("balance_energy", np.nan) for d in ids], dtype=float)
+        self.update(ids, t_ms, total, balance)
+
+    def _spread(self, slots: "np.ndarray", start: "np.ndarray", end: "np.ndarray", used: "np.ndarray") -> None:
+        """Reparte ``used`` entre las horas de ``(start, end]`` en proporción al tiempo."""
+        h0, h1 = (start + 1) // HOUR_MS, end // HOUR_MS
+        same = h0 == h1
+        one = h1 == h0 + 1  # sondeo sincronizado: toda la flota cruza la misma hora a la vez
+        before = np.zeros(len(used))
+        before[one] = used[one] * (h1[one] * HOUR_MS - start[one]) / (end[one] - start[one])
+        mask = same | one
+        hours = np.concatenate([h1[mask], h0[one]])
+        amounts = np.concatenate([used[mask] - before[mask], before[one]])
+        self._add("used", hours, np.concatenate([slots[mask], slots[one]]), amounts)
+        for i in np.flatnonzero(~mask):  # huecos de más de una hora
+            hours = np.arange(h0[i], h1[i] + 1)
+            edges = np.clip(np.r_[hours * HOUR_MS, (h1[i] + 1) * HOUR_MS], start[i], end[i])
+            self._add("used", hours, np.full(len(hours), slots[i]), used[i] * np.diff(edges) / (end[i] - start[i]))
+
+    def _month(self, day: int) -> int:
+        month = self._months.get(day)
+        if month is None:
+            month = self._months[day] = period_key("month", day * 24 * HOUR_MS)
+        return month
+
+    def _add(self, kind: str, hours: "np.ndarray", slots: "np.ndarray", amounts: "np.ndarray") -> None:
+        table = self._used if kind == "used" else self._recharged
+        days = hours // 24
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        months = np.array([self._month(int(d)) for d in unique_days], dtype=np.int64)[inverse]
+        for period, keys in (("hour", hours), ("day", days), ("month", months)):
+            buckets = table[period]
+            unique = np.unique(keys)
+            for key in unique:
+                bucket = buckets.get(int(key))
+                if bucket is None:
+                    bucket = buckets[int(key)] = np.zeros(self._capacity)
+                if len(unique) == 1:
+                    bucket += np.bincount(slots, weights=amounts, minlength=self._capacity)
+                else:
+                    mask = keys == key
+                    bucket += np.bincount(slots[mask], weights=amounts[mask], minlength=self._capacity)
+
+    def _expire(self, current_hour: int) -> None:
+        limit = current_hour - self.hour_retention
+        for table in (self._used, self._recharged):
+            for key in [k for k in table["hour"] if k < limit]:
+                del table["hour"][key]
+
+    # ---------- Consultas ----------
+    def _key(self, period: str, key: Union[int, str]) -> int:
+        return parse_key(period, key) if isinstance(key, str) else period_key(period, key)
+
+    def consumption(self, device_id: str, period: str, key: Union[int, str]) -> float:
+        """kWh de un dispositivo en un periodo; ``key`` es ``"2026-09"``/``"2026-09-14"`` o un instante en ms."""
+        bucket = self._used[period].get(self._key(period, key))
+        slot = self._slots.get(device_id)
+        return 0.0 if bucket is None or slot is None else float(bucket[slot])
+
+    def recharged(self, device_id: str, period: str, key: Union[int, str]) -> float:
+        bucket = self._recharged[period].get(self._key(period, key))
+        slot = self._slots.get(device_id)
+        return 0.0 if bucket is None or slot is None else float(bucket[slot])
+
+    def totals(self, period: str, key: Union[int, str]) -> Dict[str, float]:
+        """kWh de todos los dispositivos en un periodo."""
+        bucket = self._used[period].get(self._key(period, key))
+        if bucket is None:
+            return {}
+        return dict(zip(self._ids, bucket[: len(self._ids)].tolist()))
+
+    def series(self, device_id: str, period: str) -> List[Tuple[int, float]]:
+        """``[(clave, kWh), ...]`` ordenado, de los periodos con datos."""
+        slot = self._slots.get(device_id)
+        if slot is None:
+            return []
+        return [(key, float(bucket[slot])) for key, bucket in sorted(self._used[period].items())]
+
+    # ---------- Persistencia ----------
+    def save(self, path: str) -> None:
+        """Guarda estado y agregados en un ``.npz`` (para continuar tras reiniciar)."""
+        n = len(self._ids)
+        arrays = {
+            "last_t": self._last_t[:n],
+            "last_total": self._last_total[:n],
+            "last_balance": self._last_balance[:n],
+            "pending_recharge": self._pending_recharge[:n],
+        }
+        for kind, table in (("used", self._used), ("recharged", self._recharged)):
+            for period, buckets in table.items():
+                for key, bucket in buckets.items():
+                    arrays[f"{kind}_{period}_{key}"] = bucket[:n]
+        meta = {"ids": self._ids, "anomalies": self.anomalies}
+        with open(path, "wb") as fh:
+            np.savez_compressed(fh, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+
+    @classmethod
+    def load(cls, path: str, **kwargs: float) -> "EnergyRollups":
+        data = np.load(path)
+        meta = json.loads(data["meta"].tobytes())
+        rollups = cls(**kwargs)
+        n = len(meta["ids"])
+        rollups._slots_of(meta["ids"])
+        rollups.anomalies = meta["anomalies"]
+        rollups._last_t[:n] = data["last_t"]
+        rollups._last_total[:n] = data["last_total"]
+        rollups._last_balance[:n] = data["last_balance"]
+        rollups._pending_recharge[:n] = data["pending_recharge"]
+        for name in data.files:
+            kind, _, rest = name.partition("_")
+            if kind not in ("used", "recharged"):
+                continue
+            period, key = rest.rsplit("_", 1)
+            bucket = np.zeros(rollups._capacity)
+            bucket[:n] = data[name]
+            (rollups._used if kind == "used" else rollups._recharged)[period][int(key)] = bucket
+        return rollups
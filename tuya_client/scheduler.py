@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from .errors import TuyaError
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+Subscriber = Callable[[str, Dict[str, Any]], None]
+
+logger = logging.getLogger(__name__)
+
+HOT_CODES = ("cur_power", "switch")
+
+
+class DeviceState:
+    __slots__ = ("interval", "values", "online", "version")
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.values: Dict[str, Any] = {}
+        self.online = True
+        self.version = 0
+
+
+class PollScheduler:
+    """Planificador de sondeo adaptativo para muchos dispositivos.
+
+    - Cada dispositivo tiene su intervalo: se acorta (x ``speedup``) cuando
+      cambia algún código de ``hot_codes`` y se alarga (x ``slowdown``) si no.
+    - Los equipos marcados offline por ``/v1.0/devices/{id}`` pasan a
+      ``offline_interval`` y sólo se comprueba si vuelven a estar online.
+    - Los plazos viven en un heap; los arranques y reprogramaciones llevan
+      jitter para no generar ráfagas.
+    - Los dispositivos vencidos se consultan juntos con ``get_status_many`` y
+      a los suscriptores sólo les llegan los DPs que cambiaron.
+    """
+
+    def __init__(
+        self,
+        client: "TuyaClient",
+        *,
+        base_interval: float = 30.0,
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        offline_interval: float = 900.0,
+        speedup: float = 0.5,
+        slowdown: float = 1.5,
+        jitter: float = 0.1,
+        hot_codes: Iterable[str] = HOT_CODES,
+    ) -> None:
+        self.client = client
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.offline_interval = offline_interval
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.jitter = jitter
+        self.hot_codes = frozenset(hot_codes)
+        self.devices: Dict[str, DeviceState] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ---------- Registro ----------
+    def add(self, device_ids: Iterable[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for device_id in device_ids:
+                if device_id in self.devices:
+                    continue
+                state = self.devices[device_id] = DeviceState(self.base_interval)
+                # Arranques repartidos en el primer intervalo.
+                self._push(device_id, state, now + random.uniform(0, self.base_interval))
+
+    def remove(self, device_id: str) -> None:
+        with self._lock:
+            self.devices.pop(device_id, None)  # su entrada en el heap se descarta al salir
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """``callback(device_id, {code: valor})`` con sólo los DPs que cambiaron."""
+        self._subscribers.append(callback)
+
+    def _push(self, device_id: str, state: DeviceState, deadline: float) -> None:
+        state.version += 1
+        heapq.heappush(self._heap, (deadline, next(self._seq), device_id, state.version))
+
+    def _reschedule(self, device_id: str, state: DeviceState, now: float) -> None:
+        interval = self.offline_interval if not state.online else state.interval
+        spread = interval * self.jitter
+        self._push(device_id, state, now + interval + random.uniform(-spread, spread))
+
+    # ---------- Ciclo ----------
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Saca del heap los dispositivos cuyo plazo ya venció."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, device_id, version = heapq.heappop(self._heap)
+                state = self.devices.get(device_id)
+                if state is not None and state.version == version:
+                    ready.append(device_id)
+        return ready
+
+    def next_deadline(self) -> Optional[float]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Sondea los dispositivos vencidos; devuelve cuántos se procesaron."""
+        ready = self.due(now)
+        if not ready:
+            return 0
+
+        try:
+            self._poll(ready)
+        finally:  # pase lo que pase, los dispositivos vuelven al heap
+            done = time.monotonic()
+            with self._lock:
+                for device_id in ready:
+                    state = self.devices.get(device_id)
+                    if state is not None:
+                        self._reschedule(device_id, state, done)
+        return len(ready)
+
+    def _poll(self, ready: List[str]) -> None:
+        with self._lock:
+            states = {d: self.devices.get(d) for d in ready}
+        online = [d for d, state in states.items() if state is not None and state.online]
+        offline = [d for d, state in states.items() if state is not None and not state.online]
+        try:
+            results = self.client.get_status_many(online) if online else {}
+        except Exception:  # se reintenta en la siguiente vuelta, sin consultar uno a uno
+            logger.exception("Fallo al leer el estado de %d dispositivos", len(online))
+            online, results = [], {}
+
+        for device_id in online:
+            resp = results.get(device_id) or {}
+            try:
+                if resp.get("success"):
+                    self._apply(device_id, resp.get("result") or [])
+                else:
+                    self._check_online(device_id)
+            except Exception:
+                logger.exception("Fallo al procesar %s", device_id)
+        for device_id in offline:
+            if self._check_online(device_id):
+                with self._lock:
+                    states[device_id].interval = self.base_interval
+
+    def _apply(self, device_id: str, status: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            state = self.devices.get(device_id)
+            if state is None:
+                return
+            previous = state.values
+            first_poll = not previous
+            changes = {}
+            for item in status:
+                code, value = item["code"], item["value"]
+                if code not in previous or previous[code] != value:
+                    changes[code] = value
+                    previous[code] = value
+
+            if not first_poll and any(code in self.hot_codes for code in changes):
+                state.interval = max(self.min_interval, state.interval * self.speedup)
+            else:
+                state.interval = min(self.max_interval, state.interval * self.slowdown)
+
+        if changes:
+            for callback in self._subscribers:
+                try:
+                    callback(device_id, changes)
+                except Exception:  # un suscriptor roto no debe parar el sondeo ni a los demás
+                    logger.exception("Fallo en el suscriptor %r con %s", callback, device_id)
+
+    def _check_online(self, device_id: str) -> bool:
+        with self._lock:
+            state = self.devices.get(device_id)
+        if state is None:
+            return False
+        try:
+            data = self.client.decode(self.client.request("GET", f"/v1.0/devices/{device_id}"))
+        except (requests.RequestException, ValueError, TuyaError):
+            return state.online  # error de red o circuito abierto: no cambiamos el estado conocido
+        if data.get("success"):
+            with self._lock:
+                state.online = bool((data.get("result") or {}).get("online", True))
+        return state.online
+
+    def run(self) -> None:
+        """Bucle bloqueante hasta ``stop()``; duerme hasta el siguiente plazo."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # el bucle sigue; run_once ya reprogramó los dispositivos
+                logger.exception("Fallo en la vuelta de sondeo")
+            deadline = self.next_deadline()
+            wait = self.base_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            self._stop.wait(wait)
+
+    def stop(self) -> None:
+        self._stop.set()
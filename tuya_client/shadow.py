@@ -0,0 +1,282 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from .client import BULK_STATUS_MAX_IDS
+from .errors import TuyaAPIError
+from .retry import NON_IDEMPOTENT_CODES
+
+if TYPE_CHECKING:
+    from .client import TuyaClient
+
+Watcher = Callable[[str, str, Any, Any], None]  # (device_id, code, valor, valor anterior)
+Change = Tuple[str, str, Any, Any]
+
+
+class DPValue(NamedTuple):
+    value: Any
+    t: int  # ms de la nube (respuesta de /status o del comando)
+    version: int  # versión del dispositivo en la que se escribió
+    received: float  # time.monotonic() local, para la frescura
+
+
+class _Device:
+    __slots__ = ("dps", "version", "fetched", "inflight")
+
+    def __init__(self) -> None:
+        self.dps: Dict[str, DPValue] = {}
+        self.version = 0
+        self.fetched: Optional[float] = None  # última lectura completa (monotonic al pedirla)
+        self.inflight: Optional["Future[Dict[str, Any]]"] = None
+
+
+class DeviceShadow:
+    """Sombra en memoria del estado de los dispositivos sobre un ``TuyaClient``.
+
+    - Guarda por dispositivo y DP el último valor conocido, su ``t`` y la
+      versión en que cambió. Se alimenta de lecturas propias, de respuestas
+      de ``get_status_many`` (``ingest``), de los cambios de ``PollScheduler``
+      (``on_changes``) y de los comandos aceptados (``acknowledge``).
+    - Las lecturas con menos de ``max_age`` segundos se sirven sin petición;
+      las demás se piden juntas al endpoint en lote.
+    - Si ya hay una lectura en curso de un dispositivo, quien llega después
+      espera a esa en lugar de lanzar otra.
+    - Un valor con ``t`` anterior al guardado se descarta (respuestas que
+      llegan desordenadas).
+    - ``watch()`` avisa por DP; los callbacks se llaman fuera del lock.
+    """
+
+    def __init__(
+        self,
+        client: "TuyaClient",
+        *,
+        max_age: float = 5.0,
+        max_workers: int = 8,
+        ignore_codes: Iterable[str] = NON_IDEMPOTENT_CODES,
+    ) -> None:
+        self.client = client
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self.ignore_codes = frozenset(ignore_codes)  # comandos que no son estado (charge_energy)
+        self._devices: Dict[str, _Device] = {}
+        self._watchers: Dict[Tuple[Optional[str], Optional[str]], List[Watcher]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fetched": 0, "joined": 0, "requests": 0}
+
+    # ---------- Lectura ----------
+    def get(self, device_id: str, code: Optional[str] = None, *, max_age: Optional[float] = None) -> Any:
+        """Valor de ``code`` (o ``{code: valor}`` si no se indica); lanza ``TuyaAPIError`` si falla la lectura."""
+        max_age = self.max_age if max_age is None else max_age
+        if code is not None:
+            with self._lock:
+                device = self._devices.get(device_id)
+                dp = device.dps.get(code) if device is not None else None
+                if dp is not None and time.monotonic() - dp.received <= max_age:
+                    self.stats["hits"] += 1
+                    return dp.value
+        resp = self.status_many([device_id], max_age=max_age)[device_id]
+        if not resp.get("success"):
+            raise TuyaAPIError(resp.get("code"), resp.get("msg", ""), resp)
+        values = {item["code"]: item["value"] for item in resp["result"]}
+        return values if code is None else values.get(code)
+
+    def status(self, device_id: str, *, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Respuesta con la forma de ``/v1.0/devices/{id}/status``, de la sombra si está fresca."""
+        return self.status_many([device_id], max_age=max_age)[device_id]
+
+    def status_many(
+        self, device_ids: Iterable[str], *, max_age: Optional[float] = None, force: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Como ``client.get_status_many``, pero sólo pide los dispositivos que no estén frescos.
+
+        ``force`` ignora la frescura (aunque se une a las lecturas ya en curso).
+        """
+        max_age = self.max_age if max_age is None else max_age
+        now = time.monotonic()
+        results: Dict[str, Dict[str, Any]] = {}
+        own: List[str] = []
+        joined: List[Tuple[str, "Future[Dict[str, Any]]"]] = []
+        with self._lock:
+            for device_id in dict.fromkeys(device_ids):
+                device = self._devices.get(device_id)
+                if device is None:
+                    device = self._devices[device_id] = _Device()
+                if not force and device.fetched is not None and now - device.fetched <= max_age:
+                    self.stats["hits"] += 1
+                    results[device_id] = self._response(device)
+                elif device.inflight is not None:
+                    self.stats["joined"] += 1
+                    joined.append((device_id, device.inflight))
+                else:
+                    device.inflight = Future()
+                    own.append(device_id)
+        if own:
+            results.update(self._fetch(own))
+        for device_id, future in joined:
+            results[device_id] = future.result()
+        return results
+
+    def _fetch(self, device_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        started = time.monotonic()
+        try:
+            responses = self.client.get_status_many(device_ids, max_workers=self.max_workers)
+        except BaseException as exc:
+            with self._lock:
+                futures = [self._release(device_id) for device_id in device_ids]
+            for future in futures:
+                future.set_exception(exc)
+            raise
+
+        results: Dict[str, Dict[str, Any]] = {}
+        changes: List[Change] = []
+        done: List[Tuple["Future[Dict[str, Any]]", Dict[str, Any]]] = []
+        with self._lock:
+            self.stats["fetched"] += len(device_ids)
+            self.stats["requests"] += -(-len(device_ids) // BULK_STATUS_MAX_IDS)
+            for device_id in device_ids:
+                resp = responses.get(device_id) or {"success": False, "code": None, "msg": "Sin respuesta"}
+                device = self._devices[device_id]
+                if resp.get("success"):
+                    t = int(resp.get("t") or time.time() * 1000)
+                    changes += self._apply(device_id, device, resp.get("result") or [], t, started)
+                    device.fetched = started
+                    resp = self._response(device)
+                results[device_id] = resp
+                done.append((self._release(device_id), resp))
+        for future, resp in done:
+            future.set_result(resp)
+        self._notify(changes)
+        return results
+
+    def _release(self, device_id: str) -> "Future[Dict[str, Any]]":
+        device = self._devices[device_id]
+        future, device.inflight = device.inflight, None
+        return future
+
+    @staticmethod
+    def _response(device: _Device) -> Dict[str, Any]:
+        items = [{"code": code, "value": dp.value} for code, dp in device.dps.items()]
+        t = max((dp.t for dp in device.dps.values()), default=0)
+        return {"success": True, "result": items, "t": t, "version": device.version}
+
+    def snapshot(self, device_id: str) -> Dict[str, DPValue]:
+        """``{code: DPValue}`` tal como está en la sombra, sin pedir nada."""
+        with self._lock:
+            device = self._devices.get(device_id)
+            return dict(device.dps) if device is not None else {}
+
+    def version(self, device_id: str) -> int:
+        with self._lock:
+            device = self._devices.get(device_id)
+            return device.version if device is not None else 0
+
+    def invalidate(self, device_id: Optional[str] = None) -> None:
+        """Obliga a pedir de nuevo el dispositivo (o todos) en la siguiente lectura."""
+        with self._lock:
+            for ident, device in self._devices.items():
+                if device_id is None or ident == device_id:
+                    device.fetched = None
+                    for code, dp in device.dps.items():
+                        device.dps[code] = dp._replace(received=float("-inf"))
+
+    # ---------- Actualización ----------
+    def _apply(self, device_id: str, device: _Device, status: Any, t: int, received: float) -> List[Change]:
+        items = status.items() if isinstance(status, Mapping) else ((i["code"], i["value"]) for i in status)
+        changes: List[Change] = []
+        for code, value in items:
+            current = device.dps.get(code)
+            if current is not None and current.t > t:
+                continue  # llega tarde: ya hay un valor más nuevo
+            if current is not None and current.value == value:
+                device.dps[code] = current._replace(t=t, received=received)
+                continue
+            if not changes:
+                device.version += 1
+            device.dps[code] = DPValue(value, t, device.version, received)
+            changes.append((device_id, code, value, current.value if current is not None else None))
+        return changes
+
+    def update(self, device_id: str, status: Any, t: Optional[int] = None, *, complete: bool = False) -> int:
+        """Aplica DPs leídos por otra vía (lista de ``{code, value}`` o ``{code: valor}``).
+
+        Con ``complete`` el estado es una lectura entera y cuenta como fresca.
+        Devuelve la versión del dispositivo.
+        """
+        received = time.monotonic()
+        t = int(time.time() * 1000) if t is None else int(t)
+        with self._lock:
+            device = self._devices.get(device_id)
+            if device is None:
+                device = self._devices[device_id] = _Device()
+            changes = self._apply(device_id, device, status, t, received)
+            if complete:
+                device.fetched = received
+            version = device.version
+        self._notify(changes)
+        return version
+
+    def ingest(self, responses: Mapping[str, Mapping[str, Any]]) -> None:
+        """Incorpora la salida de ``client.get_status_many`` obtenida fuera de la sombra."""
+        for device_id, resp in responses.items():
+            if resp.get("success"):
+                self.update(device_id, resp.get("result") or [], resp.get("t"), complete=True)
+
+    def on_changes(self, device_id: str, changes: Dict[str, Any]) -> None:
+        """Suscriptor para ``PollScheduler.subscribe``: aplica los DPs que cambiaron."""
+        self.update(device_id, changes)
+
+    def acknowledge(self, device_id: str, commands: Iterable[Mapping[str, Any]], response: Any = None) -> int:
+        """Refleja en la sombra los comandos que la nube aceptó (``charge_energy`` y similares no)."""
+        values = {c["code"]: c["value"] for c in commands if c.get("code") not in self.ignore_codes}
+        t = response.get("t") if isinstance(response, Mapping) else None
+        return self.update(device_id, values, t) if values else self.version(device_id)
+
+    def send_commands(self, device_id: str, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """``POST /commands`` y, si se acepta, actualiza la sombra con los valores enviados."""
+        data = self.client.decode(
+            self.client.request(
+                "POST",
+                f"/v1.0/devices/{device_id}/commands",
+                body={"commands": commands},
+                headers={"Content-Type": "application/json"},
+            )
+        )
+        if data.get("success"):
+            self.acknowledge(device_id, commands, data)
+        return data
+
+    # ---------- Suscripción ----------
+    def watch(
+        self, callback: Watcher, device_id: Optional[str] = None, code: Optional[str] = None
+    ) -> Callable[[], None]:
+        """``callback(device_id, code, valor, anterior)`` en cada cambio; ``None`` = cualquiera.
+
+        Devuelve una función que cancela la suscripción.
+        """
+        key = (device_id, code)
+        with self._lock:
+            self._watchers.setdefault(key, []).append(callback)
+
+        def cancel() -> None:
+            with self._lock:
+                callbacks = self._watchers.get(key)
+                if callbacks and callback in callbacks:
+                    callbacks.remove(callback)
+                    if not callbacks:
+                        del self._watchers[key]
+
+        return cancel
+
+    def _notify(self, changes: List[Change]) -> None:
+        if not changes or not self._watchers:
+            return
+        with self._lock:
+            watchers = {key: list(callbacks) for key, callbacks in self._watchers.items()}
+        for device_id, code, value, previous in changes:
+            for key in ((device_id, code), (device_id, None), (None, code), (None, None)):
+                for callback in watchers.get(key, ()):
+                    try:
+                        callback(device_id, code, value, previous)
+                    except Exception:  # un suscriptor roto no debe cortar el resto
+                        pass
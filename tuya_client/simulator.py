@@ -0,0 +1,522 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import secrets
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    from aiohttp import web
+except ImportError:  # dependencia opcional
+    web = None
+
+from .client import BULK_STATUS_MAX_IDS, BULK_STATUS_PATH, BaseTuyaClient
+from .groups import GROUP_MAX_DEVICES
+from .pagination import ASSOCIATED_USER_DEVICES
+from .ratelimit import TokenBucket
+
+Latency = Union[float, Tuple[float, float], Callable[[], float]]
+
+# Códigos de error de la nube que reproduce el simulador.
+ERR_SYSTEM = (500, "system error, please contact the admin")
+ERR_SIGN = (1004, "sign invalid")
+ERR_TOKEN = (1010, "token invalid")
+ERR_TIME = (1013, "request time is invalid")
+ERR_PERMISSION = (1106, "permission deny")
+ERR_PARAM = (1109, "param is illegal")
+ERR_OFFLINE = (2001, "device is offline")
+ERR_FREQUENCY = (40000309, "request frequency too high")
+
+PRODUCT_ID = "simbreaker01"
+SPECIFICATION = {
+    "category": "dlq",
+    "functions": [
+        {"code": "switch", "type": "Boolean", "values": "{}"},
+        {"code": "switch_prepayment", "type": "Boolean", "values": "{}"},
+        {"code": "charge_energy", "type": "Integer",
+         "values": '{"unit":"kWh","min":0,"max":999999999,"scale":3,"step":1}'},
+    ],
+    "status": [
+        {"code": "switch", "type": "Boolean", "values": "{}"},
+        {"code": "switch_prepayment", "type": "Boolean", "values": "{}"},
+        {"code": "cur_power", "type": "Integer", "values": '{"unit":"W","min":0,"max":999999,"scale":1,"step":1}'},
+        {"code": "balance_energy", "type": "Integer",
+         "values": '{"unit":"kWh","min":0,"max":999999999,"scale":3,"step":1}'},
+        {"code": "phase_a", "type": "Raw", "values": "{}"},
+        {"code": "alarm_set_1", "type": "Raw", "values": "{}"},
+        {"code": "alarm_set_2", "type": "Raw", "values": "{}"},
+    ],
+}
+_WRITABLE = {"switch": bool, "switch_prepayment": bool, "charge_energy": int}
+REPORT_INTERVAL_MS = 60_000  # un informe sintético por código y minuto
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Latencia log-normal (cola larga, como la red real) con la mediana dada en segundos."""
+    mu = math.log(median)
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+def _latency_fn(latency: Latency) -> Callable[[], float]:
+    if callable(latency):
+        return latency
+    if isinstance(latency, tuple):
+        low, high = latency
+        return lambda: random.uniform(low, high)
+    return lambda: float(latency)
+
+
+class VirtualBreaker:
+    """Breaker prepago simulado; el saldo se descuenta según la potencia y el tiempo."""
+
+    __slots__ = (
+        "device_id", "online", "switch", "switch_prepayment", "balance_wh", "load_w", "voltage",
+        "alarm_1", "alarm_2", "updated",
+    )
+
+    def __init__(self, device_id: str, rng: random.Random) -> None:
+        self.device_id = device_id
+        self.online = True
+        self.switch = rng.random() < 0.9
+        self.switch_prepayment = rng.random() < 0.5
+        self.balance_wh = float(rng.randint(0, 200_000))
+        self.load_w = rng.uniform(50.0, 4000.0)
+        self.voltage = rng.uniform(215.0, 235.0)
+        self.alarm_1 = rng.getrandbits(4) if rng.random() < 0.05 else 0
+        self.alarm_2 = 0
+        self.updated = time.monotonic()
+
+    def _advance(self) -> None:
+        now = time.monotonic()
+        if self.switch and self.switch_prepayment:
+            self.balance_wh = max(0.0, self.balance_wh - self.load_w * (now - self.updated) / 3600.0)
+            if self.balance_wh <= 0:
+                self.switch = False  # saldo agotado: el breaker corta
+        self.updated = now
+
+    def power_w(self) -> float:
+        return self.load_w * random.uniform(0.95, 1.05) if self.switch else 0.0
+
+    def status(self) -> List[Dict[str, Any]]:
+        self._advance()
+        power = self.power_w()
+        voltage = self.voltage + random.uniform(-1.0, 1.0)
+        current_ma = power / voltage * 1000
+        phase = (
+            int(voltage * 10).to_bytes(2, "big")
+            + int(current_ma).to_bytes(3, "big")
+            + int(power).to_bytes(3, "big")  # 0.001 kW = 1 W
+        )
+        return [
+            {"code": "switch", "value": self.switch},
+            {"code": "switch_prepayment", "value": self.switch_prepayment},
+            {"code": "cur_power", "value": int(power * 10)},
+            {"code": "balance_energy", "value": int(self.balance_wh)},
+            {"code": "phase_a", "value": base64.b64encode(phase).decode()},
+            {"code": "alarm_set_1", "value": base64.b64encode(self.alarm_1.to_bytes(4, "little")).decode()},
+            {"code": "alarm_set_2", "value": base64.b64encode(self.alarm_2.to_bytes(4, "little")).decode()},
+        ]
+
+    @staticmethod
+    def accepts(code: Any, value: Any) -> bool:
+        kind = _WRITABLE.get(code)
+        if kind is None or not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            return False
+        return code != "charge_energy" or value >= 0
+
+    def apply(self, code: str, value: Any) -> None:
+        self._advance()
+        if code == "charge_energy":
+            self.balance_wh += value
+        else:
+            setattr(self, code, value)
+
+
+class TuyaSimulator:
+    """Nube Tuya local que valida las firmas igual que la real, para pruebas de carga.
+
+    - Token: ``GET /v1.0/token?grant_type=1`` y ``/v1.0/token/{refresh_token}``,
+      con caducidad ``token_ttl``.
+    - Negocio: ``/v1.0/devices/{id}``, ``/status``, ``/specifications``,
+      ``/functions``, ``POST /commands``, el estado en lote, el listado
+      paginado de dispositivos, informes de DPs sintéticos (``report-logs``)
+      y grupos (crear, añadir equipos, ``/properties`` y borrar; los equipos
+      offline de un grupo ignoran el comando, como en la nube).
+    - Comprueba ``client_id``, ``t`` (``clock_skew``), ``access_token`` y el
+      HMAC con la misma cadena que ``_string_to_sign``.
+    - ``latency`` (número, ``(min, max)`` o función), ``rate_limit`` en
+      peticiones/s por ``client_id``, ``error_rate`` (``success: false`` con
+      código 500) y ``failure_rate`` (HTTP 503) para inyectar fallos.
+    """
+
+    def __init__(
+        self,
+        credentials: Dict[str, str],
+        *,
+        devices: Union[int, Iterable[str]] = 1000,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token_ttl: int = 7200,
+        clock_skew: float = 900.0,
+        latency: Latency = 0.0,
+        rate_limit: Optional[float] = None,
+        error_rate: float = 0.0,
+        failure_rate: float = 0.0,
+        offline_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if web is None:
+            raise RuntimeError("El simulador requiere aiohttp (pip install aiohttp).")
+        self.credentials = dict(credentials)
+        self.host = host
+        self.port = port
+        self.token_ttl = token_ttl
+        self.clock_skew = clock_skew
+        self.latency = _latency_fn(latency)
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.failure_rate = failure_rate
+        rng = random.Random(seed)
+        ids = [f"simbrk{i:016d}" for i in range(devices)] if isinstance(devices, int) else list(devices)
+        self.devices: Dict[str, VirtualBreaker] = {d: VirtualBreaker(d, rng) for d in ids}
+        for breaker in self.devices.values():
+            breaker.online = rng.random() >= offline_rate
+        self._access: Dict[str, Tuple[str, float]] = {}  # access_token -> (client_id, caduca)
+        self._refresh: Dict[str, Tuple[str, str]] = {}  # refresh_token -> (client_id, access_token)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, int] = {
+            "requests": 0, "tokens_issued": 0, "sign_errors": 0, "token_errors": 0,
+            "rate_limited": 0, "injected_errors": 0, "injected_failures": 0, "commands": 0, "group_commands": 0,
+        }
+        self.groups: Dict[str, Dict[str, Any]] = {}  # group_id -> {"product_id", "devices"}
+        self._group_seq = 0
+        self._runner: Optional["web.AppRunner"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def device_ids(self) -> List[str]:
+        return list(self.devices)
+
+    # ---------- Ciclo de vida ----------
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "TuyaSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    def start_background(self) -> str:
+        """Arranca el simulador en un hilo con su propio loop (para clientes síncronos)."""
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.base_url
+
+    def stop_background(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "TuyaSimulator":
+        self.start_background()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop_background()
+
+    # ---------- Firma ----------
+    @staticmethod
+    def _reply(error: Tuple[int, str], status: int = 200) -> "web.Response":
+        code, msg = error
+        return web.json_response(
+            {"success": False, "code": code, "msg": msg, "t": int(time.time() * 1000)}, status=status
+        )
+
+    @staticmethod
+    def _ok(result: Any) -> "web.Response":
+        return web.json_response({"success": True, "result": result, "t": int(time.time() * 1000)})
+
+    def _verify(self, request: "web.Request", body: bytes, business: bool) -> Optional[Tuple[int, str]]:
+        """Recalcula la firma como la nube: devuelve el error o ``None`` si es válida."""
+        headers = request.headers
+        client_id = headers.get("client_id", "")
+        secret = self.credentials.get(client_id)
+        if secret is None:
+            return ERR_SIGN
+        try:
+            t = int(headers.get("t", ""))
+        except ValueError:
+            return ERR_TIME
+        if abs(time.time() * 1000 - t) > self.clock_skew * 1000:
+            return ERR_TIME
+
+        access_token = ""
+        if business:
+            access_token = headers.get("access_token", "")
+            owner = self._access.get(access_token)
+            if owner is None or owner[0] != client_id or owner[1] < time.time():
+                self.stats["token_errors"] += 1
+                return ERR_TOKEN
+
+        sig_headers = [h for h in headers.get("Signature-Headers", "").split(":") if h]
+        hdr_block = "".join(f"{k}:{headers.get(k, '')}\n" for k in sig_headers)
+        url = BaseTuyaClient._canonical_url(request.path, list(request.query.items()))
+        s2s = f"{request.method.upper()}\n{hashlib.sha256(body).hexdigest()}\n{hdr_block}\n{url}"
+        message = client_id + access_token + headers.get("t", "") + headers.get("nonce", "") + s2s
+        expected = hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest().upper()
+        if not hmac.compare_digest(expected, headers.get("sign", "")):
+            self.stats["sign_errors"] += 1
+            return ERR_SIGN
+        return None
+
+    def _issue(self, client_id: str) -> Dict[str, Any]:
+        access, refresh = secrets.token_hex(16), secrets.token_hex(16)
+        self._access[access] = (client_id, time.time() + self.token_ttl)
+        self._refresh[refresh] = (client_id, access)
+        self.stats["tokens_issued"] += 1
+        return {"access_token": access, "refresh_token": refresh, "expire_time": self.token_ttl, "uid": "sim-uid"}
+
+    # ---------- Rutas ----------
+    async def _handle(self, request: "web.Request") -> "web.StreamResponse":
+        self.stats["requests"] += 1
+        body = await request.read()
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.stats["injected_failures"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        client_id = request.headers.get("client_id", "")
+        if self.rate_limit:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = TokenBucket(self.rate_limit)
+            if bucket.try_acquire() > 0:
+                self.stats["rate_limited"] += 1
+                return self._reply(ERR_FREQUENCY)
+
+        parts = request.path.strip("/").split("/")
+        if parts[:2] == ["v1.0", "token"]:
+            return self._token(request, body, parts)
+
+        error = self._verify(request, body, business=True)
+        if error is not None:
+            return self._reply(error)
+        if self.error_rate and random.random() < self.error_rate:
+            self.stats["injected_errors"] += 1
+            return self._reply(ERR_SYSTEM)
+
+        if request.path == BULK_STATUS_PATH and request.method == "GET":
+            return self._bulk_status(request)
+        if request.path == ASSOCIATED_USER_DEVICES.path and request.method == "GET":
+            return self._associated_devices(request)
+        if parts[:4] == ["v2.0", "cloud", "thing", "group"]:
+            return self._group(request, body, parts[4:])
+        if len(parts) == 5 and parts[:3] == ["v2.0", "cloud", "thing"] and parts[4] == "report-logs":
+            breaker = self.devices.get(parts[3])
+            if breaker is None:
+                return self._reply(ERR_PERMISSION)
+            return self._report_logs(breaker, request)
+        if len(parts) >= 3 and parts[:2] == ["v1.0", "devices"]:
+            breaker = self.devices.get(parts[2])
+            if breaker is None:
+                return self._reply(ERR_PERMISSION)
+            action = parts[3] if len(parts) > 3 else ""
+            if request.method == "GET" and action == "":
+                return self._ok(self._device_info(breaker))
+            if request.method == "GET" and action == "status":
+                return self._ok(breaker.status())
+            if request.method == "GET" and action == "specifications":
+                return self._ok(SPECIFICATION)
+            if request.method == "GET" and action == "functions":
+                return self._ok({"category": "dlq", "functions": SPECIFICATION["functions"]})
+            if request.method == "POST" and action == "commands":
+                return self._commands(breaker, body)
+        return self._reply((1108, "uri path invalid"), status=404)
+
+    def _token(self, request: "web.Request", body: bytes, parts: List[str]) -> "web.Response":
+        error = self._verify(request, body, business=False)
+        if error is not None:
+            return self._reply(error)
+        client_id = request.headers["client_id"]
+        if len(parts) == 2:
+            if request.query.get("grant_type") != "1":
+                return self._reply(ERR_PARAM)
+            return self._ok(self._issue(client_id))
+        owner = self._refresh.pop(parts[2], None)
+        if owner is None or owner[0] != client_id:
+            self.stats["token_errors"] += 1
+            return self._reply(ERR_TOKEN)
+        self._access.pop(owner[1], None)  # el refresh invalida el token anterior
+        return self._ok(self._issue(client_id))
+
+    def _device_info(self, breaker: VirtualBreaker) -> Dict[str, Any]:
+        return {
+            "id": breaker.device_id,
+            "name": f"Breaker {breaker.device_id[-4:]}",
+            "product_id": PRODUCT_ID,
+            "product_name": "Simulated prepaid breaker",
+            "category": "dlq",
+            "online": breaker.online,
+            "uid": "sim-uid",
+            "time_zone": "+00:00",
+        }
+
+    def _bulk_status(self, request: "web.Request") -> "web.Response":
+        ids = [d for d in request.query.get("device_ids", "").split(",") if d]
+        if not ids or len(ids) > BULK_STATUS_MAX_IDS:
+            return self._reply(ERR_PARAM)
+        result = [{"id": d, "status": self.devices[d].status()} for d in ids if d in self.devices]
+        return self._ok(result)
+
+    def _associated_devices(self, request: "web.Request") -> "web.Response":
+        """Listado paginado por ``last_row_key`` (el último id de la página anterior)."""
+        try:
+            size = min(int(request.query.get("size", 20)), 100)
+        except ValueError:
+            return self._reply(ERR_PARAM)
+        ids = list(self.devices)
+        last = request.query.get("last_row_key")
+        start = ids.index(last) + 1 if last in self.devices else 0
+        page = ids[start : start + size]
+        return self._ok(
+            {
+                "devices": [self._device_info(self.devices[d]) for d in page],
+                "has_more": start + size < len(ids),
+                "last_row_key": page[-1] if page else "",
+            }
+        )
+
+    def _report_logs(self, breaker: VirtualBreaker, request: "web.Request") -> "web.Response":
+        """Informes deterministas (los mismos en cada llamada) en orden ascendente, paginados por índice."""
+        query = request.query
+        try:
+            codes = [c for c in query["codes"].split(",") if c]
+            start, end = int(query["start_time"]), int(query["end_time"])
+            size = min(int(query.get("size", 20)), 100)
+            offset = int(query.get("last_row_key") or 0)
+        except (KeyError, ValueError):
+            return self._reply(ERR_PARAM)
+        if not codes or end < start:
+            return self._reply(ERR_PARAM)
+        first = -(-start // REPORT_INTERVAL_MS) * REPORT_INTERVAL_MS
+        total = max(0, (end - first) // REPORT_INTERVAL_MS + 1) * len(codes)
+        logs = []
+        for i in range(offset, min(total, offset + size)):
+            t = first + (i // len(codes)) * REPORT_INTERVAL_MS
+            code = codes[i % len(codes)]
+            value = zlib.crc32(f"{breaker.device_id}:{code}:{t}".encode()) % 100_000
+            logs.append({"code": code, "event_time": t, "value": value})
+        more = offset + size < total
+        row_key = str(offset + size) if more else ""
+        return self._ok({"device_id": breaker.device_id, "logs": logs, "has_more": more, "last_row_key": row_key})
+
+    def _group(self, request: "web.Request", body: bytes, rest: List[str]) -> "web.Response":
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._reply(ERR_PARAM)
+        if not isinstance(payload, dict):
+            return self._reply(ERR_PARAM)
+        if request.method == "POST" and not rest:
+            if not payload.get("space_id") or not payload.get("name") or not payload.get("product_id"):
+                return self._reply(ERR_PARAM)
+            self._group_seq += 1
+            group_id = str(self._group_seq)
+            self.groups[group_id] = {"product_id": payload["product_id"], "devices": set()}
+            return self._ok({"id": group_id})
+        if request.method == "POST" and rest == ["properties"]:
+            group = self.groups.get(str(payload.get("group_id")))
+            properties = payload.get("properties")
+            if isinstance(properties, str):
+                try:
+                    properties = json.loads(properties)
+                except ValueError:
+                    properties = None
+            if group is None or not isinstance(properties, dict) or not properties:
+                return self._reply(ERR_PARAM)
+            if not all(VirtualBreaker.accepts(code, value) for code, value in properties.items()):
+                return self._reply(ERR_PARAM)
+            for device_id in group["devices"]:
+                breaker = self.devices[device_id]
+                if breaker.online:
+                    for code, value in properties.items():
+                        breaker.apply(code, value)
+                    self.stats["commands"] += len(properties)
+            self.stats["group_commands"] += 1
+            return self._ok(True)
+        group = self.groups.get(rest[0]) if rest else None
+        if group is None:
+            return self._reply(ERR_PERMISSION)
+        if request.method == "DELETE" and len(rest) == 1:
+            del self.groups[rest[0]]
+            return self._ok(True)
+        if request.method == "POST" and rest[1:] == ["devices"]:
+            ids = [d for d in str(payload.get("device_ids", "")).split(",") if d]
+            if not ids:
+                return self._reply(ERR_PARAM)
+            result = []
+            for device_id in ids:
+                # Todos los breakers simulados son del mismo producto.
+                ok = device_id in self.devices and group["product_id"] == PRODUCT_ID
+                ok = ok and len(group["devices"]) < GROUP_MAX_DEVICES
+                if ok:
+                    group["devices"].add(device_id)
+                result.append({"device_id": device_id, "success": ok})
+            return self._ok(result)
+        return self._reply((1108, "uri path invalid"), status=404)
+
+    def _commands(self, breaker: VirtualBreaker, body: bytes) -> "web.Response":
+        try:
+            commands = json.loads(body or b"{}").get("commands")
+        except (ValueError, AttributeError):
+            commands = None
+        if not isinstance(commands, list) or not commands:
+            return self._reply(ERR_PARAM)
+        if not breaker.online:
+            return self._reply(ERR_OFFLINE)
+        if not all(isinstance(c, dict) and breaker.accepts(c.get("code"), c.get("value")) for c in commands):
+            return self._reply(ERR_PARAM)  # se valida todo antes de aplicar nada
+        for command in commands:
+            breaker.apply(command["code"], command["value"])
+        self.stats["commands"] += len(commands)
+        return self._ok(True)
@@ -0,0 +1,74 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Layouts compartidos: todos los equipos de un mismo modelo reportan los mismos
+# códigos en el mismo orden, así que la tupla de códigos y su índice se crean
+# una sola vez y cada estado sólo guarda sus valores.
+_LAYOUTS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Dict[str, int]]] = {}
+_MAX_LAYOUTS = 4096
+
+
+def _layout(codes: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    layout = _LAYOUTS.get(codes)
+    if layout is None:
+        layout = (codes, {code: i for i, code in enumerate(codes)})
+        if len(_LAYOUTS) < _MAX_LAYOUTS:
+            layout = _LAYOUTS.setdefault(codes, layout)
+    return layout
+
+
+class DeviceStatus(Mapping):
+    """Estado de un dispositivo como mapeo ``code -> value`` compacto.
+
+    Sustituye a ``[{"code", "value"}, ...]``: guarda una tupla de valores y
+    comparte con los demás estados del mismo modelo la tupla de códigos y su
+    índice. ``raw`` reconstruye la lista de dicts original bajo demanda.
+    """
+
+    __slots__ = ("codes", "_values", "t", "_index")  # no "values": taparía Mapping.values()
+
+    def __init__(self, codes: Tuple[str, ...], values: Tuple[Any, ...], t: Optional[int] = None) -> None:
+        self.codes, self._index = _layout(codes)
+        if len(self._index) != len(codes):  # código repetido: gana el último valor
+            merged = dict(zip(codes, values))
+            self.codes, self._index = _layout(tuple(merged))
+            values = tuple(merged.values())
+        self._values = values
+        self.t = t
+
+    @classmethod
+    def from_result(cls, status: Iterable[Dict[str, Any]], t: Optional[int] = None) -> "DeviceStatus":
+        """Desde el ``result`` de ``/status`` (o el ``status`` de un elemento del endpoint en lote)."""
+        items = [(item["code"], item.get("value")) for item in status]
+        return cls(tuple(code for code, _ in items), tuple(value for _, value in items), t)
+
+    def __getitem__(self, code: str) -> Any:
+        return self._values[self._index[code]]
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, code: str, default: Any = None) -> Any:
+        i = self._index.get(code)
+        return default if i is None else self._values[i]
+
+    @property
+    def raw(self) -> List[Dict[str, Any]]:
+        """La forma original de Tuya, ``[{"code", "value"}, ...]`` (se crea en cada acceso)."""
+        return [{"code": code, "value": value} for code, value in zip(self.codes, self._values)]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Al deserializar (p. ej. entre procesos) se vuelve a compartir el layout.
+        return DeviceStatus, (self.codes, self._values, self.t)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.codes, self._values))
+
+    def __repr__(self) -> str:
+        return f"DeviceStatus({self.to_dict()!r}, t={self.t!r})"
@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+# Magnitudes ya convertidas de un breaker (W, V, A, kWh).
+COLUMNS = (
+    "cur_power",
+    "cur_voltage",
+    "cur_current",
+    "balance_energy",
+    "total_forward_energy",
+    "voltage_a",
+    "voltage_b",
+    "voltage_c",
+)
+DAY_MS = 86_400_000
+_RUN = 4  # (slot, primera fila, filas, t_max) por tramo en runs.i64
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("El almacén de series requiere numpy (pip install numpy).")
+
+
+def day_of(t_ms: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(t_ms // 1000))
+
+
+class RingBuffer:
+    """Últimas ``capacity`` muestras de un dispositivo: ``t`` (int64, ms) y una fila float32 por columna."""
+
+    __slots__ = ("t", "values", "count", "flushed")
+
+    def __init__(self, capacity: int, ncols: int) -> None:
+        self.t = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full((ncols, capacity), np.nan, dtype=np.float32)
+        self.count = 0  # muestras escritas desde el inicio
+        self.flushed = 0  # de ellas, ya volcadas a disco
+
+    @property
+    def capacity(self) -> int:
+        return self.t.shape[0]
+
+    def push(self, t: int, row: Sequence[float]) -> None:
+        i = self.count % self.capacity
+        self.t[i] = t
+        self.values[:, i] = row
+        self.count += 1
+
+    def _order(self, first: int) -> "np.ndarray":
+        return np.arange(first, self.count) % self.capacity
+
+    def pending(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        idx = self._order(self.flushed)
+        return self.t[idx], self.values[:, idx]
+
+
+class TimeSeriesStore:
+    """Series de telemetría por dispositivo en ficheros de columnas por día, leídos con ``mmap``.
+
+    - En memoria sólo hay un ``RingBuffer`` por dispositivo (``capacity``
+      muestras); al llenarse, o con ``flush()``, lo pendiente se añade a
+      ``root/AAAA-MM-DD/`` (UTC): ``t.i64`` y un ``<columna>.f32`` por
+      columna, sólo en modo append.
+    - Cada volcado escribe las muestras de un dispositivo seguidas (un
+      tramo) y lo anota en ``runs.i64``. Una lectura dentro de un tramo
+      devuelve vistas del ``memmap`` sin copiar; si abarca varios tramos se
+      concatenan.
+    - Las muestras deben llegar en orden creciente de ``t`` por dispositivo.
+    """
+
+    def __init__(self, root: str, columns: Sequence[str] = COLUMNS, capacity: int = 360) -> None:
+        _require_numpy()
+        self.root = root
+        self.columns = tuple(columns)
+        self._col = {c: i for i, c in enumerate(self.columns)}
+        self.capacity = capacity
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._maps: Dict[Tuple[str, str], "np.ndarray"] = {}
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._slots_path = os.path.join(root, "devices.txt")
+        schema_path = os.path.join(root, "columns.json")
+        if os.path.exists(schema_path):
+            with open(schema_path, "r", encoding="utf-8") as fh:
+                if tuple(json.load(fh)) != self.columns:
+                    raise ValueError(f"{root} usa otras columnas")
+        else:
+            with open(schema_path, "w", encoding="utf-8") as fh:
+                json.dump(list(self.columns), fh)
+        self._slots: Dict[str, int] = {}
+        if os.path.exists(self._slots_path):
+            with open(self._slots_path, "r", encoding="utf-8") as fh:
+                self._slots = {line.strip(): i for i, line in enumerate(fh) if line.strip()}
+
+    # ---------- Escritura ----------
+    def _slot(self, device_id: str) -> int:
+        slot = self._slots.get(device_id)
+        if slot is None:
+            slot = self._slots[device_id] = len(self._slots)
+            with open(self._slots_path, "a", encoding="utf-8") as fh:
+                fh.write(device_id + "\n")
+        return slot
+
+    def _buffer(self, device_id: str) -> RingBuffer:
+        buf = self._buffers.get(device_id)
+        if buf is None:
+            self._slot(device_id)
+            buf = self._buffers[device_id] = RingBuffer(self.capacity, len(self.columns))
+        return buf
+
+    def append(self, device_id: str, t_ms: int, values: Mapping[str, float]) -> None:
+        """Añade una muestra; las columnas ausentes quedan como NaN."""
+        col = self._col
+        row = np.full(len(self.columns), np.nan, dtype=np.float32)
+        for code, value in values.items():
+            i = col.get(code)
+            if i is not None and value is not None:
+                row[i] = value
+        with self._lock:
+            buf = self._buffer(device_id)
+            if buf.count - buf.flushed >= buf.capacity:
+                self._flush_buffer(device_id, buf)
+            buf.push(t_ms, row)
+
+    def append_batch(self, device_ids: Sequence[str], t_ms: "np.ndarray", columns: Mapping[str, "np.ndarray"]) -> None:
+        """Una muestra por dispositivo a partir de arrays alineados (p. ej. un lote decodificado)."""
+        n = len(device_ids)
+        matrix = np.full((len(self.columns), n), np.nan, dtype=np.float32)
+        for code, array in columns.items():
+            i = self._col.get(code)
+            if i is not None:
+                matrix[i] = array
+        t = np.broadcast_to(np.asarray(t_ms, dtype=np.int64), (n,))
+        with self._lock:
+            for j, device_id in enumerate(device_ids):
+                buf = self._buffer(device_id)
+                if buf.count - buf.flushed >= buf.capacity:
+                    self._flush_buffer(device_id, buf)
+                buf.push(int(t[j]), matrix[:, j])
+
+    def _day_dir(self, day: str) -> str:
+        path = os.path.join(self.root, day)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _write_day(self, day: str, segments: List[Tuple[int, "np.ndarray", "np.ndarray"]]) -> None:
+        """Añade los tramos ``(slot, t, values)`` de un día abriendo cada fichero una sola vez."""
+        path = self._day_dir(day)
+        runs_path = os.path.join(path, "runs.i64")
+        first = 0
+        size = os.path.getsize(runs_path) if os.path.exists(runs_path) else 0
+        if size % (_RUN * 8):
+            with open(runs_path, "ab") as fh:
+                fh.truncate(size - size % (_RUN * 8))  # entrada de índice a medias
+            size -= size % (_RUN * 8)
+        if size:
+            with open(runs_path, "rb") as fh:
+                fh.seek(-_RUN * 8, os.SEEK_END)
+                last = np.frombuffer(fh.read(_RUN * 8), dtype=np.int64)
+            first = int(last[1] + last[2])
+
+        index = np.empty((len(segments), _RUN), dtype=np.int64)
+        row = first
+        for k, (slot, t, _) in enumerate(segments):
+            index[k] = (slot, row, len(t), t[-1])
+            row += len(t)
+        files = [("t.i64", 8, np.concatenate([t for _, t, _ in segments]))]
+        for i, column in enumerate(self.columns):
+            files.append((column + ".f32", 4, np.concatenate([v[i] for _, _, v in segments])))
+        for name, itemsize, data in files:
+            with open(os.path.join(path, name), "ab") as fh:
+                if fh.tell() != first * itemsize:
+                    fh.truncate(first * itemsize)  # restos de un volcado interrumpido
+                fh.write(data.tobytes())
+        # El índice va al final: un tramo sin entrada en runs.i64 no existe para las lecturas.
+        with open(runs_path, "ab") as fh:
+            fh.write(index.tobytes())
+
+    def _pending_segments(self, device_id: str, buf: RingBuffer, by_day: Dict[str, list]) -> None:
+        t, values = buf.pending()
+        if not len(t):
+            return
+        slot = self._slots[device_id]
+        cuts = np.flatnonzero(np.diff(t // DAY_MS)) + 1  # un tramo por día
+        for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(t)]):
+            by_day.setdefault(day_of(int(t[lo])), []).append((slot, t[lo:hi], values[:, lo:hi]))
+        buf.flushed = buf.count
+
+    def _flush_buffer(self, device_id: str, buf: RingBuffer) -> None:
+        by_day: Dict[str, list] = {}
+        self._pending_segments(device_id, buf, by_day)
+        for day, segments in by_day.items():
+            self._write_day(day, segments)
+
+    def flush(self) -> None:
+        """Vuelca lo pendiente de todos los dispositivos (una escritura por fichero y día)."""
+        with self._lock:
+            by_day: Dict[str, list] = {}
+            for device_id, buf in self._buffers.items():
+                self._pending_segments(device_id, buf, by_day)
+            for day, segments in by_day.items():
+                self._write_day(day, segments)
+
+    # ---------- Lectura ----------
+    def _map(self, day: str, name: str, dtype: str) -> Optional["np.ndarray"]:
+        path = os.path.join(self.root, day, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        key = (day, name)
+        cached = self._maps.get(key)
+        if cached is not None and cached.nbytes == size:
+            return cached
+        if size == 0:
+            return None
+        mapped = np.memmap(path, dtype=dtype, mode="r")
+        self._maps[key] = mapped  # los ficheros sólo crecen: se vuelve a mapear si cambia el tamaño
+        return mapped
+
+    def runs(
+        self, device_id: str, start_ms: int, end_ms: int, columns: Optional[Iterable[str]] = None
+    ) -> List[Tuple["np.ndarray", Dict[str, "np.ndarray"]]]:
+        """Tramos de ``[start_ms, end_ms)`` como vistas sin copia: ``[(t, {columna: valores}), ...]``."""
+        names = list(columns) if columns is not None else list(self.columns)
+        out: List[Tuple["np.ndarray", Dict[str, "np.ndarray"]]] = []
+        with self._lock:
+            slot = self._slots.get(device_id)
+            if slot is None:
+                return out
+            for day_ms in range(start_ms - start_ms % DAY_MS, end_ms, DAY_MS):
+                day = day_of(day_ms)
+                index = self._map(day, "runs.i64", "int64")
+                t_all = self._map(day, "t.i64", "int64")
+                if index is None or t_all is None:
+                    continue
+                index = index[: len(index) - len(index) % _RUN].reshape(-1, _RUN)
+                for _, first, count, _ in index[(index[:, 0] == slot) & (index[:, 3] >= start_ms)]:
+                    t = t_all[first:first + count]
+                    lo, hi = np.searchsorted(t, [start_ms, end_ms])
+                    if lo == hi:
+                        continue
+                    cols = {}
+                    for name in names:
+                        data = self._map(day, name + ".f32", "float32")
+                        cols[name] = data[first + lo:first + hi]
+                    out.append((t[lo:hi], cols))
+            buf = self._buffers.get(device_id)
+            if buf is not None and buf.count > buf.flushed:
+                t, values = buf.pending()
+                lo, hi = np.searchsorted(t, [start_ms, end_ms])
+                if lo < hi:
+                    out.append((t[lo:hi], {name: values[self._col[name], lo:hi] for name in names}))
+        return out
+
+    def read(
+        self, device_id: str, start_ms: int, end_ms: int, columns: Optional[Iterable[str]] = None
+    ) -> Tuple["np.ndarray", Dict[str, "np.ndarray"]]:
+        """Como ``runs`` pero en un solo array por columna; sin copia si el rango cae en un tramo."""
+        names = list(columns) if columns is not None else list(self.columns)
+        parts = self.runs(device_id, start_ms, end_ms, names)
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty(0, dtype=np.int64), {name: np.empty(0, dtype=np.float32) for name in names}
+        return (
+            np.concatenate([t for t, _ in parts]),
+            {name: np.concatenate([cols[name] for _, cols in parts]) for name in names},
+        )
+
+    def latest(self, device_id: str) -> Optional[Tuple[int, Dict[str, float]]]:
+        """Última muestra en memoria de un dispositivo."""
+        buf = self._buffers.get(device_id)
+        if buf is None or buf.count == 0:
+            return None
+        i = (buf.count - 1) % buf.capacity
+        return int(buf.t[i]), {name: float(buf.values[j, i]) for j, name in enumerate(self.columns)}
+
+    def close(self) -> None:
+        self.flush()
+        self._maps.clear()
+
+    def __enter__(self) -> "TimeSeriesStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
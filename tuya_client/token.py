@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from .filelock import FileLock
+
+
+@dataclass
+class Token:
+    """Token de acceso de Tuya con su caducidad absoluta (epoch en segundos)."""
+
+    access_token: str
+    refresh_token: str = ""
+    expires_at: float = 0.0  # 0 = caducidad desconocida (nunca se renueva solo)
+    uid: str = ""
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], now: Optional[float] = None) -> "Token":
+        now = time.time() if now is None else now
+        expire_time = result.get("expire_time")
+        return cls(
+            access_token=result["access_token"],
+            refresh_token=result.get("refresh_token", ""),
+            expires_at=now + float(expire_time) if expire_time else 0.0,
+            uid=result.get("uid", ""),
+        )
+
+    def expires_in(self, now: Optional[float] = None) -> float:
+        if not self.expires_at:
+            return float("inf")
+        return self.expires_at - (time.time() if now is None else now)
+
+
+class TokenCache:
+    """Token persistido en disco y compartido entre procesos.
+
+    Las escrituras son atómicas (fichero temporal + ``os.replace``) y
+    ``lock`` serializa la renovación entre procesos.
+    """
+
+    def __init__(self, path: str, key: str) -> None:
+        self.path = path
+        self.key = key
+        self.lock = FileLock(path + ".lock")
+
+    def load(self) -> Optional[Token]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != self.key:
+            return None
+        try:
+            return Token(**data["token"])
+        except (KeyError, TypeError):
+            return None
+
+    def store(self, token: Token) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tuya-token-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"key": self.key, "token": asdict(token)}, fh)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+class TokenManager:
+    """Ciclo de vida del access_token: caducidad, renovación anticipada y caché compartida.
+
+    La E/S la hacen los clientes; aquí sólo se decide cuándo renovar y se
+    guarda el estado. ``lock`` garantiza una única renovación por proceso.
+    """
+
+    def __init__(self, refresh_margin: float = 300.0, cache: Optional[TokenCache] = None) -> None:
+        self.refresh_margin = refresh_margin
+        self.cache = cache
+        self.token: Optional[Token] = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.token is not None and self.token.expires_in(now) > self.refresh_margin
+
+    def can_refresh(self, now: Optional[float] = None) -> bool:
+        return self.token is not None and bool(self.token.refresh_token) and self.token.expires_in(now) > 0
+
+    def set(self, token: Optional[Token], persist: bool = True) -> None:
+        self.token = token
+        if persist and token is not None and self.cache is not None:
+            self.cache.store(token)
+
+    def update(self, data: Dict[str, Any]) -> bool:
+        """Guarda el token de una respuesta de ``/v1.0/token``; True si era válida."""
+        result = data.get("result") or {}
+        if not (data.get("success") and isinstance(result, dict) and result.get("access_token")):
+            return False
+        self.set(Token.from_result(result))
+        return True
+
+    def check_renewal(self, data: Dict[str, Any]) -> None:
+        """Lanza ``RuntimeError`` si tras renovar no queda un token utilizable."""
+        if self.token is None or self.token.expires_in() <= 0:
+            raise RuntimeError(f"No se pudo obtener access_token: {data.get('msg', data)}")
+
+    def load_shared(self) -> bool:
+        """Adopta el token de la caché en disco si sigue fresco (otro proceso lo renovó)."""
+        if self.cache is None:
+            return False
+        token = self.cache.load()
+        if token is None or token.expires_in() <= self.refresh_margin:
+            return False
+        self.token = token
+        return True
@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import requests
+
+from .client import BULK_STATUS_MAX_IDS, TuyaClient
+from .converters import ConverterRegistry
+from .errors import TuyaError
+from .pagination import ASSOCIATED_USER_DEVICES
+from .ratelimit import RateLimiter
+
+Transform = Callable[[str, Dict[str, Any]], Any]
+
+
+def _take(own: Any, others: List[Any], timeout: float) -> Tuple[Optional[Any], bool]:
+    """Siguiente tarea: primero de la cola propia y, si está vacía, robada de otra."""
+    try:
+        return own.get(timeout=timeout), False
+    except queue.Empty:
+        pass
+    for other in others:
+        try:
+            return other.get_nowait(), True
+        except queue.Empty:
+            continue
+    return None, False
+
+
+def _worker(index: int, queues: List[Any], results: Any, stop: Any, config: Dict[str, Any]) -> None:
+    limiter = RateLimiter(config["limits"], shared_dir=config["ratelimit_dir"])
+    client = TuyaClient(
+        config["client_id"],
+        config["secret"],
+        config["base_url"],
+        token_cache=config["token_cache"],
+        rate_limiter=limiter,
+        **config["client_kwargs"],
+    )
+    registry = ConverterRegistry(client) if config["convert"] else None
+    transform: Optional[Transform] = config["transform"]
+    own, others = queues[index], queues[index + 1:] + queues[:index]
+
+    while True:
+        task, stolen = _take(own, others, 0.05)
+        if task is None:
+            if stop.is_set():
+                break
+            continue
+        round_id, device_ids, products = task
+        if registry is not None:
+            for device_id, product_id in products.items():
+                registry.set_product(device_id, product_id)
+        try:
+            out = client.get_status_many(device_ids, max_workers=config["threads"], compact=config["compact"])
+            for device_id, resp in out.items():
+                if not resp.get("success"):
+                    continue
+                if registry is not None:
+                    resp["result"] = registry.convert(device_id, resp["result"])
+                if transform is not None:
+                    resp["result"] = transform(device_id, resp["result"])
+        except Exception as exc:  # la tarea falla entera, el worker sigue
+            error = {"success": False, "code": None, "msg": f"{type(exc).__name__}: {exc}"}
+            out = {device_id: dict(error) for device_id in device_ids}
+        # Un mensaje por tarea (cientos de dispositivos), no uno por dispositivo.
+        results.put((round_id, index, stolen, out))
+
+
+class FleetWorkerPool:
+    """Procesos worker para leer el estado de flotas grandes sin el límite del GIL.
+
+    - Los ids se reparten por hash entre los workers (cada dispositivo cae
+      siempre en el mismo, así su caché de conversores se mantiene caliente)
+      en tareas de ``task_size``; un worker sin trabajo roba tareas de las
+      colas de los demás.
+    - Todos comparten un único access_token (``token_cache`` en
+      ``state_dir``: el padre lo obtiene antes de arrancar y los workers lo
+      adoptan) y un único presupuesto de frecuencia (``RateLimiter`` con
+      ``shared_dir``).
+    - Cada worker devuelve los resultados de una tarea en un solo mensaje.
+
+    ``transform(device_id, result)`` (función de módulo, debe poder
+    serializarse) y ``convert=True`` (conversores de ``/specifications``) se
+    ejecutan en los workers. Con ``convert`` el ``product_id`` de cada
+    dispositivo viaja en la tarea: se toma de ``products``/``learn()`` o, si
+    no se dio ninguno, del listado de dispositivos al arrancar (unas pocas
+    páginas, no una petición por equipo). Un ``status()`` a la vez.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        base_url: str,
+        *,
+        processes: Optional[int] = None,
+        state_dir: Optional[str] = None,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        task_size: int = 10 * BULK_STATUS_MAX_IDS,
+        threads: int = 4,
+        compact: bool = False,
+        convert: bool = False,
+        transform: Optional[Transform] = None,
+        client_kwargs: Optional[Dict[str, Any]] = None,
+        start_method: Optional[str] = None,
+        products: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.processes = processes or os.cpu_count() or 1
+        self._own_state = state_dir is None
+        self.state_dir = state_dir or tempfile.mkdtemp(prefix="tuya-workers-")
+        self.task_size = task_size
+        self.products: Dict[str, str] = dict(products or {})
+        self.config = {
+            "client_id": client_id,
+            "secret": secret,
+            "base_url": base_url,
+            "token_cache": os.path.join(self.state_dir, "token.json"),
+            "ratelimit_dir": os.path.join(self.state_dir, "ratelimit"),
+            "limits": limits,
+            "threads": threads,
+            "compact": compact,
+            "convert": convert,
+            "transform": transform,
+            "client_kwargs": dict(client_kwargs or {}),
+        }
+        self._ctx = multiprocessing.get_context(start_method)
+        self._queues: List[Any] = []
+        self._results: Any = None
+        self._stop: Any = None
+        self._procs: List[Any] = []
+        self._round = 0
+        self.stats = {"tasks": [0] * self.processes, "stolen": [0] * self.processes, "requests": 0}
+
+    def start(self) -> None:
+        if self._procs:
+            return
+        # Un solo get_token() para todo el pool: los workers lo leen de token_cache.
+        client = TuyaClient(
+            self.config["client_id"],
+            self.config["secret"],
+            self.config["base_url"],
+            token_cache=self.config["token_cache"],
+            rate_limiter=RateLimiter(self.config["limits"], shared_dir=self.config["ratelimit_dir"]),
+            **self.config["client_kwargs"],
+        )
+        client._ensure_token()
+        if self.config["convert"] and not self.products:
+            try:
+                self.learn(client.iter_items(ASSOCIATED_USER_DEVICES))
+            except (requests.RequestException, ValueError, TuyaError):
+                pass  # sin listado: los workers preguntan por los que falten
+
+        ctx = self._ctx
+        self._queues = [ctx.Queue() for _ in range(self.processes)]
+        self._results = ctx.Queue()
+        self._stop = ctx.Event()
+        self._procs = [
+            ctx.Process(
+                target=_worker,
+                args=(i, self._queues, self._results, self._stop, self.config),
+                name=f"tuya-worker-{i}",
+                daemon=True,
+            )
+            for i in range(self.processes)
+        ]
+        for proc in self._procs:
+            proc.start()
+
+    def learn(self, devices: Iterable[Mapping[str, Any]]) -> None:
+        """Registra ``product_id`` desde dicts de dispositivo (``id``/``product_id``), p. ej. de un listado."""
+        for device in devices:
+            if device.get("id") and device.get("product_id"):
+                self.products[device["id"]] = device["product_id"]
+
+    def shard(self, device_id: str) -> int:
+        return zlib.crc32(device_id.encode()) % self.processes
+
+    def status(self, device_ids: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Genera ``(device_id, respuesta)`` según van terminando las tareas (orden no garantizado)."""
+        self.start()
+        self._round += 1
+        round_id = self._round
+        shards: List[List[str]] = [[] for _ in range(self.processes)]
+        for device_id in dict.fromkeys(device_ids):
+            shards[self.shard(device_id)].append(device_id)
+
+        pending = 0
+        convert = self.config["convert"]
+        for index, members in enumerate(shards):
+            for i in range(0, len(members), self.task_size):
+                chunk = members[i:i + self.task_size]
+                products = {d: self.products[d] for d in chunk if d in self.products} if convert else {}
+                self._queues[index].put((round_id, chunk, products))
+                pending += 1
+
+        while pending:
+            try:
+                task_round, worker, stolen, out = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self._procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Workers caídos: {', '.join(dead)}")
+                continue
+            if task_round != round_id:
+                continue  # restos de una ronda abandonada
+            pending -= 1
+            self.stats["tasks"][worker] += 1
+            self.stats["stolen"][worker] += stolen
+            self.stats["requests"] += -(-len(out) // BULK_STATUS_MAX_IDS)
+            yield from out.items()
+
+    def status_many(self, device_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return dict(self.status(device_ids))
+
+    def close(self) -> None:
+        if self._procs:
+            self._stop.set()
+            for proc in self._procs:
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+            self._procs = []
+        if self._own_state:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def __enter__(self) -> "FleetWorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()